@@ -1,10 +1,16 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import path
 from django.shortcuts import redirect
 from django.contrib import messages
 from .models import Animal, DemandeAdoption
+from . import export, services, statistiques
 from django.utils.safestring import mark_safe
 
 
@@ -42,6 +48,15 @@ class AnimalAdmin(admin.ModelAdmin):
 # ========================================
 # ADMIN DEMANDE D'ADOPTION
 # ========================================
+class ChangeListExport(ChangeList):
+    """Liste filtrée sans pagination : l'export n'a besoin que du queryset, pas d'un COUNT(*)"""
+
+    def get_results(self, request):
+        self.result_count = self.full_result_count = None
+        self.result_list = []
+        self.can_show_all = self.multi_page = False
+
+
 @admin.register(DemandeAdoption)
 class DemandeAdoptionAdmin(admin.ModelAdmin):
     """Interface admin pour gérer les demandes d'adoption"""
@@ -86,6 +101,17 @@ class DemandeAdoptionAdmin(admin.ModelAdmin):
     date_hierarchy = 'date_demande'
     list_per_page = 25
 
+    # ========================================
+    # REQUÊTES (évite une requête par ligne : __str__ et la colonne animal lisent demande.animal)
+    # ========================================
+    list_select_related = ('animal', 'utilisateur')
+    # Recherche AJAX au lieu d'un <select> chargeant tous les animaux
+    autocomplete_fields = ('animal',)
+
+    def get_queryset(self, request):
+        # Utilisé par la liste, le formulaire, la suppression et les actions groupées
+        return super().get_queryset(request).select_related('animal', 'utilisateur')
+
     # ========================================
     # COLONNES PERSONNALISÉES
     # ========================================
@@ -154,30 +180,35 @@ class DemandeAdoptionAdmin(admin.ModelAdmin):
     # ========================================
     # ACTIONS GROUPÉES
     # ========================================
-    actions = ['accepter_demandes', 'refuser_demandes', 'remettre_en_attente']
+    actions = ['accepter_demandes', 'refuser_demandes', 'remettre_en_attente', 'exporter_csv', 'exporter_xlsx']
 
     @admin.action(description="Accepter les demandes sélectionnées")
     def accepter_demandes(self, request, queryset):
-        count = 0
-        for demande in queryset.filter(statut='EN_ATTENTE'):
-            demande.statut = 'ACCEPTEE'
-            demande.traitee = True
-            demande.animal.disponible = False
-            demande.animal.save()
-            demande.save()
-            count += 1
-        self.message_user(request, f"{count} demande(s) acceptée(s). Animaux marqués comme indisponibles.", messages.SUCCESS)
+        resultat = services.accepter_demandes(queryset)
+        self.message_user(request, f"{resultat.acceptees} demande(s) acceptée(s). Animaux marqués comme indisponibles.", messages.SUCCESS)
+        if resultat.refusees:
+            self.message_user(request, f"{resultat.refusees} demande(s) concurrente(s) pour ces animaux refusée(s) automatiquement.", messages.WARNING)
+        if resultat.ignorees:
+            self.message_user(request, f"{resultat.ignorees} demande(s) ignorée(s) : déjà traitée(s) ou animal déjà adopté.", messages.WARNING)
 
     @admin.action(description="Refuser les demandes sélectionnées")
     def refuser_demandes(self, request, queryset):
-        count = queryset.filter(statut='EN_ATTENTE').update(statut='REFUSEE', traitee=True)
-        self.message_user(request, f"{count} demande(s) refusée(s).", messages.WARNING)
+        resultat = services.refuser_demandes(queryset)
+        self.message_user(request, f"{resultat.refusees} demande(s) refusée(s).", messages.WARNING)
 
     @admin.action(description="Remettre en attente")
     def remettre_en_attente(self, request, queryset):
-        count = queryset.update(statut='EN_ATTENTE', traitee=False)
+        count = services.remettre_en_attente(queryset)
         self.message_user(request, f"{count} demande(s) remise(s) en attente.")
 
+    @admin.action(description="Exporter les demandes sélectionnées (CSV)", permissions=['view'])
+    def exporter_csv(self, request, queryset):
+        return export.reponse(request, queryset, 'csv')
+
+    @admin.action(description="Exporter les demandes sélectionnées (Excel)", permissions=['view'])
+    def exporter_xlsx(self, request, queryset):
+        return export.reponse(request, queryset, 'xlsx')
+
     # ========================================
     # FORMULAIRE DÉTAILLÉ
     # ========================================
@@ -207,6 +238,30 @@ class DemandeAdoptionAdmin(admin.ModelAdmin):
         }),
     )
 
+    # ========================================
+    # STATISTIQUES (résumé tenu à jour, voir statistiques.py)
+    # ========================================
+    def save_model(self, request, obj, form, change):
+        # Déjà dans la transaction de changeform_view
+        avant = statistiques.etats(DemandeAdoption.objects.select_for_update().filter(pk=obj.pk)) if change else []
+        if 'statut' in form.changed_data:
+            obj.date_decision = timezone.now() if obj.statut in statistiques.DECISIONS else None
+        super().save_model(request, obj, form, change)
+        statistiques.enregistrer(avant, [statistiques.etat(obj)])
+
+    # Suppressions : signaux pre_delete / post_delete (signals.py), cascades comprises
+
+    def statistiques_demandes(self, request):
+        """Tableau de bord : ne lit que le résumé, quel que soit le nombre de demandes"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        return TemplateResponse(request, 'admin/animaux/demandeadoption/statistiques.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.opts,
+            'title': "Statistiques des demandes d'adoption",
+            **statistiques.tableau_de_bord(),
+        })
+
     # ========================================
     # URLS PERSONNALISÉES POUR LES BOUTONS
     # ========================================
@@ -215,40 +270,52 @@ class DemandeAdoptionAdmin(admin.ModelAdmin):
         custom_urls = [
             path('<int:pk>/accepter/', self.admin_site.admin_view(self.accepter_demande), name='animaux_demandeadoption_accepter'),
             path('<int:pk>/refuser/', self.admin_site.admin_view(self.refuser_demande), name='animaux_demandeadoption_refuser'),
+            path('statistiques/', self.admin_site.admin_view(self.statistiques_demandes), name='animaux_demandeadoption_statistiques'),
+            path('exporter/<str:extension>/', self.admin_site.admin_view(self.exporter_demandes), name='animaux_demandeadoption_exporter'),
         ]
         return custom_urls + urls
 
+    def get_changelist(self, request, **kwargs):
+        if request.resolver_match.url_name == 'animaux_demandeadoption_exporter':
+            return ChangeListExport
+        return super().get_changelist(request, **kwargs)
+
+    def exporter_demandes(self, request, extension):
+        """Export de toutes les demandes correspondant aux filtres et à la recherche de la liste"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if extension not in export.FORMATS:
+            raise Http404
+        liste = self.get_changelist_instance(request)
+        return export.reponse(request, liste.queryset, extension)
+
     def accepter_demande(self, request, pk):
         """Accepter une demande"""
         try:
-            demande = get_object_or_404(DemandeAdoption, pk=pk)
+            demande = get_object_or_404(DemandeAdoption.objects.select_related('animal'), pk=pk)
 
             # Vérifier que la demande est en attente
             if demande.statut != 'EN_ATTENTE':
                 messages.warning(request, f"Cette demande a déjà été traitée (statut : {demande.get_statut_display()}).")
                 return redirect('admin:animaux_demandeadoption_changelist')
 
-            # Vérifier que l'animal est encore disponible
-            if not demande.animal.disponible:
+            # Accepter la demande (transaction + verrou sur l'animal, voir services.py)
+            resultat = services.accepter_demandes([demande.pk])
+
+            # L'animal a été adopté entre-temps (autre demande acceptée)
+            if not resultat.acceptees:
                 messages.error(
                     request,
                     f"Impossible d'accepter cette demande : {demande.animal.nom} a déjà été adopté !"
                 )
                 return redirect('admin:animaux_demandeadoption_changelist')
 
-            # Accepter la demande
-            demande.statut = 'ACCEPTEE'
-            demande.traitee = True
-            demande.save()
-
-            # Marquer l'animal comme indisponible
-            demande.animal.disponible = False
-            demande.animal.save()
-
             messages.success(
                 request,
                 f"Demande #{demande.id:05d} acceptée ! {demande.animal.nom} est maintenant indisponible à l'adoption."
             )
+            if resultat.refusees:
+                messages.warning(request, f"{resultat.refusees} autre(s) demande(s) pour {demande.animal.nom} refusée(s) automatiquement.")
 
         except Exception as e:
             messages.error(request, f"Erreur : {str(e)}")
@@ -258,10 +325,8 @@ class DemandeAdoptionAdmin(admin.ModelAdmin):
 
     def refuser_demande(self, request, pk):
         """Refuser une demande"""
-        demande = DemandeAdoption.objects.get(pk=pk)
-        demande.statut = 'REFUSEE'
-        demande.traitee = True
-        demande.save()
+        demande = get_object_or_404(DemandeAdoption, pk=pk)
+        services.refuser_demandes([demande.pk])
 
         messages.warning(request, f"Demande de {demande.nom_complet} refusée.")
         return redirect('admin:animaux_demandeadoption_changelist')
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AnimauxConfig(AppConfig):
     name = 'animaux'
+
+    def ready(self):
+        # Invalidation du cache de pages (voir signals.py)
+        from . import signals  # noqa: F401
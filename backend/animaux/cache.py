@@ -0,0 +1,220 @@
+"""
+Cache de pages pour les vues publiques (visiteurs anonymes uniquement).
+
+La clé d'une page = URL complète (chemin + query string) + version de chaque
+« groupe » dont elle dépend (ex : 'catalogue', 'animal:12'). Invalider un
+groupe change sa version : toutes les pages qui en dépendent sont ignorées
+d'un coup, sans avoir à les énumérer.
+
+La version est l'horodatage de la dernière invalidation : pendant
+DB_REPLICA_DELAI secondes, la réplique peut encore servir l'ancien contenu.
+Les pages (et validateurs ETag) de ces groupes sont alors construites sur la
+base principale, sinon une page périmée serait remise en cache sous la
+nouvelle version pour CACHE_PAGES_DUREE.
+"""
+import hashlib
+import time
+from contextlib import nullcontext
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+
+from config.routers import lire_sur_principale
+
+PREFIXE = 'pages'
+
+
+def _cle_version(groupe):
+    return f'{PREFIXE}:version:{groupe}'
+
+
+def _versions(groupes):
+    """Versions actuelles des groupes (créées si absentes ou évincées du cache)"""
+    cles = [_cle_version(groupe) for groupe in groupes]
+    versions = cache.get_many(cles)
+    # Nouvelle version = horodatage : une page d'une ancienne version ne peut pas « revenir »
+    manquantes = {cle: time.time_ns() for cle in cles if cle not in versions}
+    if manquantes:
+        cache.set_many(manquantes, None)
+        versions.update(manquantes)
+    return [versions[cle] for cle in cles]
+
+
+async def _aversions(groupes):
+    """Version async de _versions()"""
+    cles = [_cle_version(groupe) for groupe in groupes]
+    versions = await cache.aget_many(cles)
+    manquantes = {cle: time.time_ns() for cle in cles if cle not in versions}
+    if manquantes:
+        await cache.aset_many(manquantes, None)
+        versions.update(manquantes)
+    return [versions[cle] for cle in cles]
+
+
+def _empreinte(request, versions):
+    url = request.get_full_path()
+    empreinte = hashlib.md5(':'.join([url, *map(str, versions)]).encode()).hexdigest()
+    return f'{PREFIXE}:page:{empreinte}'
+
+
+def _lecture(versions):
+    """
+    Lectures sur la principale si un groupe a été invalidé il y a moins de
+    DB_REPLICA_DELAI secondes (une version recréée après éviction compte
+    aussi : on ne sait pas quand a eu lieu la dernière écriture).
+    """
+    limite = time.time_ns() - settings.DB_REPLICA_DELAI * 1_000_000_000
+    if any(version > limite for version in versions):
+        return lire_sur_principale()
+    return nullcontext()
+
+
+def lecture_fraiche(*groupes):
+    """Contexte de lecture sûr pour construire une page de ces groupes"""
+    return _lecture(_versions(groupes))
+
+
+async def alecture_fraiche(*groupes):
+    """Version async de lecture_fraiche()"""
+    return _lecture(await _aversions(groupes))
+
+
+def _compter(evenement):
+    """Compteurs partagés hits/misses (dans le cache, donc communs aux workers)"""
+    cle = f'{PREFIXE}:stats:{evenement}'
+    try:
+        cache.incr(cle)
+    except ValueError:
+        cache.add(cle, 1, None)
+
+
+async def _acompter(evenement):
+    cle = f'{PREFIXE}:stats:{evenement}'
+    try:
+        await cache.aincr(cle)
+    except ValueError:
+        await cache.aadd(cle, 1, None)
+
+
+def statistiques():
+    """Hits, misses et taux de succès du cache de pages"""
+    valeurs = cache.get_many([f'{PREFIXE}:stats:hits', f'{PREFIXE}:stats:misses'])
+    hits = valeurs.get(f'{PREFIXE}:stats:hits', 0)
+    misses = valeurs.get(f'{PREFIXE}:stats:misses', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'taux': hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def reinitialiser_statistiques():
+    cache.delete_many([f'{PREFIXE}:stats:hits', f'{PREFIXE}:stats:misses'])
+
+
+def invalider(*groupes):
+    """Invalide toutes les pages des groupes donnés"""
+    cache.set_many({_cle_version(groupe): time.time_ns() for groupe in groupes}, None)
+
+
+def invalider_apres_commit(*groupes):
+    """
+    Invalide tout de suite, puis à nouveau au commit : une requête concurrente
+    qui aurait remis en cache l'ancienne version avant le commit est écartée.
+    """
+    invalider(*groupes)
+    transaction.on_commit(lambda: invalider(*groupes))
+
+
+def _peut_utiliser_cache(request, utilisateur):
+    return (
+        request.method in ('GET', 'HEAD')
+        # Des messages en attente doivent être affichés par une page fraîche
+        and CookieStorage.cookie_name not in request.COOKIES
+        and not utilisateur.is_authenticated
+    )
+
+
+def _peut_stocker(request, response):
+    """Seules les réponses identiques pour tous les visiteurs sont stockées"""
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # Un jeton CSRF est propre au visiteur
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def cache_page_anonyme(*groupes):
+    """
+    Met en cache la page pour les visiteurs anonymes.
+
+    `groupes` : noms fixes ('catalogue') ou fonctions recevant les paramètres
+    de l'URL et renvoyant un nom (lambda id: f'animal:{id}').
+    Fonctionne aussi sur les vues async (views_async.py).
+    """
+    def decorateur(vue):
+        if iscoroutinefunction(vue):
+            return _decorer_async(vue, groupes)
+
+        @wraps(vue)
+        def inner(request, *args, **kwargs):
+            if not _peut_utiliser_cache(request, request.user):
+                return vue(request, *args, **kwargs)
+
+            noms = [groupe(**kwargs) if callable(groupe) else groupe for groupe in groupes]
+            versions = _versions(noms)
+            cle = _empreinte(request, versions)
+
+            response = cache.get(cle)
+            if response is not None:
+                _compter('hits')
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _compter('misses')
+            with _lecture(versions):
+                response = vue(request, *args, **kwargs)
+            if _peut_stocker(request, response):
+                cache.set(cle, response, settings.CACHE_PAGES_DUREE)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return inner
+
+    return decorateur
+
+
+def _decorer_async(vue, groupes):
+    """Même logique que cache_page_anonyme pour une vue async (API async du cache)"""
+    @wraps(vue)
+    async def inner(request, *args, **kwargs):
+        if not _peut_utiliser_cache(request, await request.auser()):
+            return await vue(request, *args, **kwargs)
+
+        noms = [groupe(**kwargs) if callable(groupe) else groupe for groupe in groupes]
+        versions = await _aversions(noms)
+        cle = _empreinte(request, versions)
+
+        response = await cache.aget(cle)
+        if response is not None:
+            await _acompter('hits')
+            response['X-Cache'] = 'HIT'
+            return response
+
+        await _acompter('misses')
+        with _lecture(versions):
+            response = await vue(request, *args, **kwargs)
+        if _peut_stocker(request, response):
+            await cache.aset(cle, response, settings.CACHE_PAGES_DUREE)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    return inner
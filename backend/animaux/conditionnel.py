@@ -0,0 +1,152 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified → 304) pour les pages publiques.
+
+Contrairement à django.views.decorators.http.condition, ETag et
+Last-Modified sont calculés par une seule fonction, donc une seule requête
+SQL ; le template n'est rendu que si la page a changé.
+"""
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from .cache import alecture_fraiche, lecture_fraiche
+from .forms import FiltreAnimauxForm
+from .models import Animal
+
+
+def _validateurs(request, utilisateur, date_modification, *parties):
+    """
+    (ETag, date) propres à l'utilisateur : la page affiche son nom une fois
+    connecté, et son jeton CSRF (formulaire d'adoption). Le secret CSRF change
+    à chaque connexion : il entre dans l'ETag, sinon un 304 garderait une page
+    au jeton refusé. Pas de Last-Modified pour un utilisateur connecté, la date
+    ne peut pas refléter ce changement.
+    """
+    if utilisateur.is_authenticated:
+        identifiant = f"{utilisateur.pk}:{request.META.get('CSRF_COOKIE', '')}"
+        date_modification = None
+    else:
+        identifiant = 0
+    empreinte = ':'.join(str(partie) for partie in (*parties, identifiant))
+    return quote_etag(hashlib.md5(empreinte.encode()).hexdigest()), date_modification
+
+
+def _resume_catalogue(request):
+    filtres = FiltreAnimauxForm(request.GET)
+    return filtres.filtrer(Animal.objects.filter(disponible=True)), {
+        'derniere': Max('date_modification'),
+        'nombre': Count('id'),
+    }
+
+
+def validateurs_catalogue(request):
+    """Nombre et MAX(date_modification) des animaux visibles avec ces filtres"""
+    animaux, agregats = _resume_catalogue(request)
+    # Juste après une invalidation, la réplique donnerait d'anciens validateurs
+    with lecture_fraiche('catalogue'):
+        resume = animaux.aggregate(**agregats)
+    # Le nombre détecte les animaux retirés (supprimés ou adoptés)
+    return _validateurs(request, request.user, resume['derniere'], 'catalogue', resume['derniere'], resume['nombre'])
+
+
+async def avalidateurs_catalogue(request):
+    """Version async de validateurs_catalogue()"""
+    animaux, agregats = _resume_catalogue(request)
+    with await alecture_fraiche('catalogue'):
+        resume = await animaux.aaggregate(**agregats)
+    return _validateurs(request, await request.auser(), resume['derniere'], 'catalogue', resume['derniere'], resume['nombre'])
+
+
+def _date_modification(id):
+    return Animal.objects.filter(pk=id).values_list('date_modification', flat=True)
+
+
+def validateurs_detail(request, id):
+    """Date de modification de l'animal (recherche par clé primaire)"""
+    with lecture_fraiche(f'animal:{id}'):
+        date_modification = _date_modification(id).first()
+    if date_modification is None:
+        return None  # 404 géré par la vue
+    return _validateurs(request, request.user, date_modification, 'animal', id, date_modification)
+
+
+async def avalidateurs_detail(request, id):
+    """Version async de validateurs_detail()"""
+    with await alecture_fraiche(f'animal:{id}'):
+        date_modification = await _date_modification(id).afirst()
+    if date_modification is None:
+        return None
+    return _validateurs(request, await request.auser(), date_modification, 'animal', id, date_modification)
+
+
+def _messages_en_attente(request):
+    return len(messages.get_messages(request)) > 0
+
+
+def _reponse_conditionnelle(response, etag, derniere_modification):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if derniere_modification:
+            response.headers.setdefault('Last-Modified', http_date(derniere_modification))
+    return response
+
+
+def requete_conditionnelle(fonction_validateurs):
+    """
+    Répond 304 Not Modified sans appeler la vue quand la page n'a pas changé.
+    `fonction_validateurs(request, **kwargs)` renvoie (etag, date) ou None ;
+    pour une vue async, elle doit être async aussi (avalidateurs_*).
+    """
+    def decorateur(vue):
+        if iscoroutinefunction(vue):
+            return _decorer_async(vue, fonction_validateurs)
+
+        @wraps(vue)
+        def inner(request, *args, **kwargs):
+            # Des messages en attente doivent être affichés : pas de 304
+            if request.method not in ('GET', 'HEAD') or _messages_en_attente(request):
+                return vue(request, *args, **kwargs)
+
+            validateurs = fonction_validateurs(request, *args, **kwargs)
+            if validateurs is None:
+                return vue(request, *args, **kwargs)
+
+            etag, date_modification = validateurs
+            derniere_modification = int(date_modification.timestamp()) if date_modification else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=derniere_modification)
+            if response is None:
+                response = vue(request, *args, **kwargs)
+            return _reponse_conditionnelle(response, etag, derniere_modification)
+
+        return inner
+
+    return decorateur
+
+
+def _decorer_async(vue, fonction_validateurs):
+    @wraps(vue)
+    async def inner(request, *args, **kwargs):
+        # Les messages peuvent être stockés en session (accès synchrone)
+        if request.method not in ('GET', 'HEAD') or await sync_to_async(_messages_en_attente)(request):
+            return await vue(request, *args, **kwargs)
+
+        validateurs = await fonction_validateurs(request, *args, **kwargs)
+        if validateurs is None:
+            return await vue(request, *args, **kwargs)
+
+        etag, date_modification = validateurs
+        derniere_modification = int(date_modification.timestamp()) if date_modification else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=derniere_modification)
+        if response is None:
+            response = await vue(request, *args, **kwargs)
+        return _reponse_conditionnelle(response, etag, derniere_modification)
+
+    return inner
@@ -0,0 +1,242 @@
+"""
+Export des demandes d'adoption (admin) en CSV ou XLSX, en flux.
+
+La réponse part avant la première requête SQL : les demandes sont ensuite
+lues par lots paginés sur la clé primaire (mémoire bornée, y compris sur
+MySQL dont le connecteur charge tout le résultat d'une requête), chaque lot
+est encodé et envoyé aussitôt. Sous ASGI, le flux est un générateur
+async : StreamingHttpResponse lirait un générateur synchrone en entier
+avant d'envoyer le premier octet.
+
+Le XLSX (une feuille, textes en ligne) est écrit directement dans un zip
+en flux : ni dépendance, ni fichier temporaire.
+"""
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+TAILLE_LOT = 2000
+
+COLONNES = [
+    ('N°', lambda d: d.pk),
+    ('Date de demande', lambda d: timezone.localtime(d.date_demande).strftime('%d/%m/%Y %H:%M')),
+    ('Statut', lambda d: d.get_statut_display()),
+    ('Traitée', lambda d: 'Oui' if d.traitee else 'Non'),
+    ('Animal', lambda d: d.animal.nom),
+    ('Espèce', lambda d: d.animal.get_espece_display()),
+    ('Nom complet', lambda d: d.nom_complet),
+    ('Email', lambda d: d.email),
+    ('Téléphone', lambda d: d.telephone),
+    ('Adresse', lambda d: d.adresse),
+    ('Compte', lambda d: d.utilisateur.email),
+    ('Type de logement', lambda d: d.get_type_logement_display()),
+    ('Statut du logement', lambda d: d.get_statut_logement_display()),
+    ('Autres animaux', lambda d: 'Oui' if d.a_autres_animaux else 'Non'),
+    ('Détails autres animaux', lambda d: d.details_autres_animaux),
+    ('Motivation', lambda d: d.motivation),
+    ('Disponibilité', lambda d: d.get_disponibilite_display()),
+    ('Précisions disponibilité', lambda d: d.precisions_disponibilite),
+    ('Notes admin', lambda d: d.notes_admin),
+]
+
+
+def _lot(queryset, dernier, taille_lot):
+    """Demandes suivant la clé primaire `dernier` (les plus récentes d'abord)"""
+    if dernier is not None:
+        queryset = queryset.filter(pk__lt=dernier)
+    return list(queryset.order_by('-pk')[:taille_lot].iterator(chunk_size=taille_lot))
+
+
+def flux(queryset, encodeur, taille_lot=TAILLE_LOT):
+    """Contenu de la réponse (WSGI) : en-tête, un morceau par lot, fin du fichier"""
+    yield encodeur.debut()
+    dernier = None
+    while lot := _lot(queryset, dernier, taille_lot):
+        yield encodeur.lignes([[valeur(demande) for _, valeur in COLONNES] for demande in lot])
+        dernier = lot[-1].pk
+    yield encodeur.fin()
+
+
+async def aflux(queryset, encodeur, taille_lot=TAILLE_LOT):
+    """Équivalent de flux() pour ASGI : chaque lot est lu dans un thread"""
+    yield encodeur.debut()
+    lire = sync_to_async(_lot)
+    dernier = None
+    while lot := await lire(queryset, dernier, taille_lot):
+        yield encodeur.lignes([[valeur(demande) for _, valeur in COLONNES] for demande in lot])
+        dernier = lot[-1].pk
+    yield encodeur.fin()
+
+
+# ========== CSV ==========
+
+class _Echo:
+    """Pseudo-fichier : csv.writer renvoie la ligne au lieu de l'écrire"""
+
+    def write(self, valeur):
+        return valeur
+
+
+class EncodeurCSV:
+    extension = 'csv'
+    type_contenu = 'text/csv; charset=utf-8'
+
+    def __init__(self):
+        # Point-virgule et BOM : ouvert tel quel par Excel en français
+        self.writer = csv.writer(_Echo(), delimiter=';')
+
+    def debut(self):
+        return ('\ufeff' + self.writer.writerow([titre for titre, _ in COLONNES])).encode()
+
+    def lignes(self, lignes):
+        return ''.join(self.writer.writerow([self._cellule(valeur) for valeur in ligne]) for ligne in lignes).encode()
+
+    def fin(self):
+        return b''
+
+    @staticmethod
+    def _cellule(valeur):
+        # Texte saisi par le demandeur : pas interprété comme une formule par le tableur
+        if isinstance(valeur, str) and valeur[:1] in ('=', '+', '-', '@', '\t', '\r'):
+            return "'" + valeur
+        return valeur
+
+
+# ========== XLSX ==========
+
+_CARACTERES_INTERDITS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_FICHIERS_XLSX = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Demandes" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class _Tampon:
+    """Fichier non positionnable : zipfile y écrit, l'encodeur le vide après chaque lot"""
+
+    def __init__(self):
+        self.morceaux = []
+
+    def write(self, donnees):
+        self.morceaux.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        donnees = b''.join(self.morceaux)
+        self.morceaux.clear()
+        return donnees
+
+
+def _colonne(index):
+    """0 → A, 25 → Z, 26 → AA"""
+    lettres = ''
+    index += 1
+    while index:
+        index, reste = divmod(index - 1, 26)
+        lettres = chr(ord('A') + reste) + lettres
+    return lettres
+
+
+class EncodeurXLSX:
+    extension = 'xlsx'
+    type_contenu = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def __init__(self):
+        self.tampon = _Tampon()
+        self.colonnes = [_colonne(index) for index in range(len(COLONNES))]
+        self.numero = 0
+
+    def debut(self):
+        # Compression rapide : l'export est limité par le processeur, pas par le réseau
+        self.zip = zipfile.ZipFile(self.tampon, 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+        for nom, contenu in _FICHIERS_XLSX.items():
+            self.zip.writestr(nom, contenu)
+        # Taille inconnue à l'avance : ZIP64 au cas où la feuille dépasse 4 Go
+        self.feuille = self.zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True)
+        self.feuille.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            # Ligne des titres figée
+            b'<sheetViews><sheetView workbookViewId="0">'
+            b'<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+            b'</sheetView></sheetViews><sheetData>'
+        )
+        self.feuille.write(self._ligne([titre for titre, _ in COLONNES]))
+        return self.tampon.vider()
+
+    def lignes(self, lignes):
+        self.feuille.write(b''.join(self._ligne(ligne) for ligne in lignes))
+        return self.tampon.vider()
+
+    def fin(self):
+        self.feuille.write(b'</sheetData></worksheet>')
+        self.feuille.close()
+        self.zip.close()
+        return self.tampon.vider()
+
+    def _ligne(self, valeurs):
+        self.numero += 1
+        cellules = []
+        for colonne, valeur in zip(self.colonnes, valeurs):
+            reference = f'{colonne}{self.numero}'
+            if isinstance(valeur, int) and not isinstance(valeur, bool):
+                cellules.append(f'<c r="{reference}"><v>{valeur}</v></c>')
+            else:
+                texte = escape(_CARACTERES_INTERDITS.sub('', str(valeur)))
+                cellules.append(f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{texte}</t></is></c>')
+        return f'<row r="{self.numero}">{"".join(cellules)}</row>'.encode()
+
+
+FORMATS = {encodeur.extension: encodeur for encodeur in (EncodeurCSV, EncodeurXLSX)}
+
+
+def reponse(request, queryset, extension):
+    """Téléchargement des demandes de `queryset` au format `extension` (csv ou xlsx)"""
+    encodeur = FORMATS[extension]()
+    contenu = (aflux if isinstance(request, ASGIRequest) else flux)(queryset, encodeur)
+    response = StreamingHttpResponse(contenu, content_type=encodeur.type_contenu)
+    horodatage = timezone.localtime().strftime('%Y%m%d-%H%M')
+    response['Content-Disposition'] = f'attachment; filename="demandes-adoption-{horodatage}.{extension}"'
+    return response
@@ -1,5 +1,5 @@
 from django import forms
-from .models import DemandeAdoption
+from .models import Animal, DemandeAdoption
 
 class DemandeAdoptionForm(forms.ModelForm):
     """Formulaire de demande d'adoption"""
@@ -106,3 +106,27 @@ class DemandeAdoptionForm(forms.ModelForm):
         if not disponibilite:
             raise forms.ValidationError("Veuillez indiquer quand vous pouvez venir.")
         return disponibilite
+
+
+class FiltreAnimauxForm(forms.Form):
+    """Filtres de la page Nos animaux (transmis en paramètres GET)"""
+
+    nom = forms.CharField(required=False, max_length=100)
+    espece = forms.MultipleChoiceField(choices=Animal.ESPECE_CHOICES, required=False)
+    sexe = forms.ChoiceField(choices=Animal.SEXE_CHOICES, required=False)
+    age = forms.ChoiceField(choices=Animal.CATEGORIE_AGE_CHOICES, required=False)
+
+    def filtrer(self, animaux):
+        """Applique les filtres valides au queryset (les valeurs invalides sont ignorées)"""
+        self.is_valid()
+        filtres = self.cleaned_data
+
+        if filtres.get('nom'):
+            animaux = animaux.filter(nom__icontains=filtres['nom'].strip())
+        if filtres.get('espece'):
+            animaux = animaux.filter(espece__in=filtres['espece'])
+        if filtres.get('sexe'):
+            animaux = animaux.filter(sexe=filtres['sexe'])
+        if filtres.get('age'):
+            animaux = animaux.filter(categorie_age=filtres['age'])
+        return animaux
@@ -0,0 +1,147 @@
+"""
+Génération des variantes responsives (AVIF / WebP / JPEG) des images.
+
+Les photos des animaux sont déclinées en plusieurs largeurs au moment de
+l'enregistrement ; les templates choisissent ensuite la bonne variante via
+srcset/sizes (voir templatetags/images_responsives.py).
+"""
+import json
+import logging
+from io import BytesIO
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Largeurs générées (px) : carte mobile → fiche détaillée sur écran haute densité
+LARGEURS_VARIANTES = (320, 640, 960, 1280)
+
+# Format → (extension, type MIME, options d'enregistrement Pillow)
+# L'ordre compte : du plus léger au plus compatible (le JPEG sert de repli)
+FORMATS_VARIANTES = {
+    'avif': ('avif', 'image/avif', {'quality': 50}),
+    'webp': ('webp', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('jpg', 'image/jpeg', {'quality': 78, 'optimize': True, 'progressive': True}),
+}
+
+# Variantes des images fournies avec l'application (générées par la commande
+# generer_variantes_images, non versionnées)
+DOSSIER_IMAGES_STATIQUES = Path(__file__).resolve().parent / 'static' / 'animaux' / 'images'
+DOSSIER_VARIANTES_STATIQUES = DOSSIER_IMAGES_STATIQUES / 'variantes'
+MANIFESTE_VARIANTES_STATIQUES = DOSSIER_VARIANTES_STATIQUES / 'variantes.json'
+
+
+def formats_disponibles():
+    """Formats gérés par le Pillow installé (AVIF/WebP dépendent de la compilation)"""
+    return [fmt for fmt in FORMATS_VARIANTES if fmt == 'jpeg' or features.check(fmt)]
+
+
+def _preparer_pour(image, fmt):
+    """Le JPEG ne gère pas la transparence : on aplatit sur fond blanc"""
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            fond = Image.new('RGB', image.size, (255, 255, 255))
+            fond.paste(image, mask=image.getchannel('A'))
+            return fond
+        return image.convert('RGB')
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def generer_variantes(fichier, nom_base, storage):
+    """
+    Redimensionne l'image `fichier` à chaque largeur de LARGEURS_VARIANTES
+    (sans jamais l'agrandir) et l'enregistre dans `storage` sous
+    `<nom_base>-<largeur>w.<ext>` pour chaque format disponible.
+
+    Retourne les métadonnées stockées sur le modèle :
+    {'largeur', 'hauteur', 'variantes': [{'format', 'largeur', 'hauteur', 'nom', 'taille'}]}
+    """
+    with Image.open(fichier) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    largeur, hauteur = image.size
+    largeurs = [l for l in LARGEURS_VARIANTES if l < largeur] or [largeur]
+    variantes = []
+
+    for largeur_cible in largeurs:
+        hauteur_cible = max(1, round(hauteur * largeur_cible / largeur))
+        redimensionnee = image.resize((largeur_cible, hauteur_cible), Image.Resampling.LANCZOS)
+
+        for fmt in formats_disponibles():
+            extension, _, options = FORMATS_VARIANTES[fmt]
+            tampon = BytesIO()
+            _preparer_pour(redimensionnee, fmt).save(tampon, format=fmt.upper(), **options)
+            nom = storage.save(
+                f"{nom_base}-{largeur_cible}w.{extension}",
+                ContentFile(tampon.getvalue()),
+            )
+            variantes.append({
+                'format': fmt,
+                'largeur': largeur_cible,
+                'hauteur': hauteur_cible,
+                'nom': nom,
+                'taille': tampon.tell(),
+            })
+
+    return {'largeur': largeur, 'hauteur': hauteur, 'variantes': variantes}
+
+
+def generer_variantes_photo(photo):
+    """
+    Variantes d'une photo d'animal (FieldFile), stockées à côté de l'original
+    dans `animaux/variantes/`. Retourne None si le fichier est introuvable.
+    """
+    if not photo or not photo.storage.exists(photo.name):
+        return None
+
+    nom_base = f"animaux/variantes/{Path(photo.name).stem}"
+    with photo.storage.open(photo.name, 'rb') as fichier:
+        metadonnees = generer_variantes(fichier, nom_base, photo.storage)
+    metadonnees['source'] = photo.name
+    return metadonnees
+
+
+def supprimer_variantes(metadonnees, storage):
+    """Supprime les fichiers d'anciennes variantes (photo remplacée ou animal supprimé)"""
+    for variante in (metadonnees or {}).get('variantes', []):
+        try:
+            storage.delete(variante['nom'])
+        except OSError:
+            logger.warning("Variante introuvable : %s", variante['nom'])
+
+
+def generer_variantes_statiques(noms):
+    """
+    Variantes des images statiques `noms` (chemins relatifs à static/animaux/images).
+    Écrit un manifeste JSON lu par la balise {% image_statique %}.
+    """
+    storage = FileSystemStorage(
+        location=DOSSIER_VARIANTES_STATIQUES,
+        base_url=None,
+        allow_overwrite=True,
+    )
+    manifeste = {}
+    for nom in noms:
+        with open(DOSSIER_IMAGES_STATIQUES / nom, 'rb') as fichier:
+            metadonnees = generer_variantes(fichier, Path(nom).stem, storage)
+        for variante in metadonnees['variantes']:
+            variante['nom'] = f"animaux/images/variantes/{variante['nom']}"
+        manifeste[f"animaux/images/{nom}"] = metadonnees
+
+    MANIFESTE_VARIANTES_STATIQUES.write_text(json.dumps(manifeste, indent=2))
+    return manifeste
+
+
+def charger_manifeste_statique():
+    """Manifeste des variantes statiques ({} s'il n'a pas encore été généré)"""
+    try:
+        return json.loads(MANIFESTE_VARIANTES_STATIQUES.read_text())
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from animaux.images import DOSSIER_IMAGES_STATIQUES, generer_variantes_statiques
+from animaux.models import Animal
+
+EXTENSIONS_IMAGES = ('.png', '.jpg', '.jpeg')
+
+
+class Command(BaseCommand):
+    help = "Génère les variantes responsives (AVIF/WebP/JPEG) des photos d'animaux et des images statiques"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--animaux', action='store_true',
+            help="Uniquement les photos des animaux",
+        )
+        parser.add_argument(
+            '--statiques', action='store_true',
+            help="Uniquement les images de static/animaux/images",
+        )
+        parser.add_argument(
+            '--forcer', action='store_true',
+            help="Régénère aussi les photos qui ont déjà leurs variantes",
+        )
+
+    def handle(self, *args, **options):
+        tout = not options['animaux'] and not options['statiques']
+
+        if tout or options['animaux']:
+            self.generer_animaux(options['forcer'])
+        if tout or options['statiques']:
+            self.generer_statiques()
+
+    def generer_animaux(self, forcer):
+        total = 0
+        for animal in Animal.objects.exclude(photo='').iterator(chunk_size=200):
+            if forcer or animal.photo_variantes.get('source') != animal.photo.name:
+                animal.generer_variantes_photo()
+                total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} photo(s) d'animaux traitée(s)."))
+
+    def generer_statiques(self):
+        noms = sorted(
+            chemin.name for chemin in DOSSIER_IMAGES_STATIQUES.iterdir()
+            if chemin.suffix.lower() in EXTENSIONS_IMAGES
+        )
+        manifeste = generer_variantes_statiques(noms)
+
+        avant = sum((DOSSIER_IMAGES_STATIQUES / nom).stat().st_size for nom in noms)
+        apres = sum(min(v['taille'] for v in meta['variantes']) for meta in manifeste.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(noms)} image(s) statique(s) traitée(s) : {avant / 1e6:.1f} Mo d'originaux, "
+            f"{apres / 1e6:.2f} Mo pour la plus petite variante de chacune."
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from animaux import statistiques
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule le résumé des demandes d'adoption (tableau de bord de l'admin) "
+        "à partir de toutes les demandes : après un import, une génération de données "
+        "ou une suppression en cascade"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=statistiques.TAILLE_LOT)
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        lignes = statistiques.reconstruire(taille_lot=options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{lignes} ligne(s) de statistiques reconstruite(s) en {time.perf_counter() - debut:.1f} s."
+        ))
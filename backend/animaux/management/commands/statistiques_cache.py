@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from animaux.cache import reinitialiser_statistiques, statistiques
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche les hits/misses du cache de pages publiques "
+        "(compteurs partagés seulement si le backend de cache l'est)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reinitialiser', action='store_true',
+            help="Remet les compteurs à zéro après affichage",
+        )
+
+    def handle(self, *args, **options):
+        stats = statistiques()
+        self.stdout.write(
+            f"Hits : {stats['hits']}  |  Misses : {stats['misses']}  |  "
+            f"Taux de succès : {stats['taux']:.1%}"
+        )
+        if options['reinitialiser']:
+            reinitialiser_statistiques()
+            self.stdout.write(self.style.SUCCESS("Compteurs réinitialisés."))
@@ -0,0 +1,217 @@
+import asyncio
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Mode → (application, options uvicorn, ASYNC_VIEWS)
+MODES = {
+    'wsgi': ('config.wsgi:application', ['--interface', 'wsgi'], '0'),
+    'asgi': ('config.asgi:application', [], '1'),
+}
+
+SERVEURS = ['uvicorn', 'gunicorn']
+
+URLS_PAR_DEFAUT = ['/', '/nos-animaux/', '/nos-animaux/?espece=CHAT', '/a-propos/']
+
+
+async def _lire_reponse(reader):
+    """Statut d'une réponse HTTP/1.1 et si la connexion peut resservir"""
+    entetes = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    statut = int(entetes[0].split()[1])
+    longueur = None
+    fermee = False
+    for ligne in entetes[1:]:
+        nom, _, valeur = ligne.partition(':')
+        if nom.lower() == 'content-length':
+            longueur = int(valeur)
+        elif nom.lower() == 'connection':
+            # Workers synchrones de Gunicorn : une requête par connexion
+            fermee = valeur.strip().lower() == 'close'
+    if longueur is None and statut != 304:
+        await reader.read()
+        return statut, False
+    if longueur:
+        await reader.readexactly(longueur)
+    return statut, not fermee
+
+
+async def _client(port, urls, fin, mesures, erreurs):
+    """Un client = une connexion keep-alive qui enchaîne les requêtes"""
+    reader = writer = None
+    while time.monotonic() < fin:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            debut = time.perf_counter()
+            writer.write(f"GET {next(urls)} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            await writer.drain()
+            statut, reutilisable = await _lire_reponse(reader)
+            mesures.append(time.perf_counter() - debut)
+            if statut >= 400:
+                erreurs.append(statut)
+            if not reutilisable:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            erreurs.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _charger(port, urls, concurrence, duree):
+    mesures, erreurs = [], []
+    fin = time.monotonic() + duree
+    urls = itertools.cycle(urls)
+    await asyncio.gather(*(_client(port, urls, fin, mesures, erreurs) for _ in range(concurrence)))
+    return mesures, erreurs
+
+
+def _port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _commande(serveur, mode, port, workers):
+    """Ligne de commande du serveur : uvicorn seul, ou Gunicorn préchargé (gunicorn.conf.py)"""
+    if serveur == 'gunicorn':
+        return [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning',
+        ]
+    application, arguments, _ = MODES[mode]
+    return [
+        sys.executable, '-m', 'uvicorn', application, *arguments,
+        '--port', str(port), '--workers', str(workers),
+        '--log-level', 'warning', '--no-access-log',
+    ]
+
+
+def _lire_proc(pid, fichier, champ):
+    """Valeur en ko d'un champ de /proc/<pid>/<fichier> (Linux) ; None si indisponible"""
+    try:
+        with open(f'/proc/{pid}/{fichier}') as contenu:
+            for ligne in contenu:
+                if ligne.startswith(champ + ':'):
+                    return int(ligne.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _memoire_workers(pid):
+    """
+    (RSS, PSS) moyens en Mo des processus qui servent les requêtes : les enfants
+    de `pid`, ou `pid` lui-même s'il n'en a pas. Le PSS répartit les pages
+    partagées (copie sur écriture) entre les processus qui les utilisent.
+    """
+    enfants = []
+    for entree in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not entree.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entree}/stat') as stat:
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{entree}/cmdline', 'rb') as cmdline:
+                # Processus auxiliaire de multiprocessing (uvicorn --workers)
+                auxiliaire = b'resource_tracker' in cmdline.read()
+        except (OSError, ValueError, IndexError):
+            continue
+        if parent == pid and not auxiliaire:
+            enfants.append(int(entree))
+
+    mesures = [
+        (_lire_proc(processus, 'status', 'VmRSS'), _lire_proc(processus, 'smaps_rollup', 'Pss'))
+        for processus in enfants or [pid]
+    ]
+    if not mesures or any(rss is None for rss, _ in mesures):
+        return None, None
+    pss = None if any(p is None for _, p in mesures) else statistics.fmean(p for _, p in mesures) / 1024
+    return statistics.fmean(rss for rss, _ in mesures) / 1024, pss
+
+
+def _attendre_serveur(port, processus, delai=30):
+    limite = time.monotonic() + delai
+    while time.monotonic() < limite:
+        if processus.poll() is not None:
+            raise CommandError("Le serveur s'est arrêté au démarrage (uvicorn / gunicorn est-il installé ?)")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Le serveur n'a pas démarré en {delai} s")
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge : débit, latences et mémoire par worker des pages publiques servies "
+        "en WSGI (vues synchrones) et en ASGI (vues async), par uvicorn seul et par Gunicorn préchargé"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrence', type=int, default=50, help="Connexions simultanées (défaut : 50)")
+        parser.add_argument('--duree', type=float, default=10, help="Durée de chaque mesure en secondes (défaut : 10)")
+        parser.add_argument('--workers', type=int, default=1, help="Processus du serveur (défaut : 1)")
+        parser.add_argument('--url', action='append', dest='urls', help="Chemin à charger (répétable)")
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--serveurs', nargs='+', choices=SERVEURS, default=SERVEURS)
+        parser.add_argument(
+            '--sans-cache', action='store_true',
+            help="Ajoute un paramètre unique à chaque URL pour contourner le cache de pages",
+        )
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or URLS_PAR_DEFAUT
+        if options['sans_cache']:
+            urls = [
+                f"{url}{'&' if '?' in url else '?'}_={i}"
+                for i, url in enumerate(urls * 250)
+            ]
+
+        self.stdout.write(
+            f"{options['concurrence']} connexions, {options['duree']:g} s par mode, "
+            f"{options['workers']} worker(s)\n"
+        )
+        for serveur in options['serveurs']:
+            for mode in options['modes']:
+                self._mesurer(serveur, mode, urls, options)
+
+    def _mesurer(self, serveur, mode, urls, options):
+        port = _port_libre()
+        env = {**os.environ, 'ASYNC_VIEWS': MODES[mode][2], 'SERVEUR_INTERFACE': mode}
+        processus = subprocess.Popen(
+            _commande(serveur, mode, port, options['workers']), cwd=settings.BASE_DIR, env=env,
+        )
+        try:
+            _attendre_serveur(port, processus)
+            # Échauffement : remplit les caches et ouvre les connexions à la base
+            asyncio.run(_charger(port, urls, min(options['concurrence'], 4), 1))
+            mesures, erreurs = asyncio.run(
+                _charger(port, urls, options['concurrence'], options['duree'])
+            )
+            rss, pss = _memoire_workers(processus.pid)
+        finally:
+            processus.terminate()
+            processus.wait()
+
+        if not mesures:
+            raise CommandError(f"{serveur} {mode} : aucune réponse reçue")
+
+        centiles = statistics.quantiles(mesures, n=100)
+        memoire = "mémoire n/d" if rss is None else f"RSS {rss:5.1f} Mo" + (f"  PSS {pss:5.1f} Mo" if pss else "")
+        self.stdout.write(
+            f"{serveur:8} {mode.upper():5} {len(mesures) / options['duree']:8.1f} req/s  |  "
+            f"p50 {centiles[49] * 1000:6.1f} ms  p95 {centiles[94] * 1000:6.1f} ms  "
+            f"p99 {centiles[98] * 1000:6.1f} ms  |  {memoire} par worker  |  erreurs : {len(erreurs)}"
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animaux', '0006_demandeadoption_utilisateur'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['disponible', 'espece', 'sexe', 'categorie_age', 'date_arrivee'], name='animal_catalogue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['disponible', 'date_arrivee'], name='animal_dispo_arrivee_idx'),
+        ),
+    ]
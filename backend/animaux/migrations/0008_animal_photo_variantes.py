@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animaux', '0007_animal_index_catalogue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='photo_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes de la photo'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 11:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animaux', '0008_animal_photo_variantes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animal',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Dernière modification'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['disponible', 'date_modification'], name='animal_dispo_modif_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-18 08:26
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def initialiser_statistiques(apps, schema_editor):
+    """Résumé des demandes existantes : aucune n'a encore de date de décision"""
+    DemandeAdoption = apps.get_model('animaux', 'DemandeAdoption')
+    StatistiqueDemandes = apps.get_model('animaux', 'StatistiqueDemandes')
+    nombres = Counter()
+    demandes = DemandeAdoption.objects.values_list('date_demande', 'animal__espece', 'type_logement', 'statut')
+    for date_demande, espece, type_logement, statut in demandes.iterator(chunk_size=5000):
+        mois = timezone.localtime(date_demande).date().replace(day=1)
+        nombres[(mois, espece, type_logement, statut)] += 1
+    StatistiqueDemandes.objects.bulk_create(
+        StatistiqueDemandes(mois=mois, espece=espece, type_logement=type_logement, statut=statut, nombre=nombre)
+        for (mois, espece, type_logement, statut), nombre in nombres.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animaux', '0009_animal_date_modification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandeadoption',
+            name='date_decision',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Date de la décision'),
+        ),
+        migrations.CreateModel(
+            name='StatistiqueDemandes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField(verbose_name='Mois de la demande')),
+                ('espece', models.CharField(choices=[('CHIEN', 'Chien'), ('CHAT', 'Chat')], max_length=10, verbose_name='Espèce')),
+                ('type_logement', models.CharField(choices=[('MAISON_JARDIN', 'Maison avec jardin'), ('MAISON_SANS_JARDIN', 'Maison sans jardin'), ('APPARTEMENT_BALCON', 'Appartement avec balcon'), ('APPARTEMENT_SANS_BALCON', 'Appartement sans balcon')], max_length=30, verbose_name='Type de logement')),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('ACCEPTEE', 'Acceptée'), ('REFUSEE', 'Refusée')], max_length=20, verbose_name='Statut de la demande')),
+                ('nombre', models.IntegerField(default=0, verbose_name='Demandes')),
+                ('decisions', models.IntegerField(default=0, verbose_name='Décisions datées')),
+                ('delai_decision', models.BigIntegerField(default=0, verbose_name='Délai de décision cumulé (s)')),
+            ],
+            options={
+                'verbose_name': 'Statistique des demandes',
+                'verbose_name_plural': 'Statistiques des demandes',
+                'unique_together': {('mois', 'espece', 'type_logement', 'statut')},
+            },
+        ),
+        migrations.RunPython(initialiser_statistiques, migrations.RunPython.noop),
+    ]
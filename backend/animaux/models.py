@@ -1,4 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+
+from .cache import invalider_apres_commit
+from .images import generer_variantes_photo, supprimer_variantes
 
 class Animal(models.Model):
     """Modèle représentant un animal"""
@@ -36,17 +40,70 @@ class Animal(models.Model):
     race = models.CharField(max_length=100, blank=True, verbose_name="Race")
     description = models.TextField(verbose_name="Description")
     photo = models.ImageField(upload_to='animaux/', verbose_name="Photo")
+    # Métadonnées des variantes redimensionnées (AVIF/WebP/JPEG), voir images.py
+    photo_variantes = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes de la photo")
     date_arrivee = models.DateField(auto_now_add=True, verbose_name="Date d'arrivée")
     disponible = models.BooleanField(default=True, verbose_name="Disponible à l'adoption")
+    # Sert de validateur HTTP (ETag / Last-Modified) pour le catalogue et les fiches
+    date_modification = models.DateTimeField(auto_now=True, verbose_name="Dernière modification")
 
     class Meta:
         verbose_name = "Animal"
         verbose_name_plural = "Animaux"
         ordering = ['-date_arrivee']
+        indexes = [
+            # Catalogue filtré (disponible + espèce/sexe/âge, trié par arrivée)
+            models.Index(
+                fields=['disponible', 'espece', 'sexe', 'categorie_age', 'date_arrivee'],
+                name='animal_catalogue_idx',
+            ),
+            # Catalogue sans filtre
+            models.Index(fields=['disponible', 'date_arrivee'], name='animal_dispo_arrivee_idx'),
+            # MAX(date_modification) des animaux visibles (requêtes conditionnelles)
+            models.Index(fields=['disponible', 'date_modification'], name='animal_dispo_modif_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nom} ({self.get_espece_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        animal = super().from_db(db, field_names, values)
+        # Espèce en base : si save() la change, les demandes changent de ligne dans les statistiques
+        animal._espece_en_base = animal.__dict__.get('espece')
+        return animal
+
+    def save(self, *args, **kwargs):
+        ancienne_espece = getattr(self, '_espece_en_base', None)
+        if self._state.adding or ancienne_espece in (None, self.espece):
+            super().save(*args, **kwargs)
+        else:
+            from . import statistiques
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                statistiques.changer_espece(self, ancienne_espece)
+        self._espece_en_base = self.espece
+        # Nouvelle photo → ses variantes responsives sont générées en arrière-plan (taches.py)
+        if self.photo and self.photo_variantes.get('source') != self.photo.name:
+            from .taches import programmer_variantes
+            programmer_variantes(self)
+
+    def generer_variantes_photo(self):
+        """Génère les variantes de la photo et les enregistre sans repasser par save()"""
+        anciennes = self.photo_variantes
+        metadonnees = generer_variantes_photo(self.photo)
+        if metadonnees is None:
+            return
+        supprimer_variantes(anciennes, self.photo.storage)
+        self.photo_variantes = metadonnees
+        self.date_modification = timezone.now()
+        Animal.objects.filter(pk=self.pk).update(
+            photo_variantes=metadonnees,
+            date_modification=self.date_modification,
+        )
+        # update() n'émet pas post_save : pages en cache (sans srcset) invalidées ici
+        invalider_apres_commit('catalogue', f'animal:{self.pk}')
+
     def get_age_display(self):
         """Retourne l'âge formaté (ex: '1 an', '10 mois', '5 ans')"""
         if self.age_annees == 0:
@@ -207,6 +264,14 @@ class DemandeAdoption(models.Model):
         verbose_name="Demande traitée"
     )
 
+    # Acceptation ou refus : sert au délai de décision (statistiques.py)
+    date_decision = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Date de la décision"
+    )
+
     notes_admin = models.TextField(
         blank=True,
         verbose_name="Notes administrateur (privé)"
@@ -220,3 +285,32 @@ class DemandeAdoption(models.Model):
 
     def __str__(self):
         return f"Demande de {self.nom_complet} pour {self.animal.nom} ({self.date_demande.strftime('%d/%m/%Y')})"
+
+
+class StatistiqueDemandes(models.Model):
+    """
+    Résumé des demandes d'adoption, tenu à jour à chaque création ou
+    changement de statut (voir statistiques.py) : le tableau de bord ne lit
+    que cette table, quelques lignes par mois quel que soit le nombre de demandes.
+    """
+
+    mois = models.DateField(verbose_name="Mois de la demande")
+    espece = models.CharField(max_length=10, choices=Animal.ESPECE_CHOICES, verbose_name="Espèce")
+    type_logement = models.CharField(
+        max_length=30, choices=DemandeAdoption.TYPE_LOGEMENT_CHOICES, verbose_name="Type de logement",
+    )
+    statut = models.CharField(
+        max_length=20, choices=DemandeAdoption.STATUT_DEMANDE_CHOICES, verbose_name="Statut de la demande",
+    )
+    nombre = models.IntegerField(default=0, verbose_name="Demandes")
+    # Demandes décidées dont la date de décision est connue, et somme de leurs délais
+    decisions = models.IntegerField(default=0, verbose_name="Décisions datées")
+    delai_decision = models.BigIntegerField(default=0, verbose_name="Délai de décision cumulé (s)")
+
+    class Meta:
+        verbose_name = "Statistique des demandes"
+        verbose_name_plural = "Statistiques des demandes"
+        unique_together = [['mois', 'espece', 'type_logement', 'statut']]
+
+    def __str__(self):
+        return f"{self.mois:%m/%Y} {self.espece} {self.type_logement} {self.statut} : {self.nombre}"
@@ -0,0 +1,128 @@
+"""
+Traitement des demandes d'adoption (acceptation / refus) par lots.
+
+Les opérations sont ensemblistes et transactionnelles : le nombre de requêtes
+ne dépend pas du nombre de demandes traitées, et les animaux concernés sont
+verrouillés (select_for_update) pour que deux membres de l'équipe qui cliquent
+en même temps ne puissent pas faire adopter le même animal deux fois.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import statistiques
+from .cache import invalider_apres_commit
+from .models import Animal, DemandeAdoption
+
+# acceptees / refusees : lignes modifiées ; ignorees : demandes du lot laissées telles quelles
+ResultatTraitement = namedtuple('ResultatTraitement', ['acceptees', 'refusees', 'ignorees'])
+
+
+def _identifiants(demandes):
+    """Queryset ou liste d'identifiants → liste d'identifiants"""
+    if isinstance(demandes, QuerySet):
+        return list(demandes.values_list('pk', flat=True))
+    return list(demandes)
+
+
+def _verrouiller(demandes, *autres_champs):
+    """(pk, *statistiques.ETAT, *autres_champs) des demandes du queryset, verrouillées jusqu'à la fin de la transaction"""
+    # of=self : la jointure sur l'animal (espèce) ne le verrouille pas
+    return list(demandes.select_for_update(of=('self',)).values_list('pk', *statistiques.ETAT, *autres_champs))
+
+
+def _changer_statut(lignes, statut, date_decision):
+    """
+    Modifie les demandes verrouillées `lignes` ; renvoie le nombre de lignes
+    modifiées et leurs états avant / après pour statistiques.enregistrer()
+    """
+    if not lignes:
+        return 0, [], []
+    modifiees = DemandeAdoption.objects.filter(pk__in=[ligne[0] for ligne in lignes]).update(
+        statut=statut, traitee=statut != 'EN_ATTENTE', date_decision=date_decision,
+    )
+    avant = [ligne[1:] for ligne in lignes]
+    return modifiees, avant, statistiques.avec_statut(avant, statut, date_decision)
+
+
+def accepter_demandes(demandes):
+    """
+    Accepte un lot de demandes en une transaction.
+
+    Pour chaque animal encore disponible, la demande en attente la plus
+    ancienne du lot est acceptée, l'animal devient indisponible et toutes les
+    autres demandes en attente pour cet animal (du lot ou non) sont refusées.
+    Les demandes dont l'animal est déjà adopté sont ignorées.
+    """
+    ids = _identifiants(demandes)
+    if not ids:
+        return ResultatTraitement(0, 0, 0)
+
+    with transaction.atomic():
+        animaux_demandes = set(
+            DemandeAdoption.objects
+            .filter(pk__in=ids, statut='EN_ATTENTE')
+            .values_list('animal_id', flat=True)
+        )
+
+        # Verrou sur les animaux encore disponibles, toujours dans le même
+        # ordre (clé primaire) pour éviter les interblocages
+        disponibles = list(
+            Animal.objects.select_for_update()
+            .filter(pk__in=animaux_demandes, disponible=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+        # Relu après le verrou : une autre transaction a pu traiter ces demandes entre-temps
+        candidates = _verrouiller(
+            DemandeAdoption.objects
+            .filter(pk__in=ids, statut='EN_ATTENTE', animal_id__in=disponibles)
+            .order_by('date_demande', 'pk'),
+            'animal_id',
+        )
+        gagnantes = {}
+        for ligne in candidates:
+            gagnantes.setdefault(ligne[-1], ligne[:-1])
+
+        maintenant = timezone.now()
+        acceptees, avant, apres = _changer_statut(list(gagnantes.values()), 'ACCEPTEE', maintenant)
+        Animal.objects.filter(pk__in=gagnantes.keys()).update(
+            disponible=False, date_modification=maintenant,
+        )
+        refusees, avant_refus, apres_refus = _changer_statut(
+            _verrouiller(DemandeAdoption.objects.filter(animal_id__in=gagnantes.keys(), statut='EN_ATTENTE')),
+            'REFUSEE', maintenant,
+        )
+        statistiques.enregistrer(avant + avant_refus, apres + apres_refus)
+
+        # update() ne déclenche pas les signaux : invalidation explicite du cache de pages
+        if gagnantes:
+            invalider_apres_commit('catalogue', *(f'animal:{pk}' for pk in gagnantes))
+
+    # Ignorées : déjà traitées ou animal déjà adopté
+    return ResultatTraitement(acceptees, refusees, len(ids) - len(candidates))
+
+
+def refuser_demandes(demandes):
+    """Refuse les demandes encore en attente du lot (une seule requête UPDATE)"""
+    ids = _identifiants(demandes)
+    with transaction.atomic():
+        refusees, avant, apres = _changer_statut(
+            _verrouiller(DemandeAdoption.objects.filter(pk__in=ids, statut='EN_ATTENTE')), 'REFUSEE', timezone.now(),
+        )
+        statistiques.enregistrer(avant, apres)
+    return ResultatTraitement(0, refusees, len(ids) - refusees)
+
+
+def remettre_en_attente(demandes):
+    """Annule la décision des demandes acceptées ou refusées du lot ; renvoie le nombre de demandes modifiées"""
+    ids = _identifiants(demandes)
+    with transaction.atomic():
+        modifiees, avant, apres = _changer_statut(
+            _verrouiller(DemandeAdoption.objects.filter(pk__in=ids).exclude(statut='EN_ATTENTE')), 'EN_ATTENTE', None,
+        )
+        statistiques.enregistrer(avant, apres)
+    return modifiees
@@ -0,0 +1,40 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import statistiques
+from .cache import invalider_apres_commit
+from .images import supprimer_variantes
+from .models import Animal, DemandeAdoption
+
+
+@receiver([post_save, post_delete], sender=Animal)
+def invalider_pages_animal(sender, instance, **kwargs):
+    """Un animal ajouté/modifié/supprimé → catalogue + sa fiche"""
+    invalider_apres_commit('catalogue', f'animal:{instance.pk}')
+
+
+@receiver(post_delete, sender=Animal)
+def supprimer_variantes_animal(sender, instance, **kwargs):
+    """Animal supprimé → fichiers de ses variantes, une fois la suppression validée"""
+    transaction.on_commit(partial(supprimer_variantes, instance.photo_variantes, instance.photo.storage))
+
+
+@receiver([post_save, post_delete], sender=DemandeAdoption)
+def invalider_pages_demande(sender, instance, **kwargs):
+    """Une demande créée/traitée → fiche de l'animal concerné"""
+    invalider_apres_commit(f'animal:{instance.animal_id}')
+
+
+@receiver(pre_delete, sender=DemandeAdoption)
+def noter_demande_supprimee(sender, instance, origin=None, **kwargs):
+    """Demande supprimée (admin, cascade d'un animal ou d'un compte) → état retenu pour les statistiques"""
+    statistiques.noter_suppression(instance, origin)
+
+
+@receiver(post_delete, sender=DemandeAdoption)
+def retirer_demandes_statistiques(sender, instance, using, origin=None, **kwargs):
+    """Demandes supprimées → retirées du résumé, en une fois, dans la transaction de suppression"""
+    statistiques.enregistrer_suppressions(origin, using)
@@ -1,107 +1,122 @@
 document.addEventListener('DOMContentLoaded', function() {
 
     // ========== RÉCUPÉRATION DES ÉLÉMENTS ==========
-    const searchInput = document.getElementById('search-name');
-    const checkboxChien = document.getElementById('espece-chien');
-    const checkboxChat = document.getElementById('espece-chat');
-    const animalCards = document.querySelectorAll('.animal-card');
-    const btnRechercher = document.querySelector('.btn-rechercher');
+    // Le filtrage est fait côté serveur (paramètres GET + pagination).
+    // Sans JavaScript, le formulaire recharge simplement la page.
+    // Avec JavaScript, on récupère uniquement la grille (?fragment=1) et on la remplace.
+    const formulaire = document.getElementById('filtres-form');
+    const resultats = document.getElementById('resultats-animaux');
     const btnReinitialiser = document.querySelector('.btn-reinitialiser');
 
+    if (!formulaire || !resultats || !window.fetch) {
+        return;
+    }
 
-    // ========== FONCTION DE FILTRAGE ==========
-    function filtrerAnimaux() {
+    let requeteEnCours = null;
 
-        // 1. Récupérer les valeurs
-        const nomRecherche = searchInput.value.toLowerCase().trim();
-        const chienCoche = checkboxChien.checked;
-        const chatCoche = checkboxChat.checked;
 
-        const sexeRadio = document.querySelector('input[name="sexe"]:checked');
-        const ageRadio = document.querySelector('input[name="age"]:checked');
+    // ========== CHARGEMENT D'UNE PAGE DE RÉSULTATS ==========
+    function chargerResultats(url, ajouterHistorique) {
 
-        const sexeSelectionne = sexeRadio ? sexeRadio.value : 'tous';
-        const ageSelectionne = ageRadio ? ageRadio.value : 'tous';
+        // Annule la requête précédente si l'utilisateur enchaîne les clics
+        if (requeteEnCours) {
+            requeteEnCours.abort();
+        }
+        requeteEnCours = new AbortController();
 
+        const urlFragment = new URL(url, window.location.origin);
+        urlFragment.searchParams.set('fragment', '1');
 
-        // 2. Compteur
-        let compteur = 0;
+        resultats.classList.add('chargement');
 
-        // 3. Parcourir chaque carte
-        animalCards.forEach(card => {
-            const nom = card.dataset.nom || '';
-            const espece = card.dataset.espece || '';
-            const sexe = card.dataset.sexe || '';
-            const age = card.dataset.age || '';
+        fetch(urlFragment, { signal: requeteEnCours.signal })
+            .then(function(reponse) {
+                if (!reponse.ok) {
+                    throw new Error('Erreur ' + reponse.status);
+                }
+                return reponse.text();
+            })
+            .then(function(html) {
+                resultats.innerHTML = html;
+                resultats.classList.remove('chargement');
+
+                if (ajouterHistorique) {
+                    window.history.pushState({}, '', url);
+                }
+            })
+            .catch(function(erreur) {
+                if (erreur.name === 'AbortError') {
+                    return;
+                }
+                // En cas d'erreur, on retombe sur une navigation classique
+                window.location.href = url;
+            });
+    }
 
-            // Conditions de filtrage
-            const matchNom = nomRecherche === '' || nom.includes(nomRecherche);
-            const matchEspece = (espece === 'chien' && chienCoche) || (espece === 'chat' && chatCoche);
-            const matchSexe = sexeSelectionne === 'tous' || sexe === sexeSelectionne;
-            const matchAge = ageSelectionne === 'tous' || age === ageSelectionne;
+    // Construit l'URL de la page 1 à partir du formulaire
+    function urlDepuisFormulaire() {
+        const parametres = new URLSearchParams();
 
-            // Afficher ou masquer
-            if (matchNom && matchEspece && matchSexe && matchAge) {
-                card.style.display = 'block';
-                compteur++;
-            } else {
-                card.style.display = 'none';
+        new FormData(formulaire).forEach(function(valeur, cle) {
+            if (valeur.trim() !== '') {
+                parametres.append(cle, valeur.trim());
             }
         });
 
-        // Message "aucun résultat"
-        const grilleAnimaux = document.querySelector('.animaux-grid');
-        let messageAucunResultat = document.querySelector('.no-animals-filter');
-
-        if (compteur === 0) {
-            if (!messageAucunResultat) {
-                messageAucunResultat = document.createElement('div');
-                messageAucunResultat.className = 'no-animals-filter';
-                messageAucunResultat.textContent = 'Aucun animal ne correspond à vos critères';
-                grilleAnimaux.appendChild(messageAucunResultat);
-            }
-        } else {
-            if (messageAucunResultat) {
-                messageAucunResultat.remove();
-            }
-        }
+        const chaine = parametres.toString();
+        return formulaire.action + (chaine ? '?' + chaine : '');
     }
 
-    // ========== BOUTON RECHERCHER ==========
-    if (btnRechercher) {
-        btnRechercher.addEventListener('click', function(e) {
-            e.preventDefault();
-            filtrerAnimaux();
+    // Remet le formulaire dans l'état de l'URL courante (bouton précédent)
+    function synchroniserFormulaire() {
+        const parametres = new URLSearchParams(window.location.search);
+        const especes = parametres.getAll('espece');
+
+        formulaire.elements['nom'].value = parametres.get('nom') || '';
+
+        formulaire.querySelectorAll('input[name="espece"]').forEach(function(checkbox) {
+            checkbox.checked = especes.length === 0 || especes.includes(checkbox.value);
+        });
+
+        ['sexe', 'age'].forEach(function(nom) {
+            const valeur = parametres.get(nom) || '';
+            formulaire.querySelectorAll('input[name="' + nom + '"]').forEach(function(radio) {
+                radio.checked = radio.value === valeur;
+            });
         });
     }
 
+
+    // ========== BOUTON RECHERCHER ==========
+    formulaire.addEventListener('submit', function(e) {
+        e.preventDefault();
+        chargerResultats(urlDepuisFormulaire(), true);
+    });
+
     // ========== BOUTON RÉINITIALISER ==========
     if (btnReinitialiser) {
         btnReinitialiser.addEventListener('click', function(e) {
             e.preventDefault();
-
-            // Réinitialiser
-            checkboxChien.checked = true;
-            checkboxChat.checked = true;
-            searchInput.value = '';
-
-            document.querySelectorAll('input[type="radio"]').forEach(radio => {
-                if (radio.value === 'tous') {
-                    radio.checked = true;
-                }
-            });
-
-            // Afficher tous les animaux
-            animalCards.forEach(card => {
-                card.style.display = 'block';
-            });
-
-            // Supprimer le message "aucun résultat"
-            const noResultMsg = document.querySelector('.no-animals-filter');
-            if (noResultMsg) {
-                noResultMsg.remove();
-            }
+            window.history.pushState({}, '', btnReinitialiser.href);
+            synchroniserFormulaire();
+            chargerResultats(btnReinitialiser.href, false);
         });
     }
 
+    // ========== PAGINATION ==========
+    resultats.addEventListener('click', function(e) {
+        const lien = e.target.closest('.pagination a');
+        if (lien) {
+            e.preventDefault();
+            chargerResultats(lien.href, true);
+            resultats.scrollIntoView({ behavior: 'smooth', block: 'start' });
+        }
+    });
+
+    // ========== BOUTONS PRÉCÉDENT / SUIVANT DU NAVIGATEUR ==========
+    window.addEventListener('popstate', function() {
+        synchroniserFormulaire();
+        chargerResultats(window.location.href, false);
+    });
+
 });
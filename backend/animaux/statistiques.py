@@ -0,0 +1,247 @@
+"""
+Statistiques des demandes d'adoption, tenues à jour de façon incrémentale.
+
+Chaque création ou changement de statut de demandes, et chaque changement
+d'espèce d'un animal (Animal.save), appelle enregistrer(avant, apres) avec
+l'état (ETAT) des demandes concernées avant et après l'opération : la
+différence est reportée dans StatistiqueDemandes, dans la même transaction,
+en deux requêtes quel que soit le nombre de demandes. Le tableau de bord de
+l'admin ne lit que ce résumé.
+
+Les suppressions passent par les signaux pre_delete / post_delete
+(signals.py), donc aussi les cascades depuis un animal ou un compte. Seules
+les écritures SQL directes (bulk_create, update, _raw_delete) demandent un
+`manage.py reconstruire_statistiques`.
+"""
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from config import metriques
+
+from .models import Animal, DemandeAdoption, StatistiqueDemandes
+
+# État d'une demande vu par les statistiques (values_list)
+ETAT = ('date_demande', 'animal__espece', 'type_logement', 'statut', 'date_decision')
+CLE = ('mois', 'espece', 'type_logement', 'statut')
+DECISIONS = ('ACCEPTEE', 'REFUSEE')
+TAILLE_LOT = 5000
+
+
+def etats(demandes):
+    """États des demandes d'un queryset, à lire avant de les modifier"""
+    return list(demandes.values_list(*ETAT))
+
+
+def etat(demande):
+    return (demande.date_demande, demande.animal.espece, demande.type_logement, demande.statut, demande.date_decision)
+
+
+def avec_statut(etats, statut, date_decision=None):
+    """Mêmes demandes après un changement de statut"""
+    return [(date_demande, espece, type_logement, statut, date_decision)
+            for date_demande, espece, type_logement, _, _ in etats]
+
+
+def _ajouter(deltas, etats, signe):
+    """Contribution des demandes au résumé : [nombre, décisions datées, délai cumulé] par clé"""
+    for date_demande, espece, type_logement, statut, date_decision in etats:
+        mois = timezone.localtime(date_demande).date().replace(day=1)
+        delta = deltas[(mois, espece, type_logement, statut)]
+        delta[0] += signe
+        if statut in DECISIONS and date_decision is not None:
+            delta[1] += signe
+            delta[2] += signe * int((date_decision - date_demande).total_seconds())
+
+
+def _verrouiller(cles):
+    filtre = Q()
+    for cle in cles:
+        filtre |= Q(**dict(zip(CLE, cle)))
+    # Toujours dans le même ordre : pas d'interblocage entre deux mises à jour
+    lignes = StatistiqueDemandes.objects.select_for_update().filter(filtre).order_by('pk')
+    return {tuple(getattr(ligne, champ) for champ in CLE): ligne for ligne in lignes}
+
+
+def _compter_statuts(avant, apres):
+    """Demandes arrivées à chaque statut (création : EN_ATTENTE), pour /metrics, une fois validées"""
+    entrees = Counter(ligne[3] for ligne in apres)
+    entrees.subtract(ligne[3] for ligne in avant)
+    entrees = {statut: nombre for statut, nombre in entrees.items() if nombre > 0}
+    if not settings.METRIQUES or not entrees:
+        return
+
+    def compter():
+        for statut, nombre in entrees.items():
+            metriques.incrementer('unispattes_demandes_adoption_statut_total', nombre, statut=statut)
+
+    transaction.on_commit(compter)
+
+
+def enregistrer(avant=(), apres=()):
+    """Reporte dans le résumé le passage des demandes de l'état `avant` à l'état `apres`"""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    _ajouter(deltas, avant, -1)
+    _ajouter(deltas, apres, 1)
+    deltas = {cle: delta for cle, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    _compter_statuts(avant, apres)
+
+    # Sans point de sauvegarde : la plupart des appels sont déjà dans une transaction
+    with transaction.atomic(savepoint=False):
+        lignes = _verrouiller(deltas)
+        if manquantes := deltas.keys() - lignes.keys():
+            # Une autre transaction a pu créer la même ligne entre-temps : ignorée, puis relue
+            StatistiqueDemandes.objects.bulk_create(
+                [StatistiqueDemandes(**dict(zip(CLE, cle))) for cle in manquantes], ignore_conflicts=True,
+            )
+            lignes = _verrouiller(deltas)
+        for cle, (nombre, decisions, delai) in deltas.items():
+            ligne = lignes[cle]
+            ligne.nombre += nombre
+            ligne.decisions += decisions
+            ligne.delai_decision += delai
+        StatistiqueDemandes.objects.bulk_update(lignes.values(), ['nombre', 'decisions', 'delai_decision'])
+
+
+def changer_espece(animal, ancienne_espece):
+    """Demandes d'un animal dont l'espèce vient de changer : déplacées vers les lignes de la nouvelle"""
+    apres = etats(animal.demandes_adoption.all())
+    avant = [(date_demande, ancienne_espece, type_logement, statut, date_decision)
+             for date_demande, _, type_logement, statut, date_decision in apres]
+    enregistrer(avant, apres)
+
+
+# ========== SUPPRESSIONS ==========
+
+# Suppression en cours : (origine, {pk: (animal_id, espèce ou None, date_demande, type_logement, statut, date_decision)})
+_supprimees = ContextVar('demandes_supprimees', default=None)
+
+
+def noter_suppression(demande, origine):
+    """pre_delete : état d'une demande supprimée, directement ou en cascade"""
+    en_cours = _supprimees.get()
+    if en_cours is None or en_cours[0] is not origine:
+        en_cours = (origine, {})
+        _supprimees.set(en_cours)
+    # Espèce lue au moment d'enregistrer, en une requête, si l'animal n'est pas déjà chargé
+    espece = demande.animal.espece if DemandeAdoption.animal.is_cached(demande) else None
+    en_cours[1][demande.pk] = (demande.animal_id, espece, demande.date_demande,
+                               demande.type_logement, demande.statut, demande.date_decision)
+
+
+def enregistrer_suppressions(origine, using):
+    """
+    post_delete : retire du résumé toutes les demandes de la suppression,
+    au premier signal (les animaux d'une cascade sont supprimés après).
+    """
+    en_cours = _supprimees.get()
+    if en_cours is None or en_cours[0] is not origine:
+        return
+    _supprimees.set(None)
+    demandes = en_cours[1].values()
+    manquantes = {animal_id for animal_id, espece, *_ in demandes if espece is None}
+    especes = dict(
+        # Dans la transaction de suppression : lue sur la même base, pas sur la réplique
+        Animal.objects.using(using).filter(pk__in=manquantes).values_list('pk', 'espece')
+    ) if manquantes else {}
+    enregistrer([
+        (date_demande, especes.get(animal_id, espece), type_logement, statut, date_decision)
+        for animal_id, espece, date_demande, type_logement, statut, date_decision in demandes
+    ])
+
+
+def reconstruire(taille_lot=TAILLE_LOT):
+    """Recalcule tout le résumé depuis les demandes (lues par lots) ; renvoie le nombre de lignes"""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    demandes = DemandeAdoption.objects.order_by('pk')
+    dernier = 0
+    while lot := list(demandes.filter(pk__gt=dernier).values_list('pk', *ETAT)[:taille_lot]):
+        _ajouter(deltas, (ligne[1:] for ligne in lot), 1)
+        dernier = lot[-1][0]
+
+    with transaction.atomic():
+        StatistiqueDemandes.objects.all().delete()
+        StatistiqueDemandes.objects.bulk_create(
+            StatistiqueDemandes(
+                **dict(zip(CLE, cle)), nombre=nombre, decisions=decisions, delai_decision=delai,
+            )
+            for cle, (nombre, decisions, delai) in deltas.items()
+        )
+    return len(deltas)
+
+
+# ========== TABLEAU DE BORD ==========
+
+def _delai_moyen(decisions, delai):
+    """« 2 j 5 h », « 3 h 12 min », « 8 min » ; None sans décision datée"""
+    if not decisions:
+        return None
+    minutes = round(delai / decisions / 60)
+    jours, minutes = divmod(minutes, 24 * 60)
+    heures, minutes = divmod(minutes, 60)
+    if jours:
+        return f"{jours} j {heures} h"
+    if heures:
+        return f"{heures} h {minutes:02d} min"
+    return f"{minutes} min"
+
+
+def tableau_de_bord(mois=12):
+    """Répartitions par statut, espèce et logement, volume mensuel et délai de décision"""
+    statuts = dict(DemandeAdoption.STATUT_DEMANDE_CHOICES)
+    par_statut = {statut: 0 for statut in statuts}
+    repartitions = {'espece': defaultdict(lambda: dict.fromkeys(statuts, 0)),
+                    'type_logement': defaultdict(lambda: dict.fromkeys(statuts, 0))}
+    decisions = {statut: [0, 0] for statut in DECISIONS}
+    volumes = defaultdict(int)
+
+    for ligne in StatistiqueDemandes.objects.all():
+        par_statut[ligne.statut] += ligne.nombre
+        repartitions['espece'][ligne.espece][ligne.statut] += ligne.nombre
+        repartitions['type_logement'][ligne.type_logement][ligne.statut] += ligne.nombre
+        volumes[ligne.mois] += ligne.nombre
+        if ligne.statut in decisions:
+            decisions[ligne.statut][0] += ligne.decisions
+            decisions[ligne.statut][1] += ligne.delai_decision
+
+    # Derniers `mois` mois, mois sans demande compris
+    debut = timezone.localdate().replace(day=1)
+    derniers_mois = []
+    for _ in range(mois):
+        derniers_mois.append(debut)
+        debut = (debut - timedelta(days=1)).replace(day=1)
+    maximum = max((volumes[m] for m in derniers_mois), default=0)
+
+    libelles = {'espece': dict(StatistiqueDemandes._meta.get_field('espece').choices),
+                'type_logement': dict(DemandeAdoption.TYPE_LOGEMENT_CHOICES)}
+    return {
+        'total': sum(par_statut.values()),
+        'par_statut': [(statuts[statut], nombre) for statut, nombre in par_statut.items()],
+        'statuts': list(statuts.values()),
+        'repartitions': {
+            nom: sorted(
+                ((libelles[nom].get(valeur, valeur), list(compte.values()), sum(compte.values()))
+                 for valeur, compte in lignes.items()),
+                key=lambda ligne: -ligne[2],
+            )
+            for nom, lignes in repartitions.items()
+        },
+        'volumes': [
+            (m, volumes[m], round(100 * volumes[m] / maximum) if maximum else 0)
+            for m in reversed(derniers_mois)
+        ],
+        'delais': [
+            (statuts[statut], nombre, _delai_moyen(nombre, delai))
+            for statut, (nombre, delai) in decisions.items()
+        ],
+        'delai_moyen': _delai_moyen(
+            sum(nombre for nombre, _ in decisions.values()), sum(delai for _, delai in decisions.values()),
+        ),
+    }
@@ -0,0 +1,82 @@
+"""
+Tâches en arrière-plan (django.tasks, voir taches/backends.py) : effets de
+bord d'une demande d'adoption et vignettes des photos. Elles sont mises en
+file après le COMMIT (transaction.on_commit) et exécutées par
+`manage.py executer_taches` : la requête n'attend ni le serveur SMTP ni
+le redimensionnement des images.
+"""
+from functools import partial
+
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.tasks import task
+from django.template.loader import render_to_string
+
+from config.routers import lire_sur_principale
+
+from .models import Animal, DemandeAdoption
+
+
+@task
+def notifier_demande(demande_id):
+    """E-mails de la nouvelle demande : à l'équipe (staff) et accusé de réception au demandeur"""
+    demande = DemandeAdoption.objects.select_related('animal').get(pk=demande_id)
+    contexte = {'demande': demande, 'animal': demande.animal}
+    equipe = list(
+        get_user_model().objects.filter(is_staff=True, is_active=True)
+        .exclude(email='').values_list('email', flat=True)
+    )
+
+    messages = [EmailMessage(
+        subject=f"Demande d'adoption pour {demande.animal.nom}",
+        body=render_to_string('animaux/emails/demande_demandeur.txt', contexte),
+        to=[demande.email],
+    )]
+    if equipe:
+        messages.append(EmailMessage(
+            subject=f"Nouvelle demande d'adoption : {demande.animal.nom} ({demande.nom_complet})",
+            body=render_to_string('animaux/emails/demande_equipe.txt', contexte),
+            to=equipe,
+            reply_to=[demande.email],
+        ))
+    # Une seule connexion SMTP pour tous les messages
+    return get_connection().send_messages(messages)
+
+
+@task
+def journaliser_demande(demande_id):
+    """Trace de la demande dans le journal de l'admin (historique de l'objet)"""
+    demande = DemandeAdoption.objects.filter(pk=demande_id)
+    utilisateur_id = demande.values_list('utilisateur_id', flat=True).first()
+    if utilisateur_id is None:
+        return None
+    entree = LogEntry.objects.log_actions(
+        utilisateur_id, demande, ADDITION,
+        change_message="Demande envoyée depuis la fiche de l'animal", single_object=True,
+    )
+    return entree.pk
+
+
+@task
+def generer_variantes_animal(animal_id):
+    """Variantes responsives d'une nouvelle photo (voir Animal.generer_variantes_photo)"""
+    # Photo tout juste enregistrée : une réplique en retard renverrait l'ancienne
+    with lire_sur_principale():
+        animal = Animal.objects.filter(pk=animal_id).first()
+    # Supprimé ou photo déjà traitée entre-temps
+    if animal is None or not animal.photo or animal.photo_variantes.get('source') == animal.photo.name:
+        return False
+    animal.generer_variantes_photo()
+    return True
+
+
+def programmer_effets_demande(demande):
+    """Met en file les effets de bord d'une demande, une fois la transaction validée"""
+    for tache in (notifier_demande, journaliser_demande):
+        transaction.on_commit(partial(tache.enqueue, demande.pk))
+
+
+def programmer_variantes(animal):
+    transaction.on_commit(partial(generer_variantes_animal.enqueue, animal.pk))
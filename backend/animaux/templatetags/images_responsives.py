@@ -0,0 +1,81 @@
+from functools import lru_cache
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from ..images import FORMATS_VARIANTES, charger_manifeste_statique
+
+register = template.Library()
+
+# Largeur de la variante JPEG utilisée comme src de repli
+LARGEUR_REPLI = 640
+
+
+@lru_cache(maxsize=1)
+def _manifeste_statique():
+    """Lu une seule fois par processus (régénéré au déploiement)"""
+    return charger_manifeste_statique()
+
+
+def _srcset(variantes, fmt, url):
+    return ', '.join(f"{url(v['nom'])} {v['largeur']}w" for v in variantes if v['format'] == fmt)
+
+
+def _picture(metadonnees, url, src_original, alt, sizes, chargement):
+    """<picture> avec une <source> par format moderne et un <img> JPEG de repli"""
+    variantes = (metadonnees or {}).get('variantes', [])
+    jpeg = [v for v in variantes if v['format'] == 'jpeg']
+
+    # Pas de variantes (pas encore générées) → image d'origine
+    if not jpeg:
+        return format_html('<img src="{}" alt="{}" loading="{}">', src_original, alt, chargement)
+
+    sources = mark_safe(''.join(
+        format_html(
+            '<source type="{}" srcset="{}" sizes="{}">',
+            FORMATS_VARIANTES[fmt][1], _srcset(variantes, fmt, url), sizes,
+        )
+        for fmt in ('avif', 'webp')
+        if any(v['format'] == fmt for v in variantes)
+    ))
+    repli = min(jpeg, key=lambda v: abs(v['largeur'] - LARGEUR_REPLI))
+
+    return format_html(
+        '<picture class="photo-responsive">{}'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" loading="{}" decoding="async">'
+        '</picture>',
+        sources,
+        url(repli['nom']), _srcset(variantes, 'jpeg', url), sizes,
+        metadonnees['largeur'], metadonnees['hauteur'], alt, chargement,
+    )
+
+
+@register.simple_tag
+def photo_responsive(animal, sizes='100vw', chargement='lazy'):
+    """
+    Photo d'un animal avec srcset/sizes.
+    Usage : {% photo_responsive animal sizes="(max-width: 768px) 100vw, 33vw" %}
+    """
+    if not animal.photo:
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}">',
+            static('animaux/images/default-animal.png'), animal.nom, chargement,
+        )
+    return _picture(
+        animal.photo_variantes, animal.photo.storage.url, animal.photo.url,
+        animal.nom, sizes, chargement,
+    )
+
+
+@register.simple_tag
+def image_statique(chemin, alt='', sizes='100vw', chargement='lazy'):
+    """
+    Image statique avec ses variantes si elles ont été générées.
+    Usage : {% image_statique 'animaux/images/sophievet.jpg' alt="Sophie" sizes="300px" %}
+    """
+    return _picture(
+        _manifeste_statique().get(chemin), static, static(chemin),
+        alt, sizes, chargement,
+    )
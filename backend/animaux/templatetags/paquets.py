@@ -0,0 +1,46 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from config.paquets import paquet
+
+register = template.Library()
+
+
+@register.simple_tag
+def styles_page(page):
+    """
+    CSS critique de la page dans un <style>, paquet complet chargé sans bloquer le rendu.
+    Sans paquet (DEBUG, collectstatic pas lancé) : feuilles sources.
+    Usage : {% styles_page 'accueil' %}
+    """
+    paquet_page = paquet(page)
+    if paquet_page is None:
+        return format_html_join(
+            '\n', '<link rel="stylesheet" href="{}">',
+            ((static(nom),) for nom in settings.PAQUETS_STATIQUES[page]['css']),
+        )
+    css, _, critique = paquet_page
+    return format_html(
+        '<style>{}</style>\n'
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        # Produit par collectstatic ; « </ » ne peut pas fermer la balise <style>
+        mark_safe(critique.replace('</', '<\\/')), css, css,
+    )
+
+
+@register.simple_tag
+def scripts_page(page):
+    """
+    Scripts de la page (paquet minifié ou sources), exécutés après l'analyse du HTML.
+    Usage : {% scripts_page 'nos_animaux' %}
+    """
+    paquet_page = paquet(page)
+    if paquet_page is None:
+        urls = [static(nom) for nom in settings.PAQUETS_STATIQUES[page].get('js', [])]
+    else:
+        urls = [paquet_page[1]] if paquet_page[1] else []
+    return format_html_join('\n', '<script src="{}" defer></script>', ((url,) for url in urls))
@@ -1,13 +1,34 @@
-from django.test import TestCase
-from django.urls import reverse
+import gzip
+import os
+import shutil
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import include, path, reverse
+from django.contrib.admin.models import LogEntry
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.templatetags.static import static
+from config import paquets
+from config.paquets import paquet
+from config.statiques import index
+from performances.budgets import BudgetSQLMixin, collecter_requetes
+from performances.donnees import nouvel_animal, nouvelle_demande
+from taches.models import Tache
+
+from . import views_async
 from .models import Animal, DemandeAdoption
+from .urls import routes
 
 Utilisateur = get_user_model()
 
-class AnimauxTests(TestCase):
+class AnimauxTests(BudgetSQLMixin, TestCase):
 
     def setUp(self):
+        cache.clear()
         # Création d'un utilisateur de test
         self.user = Utilisateur.objects.create_user(
             email='testuser@example.com',
@@ -69,3 +90,777 @@ class AnimauxTests(TestCase):
             utilisateur=self.user,
             animal=self.animal
         ).exists())
+
+    def test_demande_adoption_effets_en_arriere_plan(self):
+        """Vérifie que les e-mails et le journal sont traités par le worker, après le COMMIT"""
+        Utilisateur.objects.create_user(
+            email='equipe@example.com', password='TestPassword123', is_staff=True,
+        )
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('animaux:detail_animal', args=[self.animal.id]), {
+                'nom_complet': 'Test User',
+                'email': self.user.email,
+                'telephone': '0612345678',
+                'type_logement': 'MAISON_JARDIN',
+                'statut_logement': 'PROPRIETAIRE',
+                'motivation': 'Test',
+                'disponibilite': 'CETTE_SEMAINE',
+            })
+        self.assertEqual(response.status_code, 302)
+        # La réponse n'a envoyé aucun e-mail : les tâches attendent le worker
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Tache.objects.filter(statut='READY').count(), 2)
+
+        call_command('executer_taches', une_fois=True, verbosity=0)
+        self.assertEqual(Tache.objects.filter(statut='SUCCESSFUL').count(), 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['equipe@example.com', self.user.email])
+        demande = DemandeAdoption.objects.get(utilisateur=self.user)
+        self.assertTrue(LogEntry.objects.filter(object_id=str(demande.pk), user=self.user).exists())
+
+    def test_nos_animaux_filtres_serveur(self):
+        """Vérifie que les filtres GET sont appliqués en base"""
+        Animal.objects.create(
+            nom='Luna', espece='CHAT', age_annees=1, categorie_age='junior',
+            sexe='F', description='Une chatte calme.', photo='animaux/luna.jpg'
+        )
+        Animal.objects.create(
+            nom='Rex', espece='CHIEN', age_annees=5, categorie_age='adulte',
+            sexe='M', description='Adopté.', photo='animaux/rex.jpg', disponible=False
+        )
+        url = reverse('animaux:nos_animaux')
+
+        def noms(parametres=None):
+            response = self.client.get(url, parametres or {})
+            return {animal.nom for animal in response.context['animaux']}
+
+        self.assertEqual(noms({'espece': 'CHAT'}), {'Luna'})
+        self.assertEqual(noms({'sexe': 'M', 'age': 'adulte', 'nom': 'char'}), {'Charlie'})
+        # Les animaux déjà adoptés ne sont pas listés
+        self.assertEqual(noms(), {'Charlie', 'Luna'})
+        # Une valeur invalide est ignorée au lieu de provoquer une erreur
+        self.assertEqual(noms({'sexe': 'X'}), {'Charlie', 'Luna'})
+
+    def test_nos_animaux_pagination(self):
+        """Vérifie la pagination et le rendu partiel utilisé par filter.js"""
+        from .views import ANIMAUX_PAR_PAGE
+        Animal.objects.bulk_create([
+            Animal(
+                nom=f'Chat {i}', espece='CHAT', age_annees=2, categorie_age='adulte',
+                sexe='F', description='Test', photo='animaux/test.jpg'
+            )
+            for i in range(ANIMAUX_PAR_PAGE + 5)
+        ])
+        url = reverse('animaux:nos_animaux')
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['animaux']), ANIMAUX_PAR_PAGE)
+        self.assertEqual(response.context['page'].paginator.count, ANIMAUX_PAR_PAGE + 6)
+
+        response = self.client.get(url, {'page': 2, 'fragment': 1})
+        self.assertEqual(len(response.context['animaux']), 6)
+        self.assertTemplateUsed(response, 'animaux/_grille_animaux.html')
+        self.assertTemplateNotUsed(response, 'animaux/nos_animaux.html')
+
+    def test_variantes_photo_responsive(self):
+        """Vérifie la génération des variantes et le srcset des cartes"""
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import override_settings
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        tampon = BytesIO()
+        Image.new('RGB', (1000, 750), (200, 120, 80)).save(tampon, format='PNG')
+
+        with override_settings(MEDIA_ROOT=media):
+            with self.captureOnCommitCallbacks(execute=True):
+                animal = Animal.objects.create(
+                    nom='Simba', espece='CHIEN', age_annees=4, categorie_age='adulte',
+                    sexe='M', description='Un chien joueur.',
+                    photo=SimpleUploadedFile('simba.png', tampon.getvalue(), content_type='image/png'),
+                )
+            # Variantes générées par le worker, pas pendant save()
+            self.assertEqual(animal.photo_variantes, {})
+            # Catalogue mis en cache sans les variantes : invalidé quand elles arrivent
+            self.client.get(reverse('animaux:nos_animaux'))
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('executer_taches', une_fois=True, verbosity=0)
+            animal.refresh_from_db()
+
+            variantes = animal.photo_variantes['variantes']
+            self.assertEqual(animal.photo_variantes['source'], animal.photo.name)
+            # Pas d'agrandissement : 320, 640 et 960 px seulement
+            self.assertEqual(sorted({v['largeur'] for v in variantes}), [320, 640, 960])
+            self.assertIn('jpeg', {v['format'] for v in variantes})
+            for variante in variantes:
+                self.assertTrue(animal.photo.storage.exists(variante['nom']))
+
+            response = self.client.get(reverse('animaux:nos_animaux'))
+            self.assertContains(response, 'srcset=')
+            self.assertContains(response, 'width="1000" height="750"')
+
+            # Animal supprimé : ses variantes aussi, après le COMMIT
+            with self.captureOnCommitCallbacks(execute=True):
+                animal.delete()
+            for variante in variantes:
+                self.assertFalse(animal.photo.storage.exists(variante['nom']))
+
+    def test_cache_pages_anonymes(self):
+        """Vérifie le cache de pages et son invalidation à la modification d'un animal"""
+        from .cache import statistiques
+        url = reverse('animaux:detail_animal', args=[self.animal.id])
+
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertContains(response, 'Charlie')
+        self.assertEqual(statistiques()['hits'], 1)
+
+        # Modification dans l'admin → la fiche et le catalogue sont invalidés
+        self.client.get(reverse('animaux:nos_animaux'))
+        self.animal.nom = 'Charlot'
+        self.animal.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Charlot')
+        self.assertEqual(self.client.get(reverse('animaux:nos_animaux'))['X-Cache'], 'MISS')
+
+        # Les utilisateurs connectés ne passent jamais par le cache
+        self.client.login(email='testuser@example.com', password='TestPassword123')
+        self.assertFalse(self.client.get(url).has_header('X-Cache'))
+
+    def test_requetes_conditionnelles(self):
+        """Vérifie les réponses 304 (une seule requête SQL, pas de rendu) et leur invalidation"""
+        for url in (
+            reverse('animaux:nos_animaux') + '?espece=CHIEN',
+            reverse('animaux:detail_animal', args=[self.animal.id]),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+            # Animal modifié → nouvel ETag et page complète
+            self.animal.description = f'Mise à jour pour {url}'
+            self.animal.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+        # Un animal adopté disparaît du catalogue → l'ETag de la liste change
+        url = reverse('animaux:nos_animaux')
+        etag = self.client.get(url)['ETag']
+        Animal.objects.filter(pk=self.animal.pk).update(disponible=False)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_requete_conditionnelle_apres_reconnexion(self):
+        """Vérifie qu'une nouvelle connexion (nouveau secret CSRF) invalide la page gardée par le navigateur"""
+        url = reverse('animaux:detail_animal', args=[self.animal.id])
+        identifiants = {'username': 'testuser@example.com', 'password': 'TestPassword123'}
+        self.client.post(reverse('users:connexion'), identifiants)
+        # Premier affichage : message de bienvenue, sans validateurs
+        self.client.get(url)
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.post(reverse('users:deconnexion'))
+        self.client.post(reverse('users:connexion'), identifiants)
+        self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+# URLconf des tests async : mêmes routes, servies par views_async (ASYNC_VIEWS)
+urlpatterns = [
+    path('', include((routes(views_async), 'animaux'))),
+    path('users/', include('users.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF='animaux.tests')
+class VuesAsyncTests(TestCase):
+    """Pages publiques servies par les vues async (client ASGI)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = Utilisateur.objects.create_user(
+            email='testuser@example.com',
+            password='TestPassword123',
+            first_name='Test',
+            last_name='User'
+        )
+        self.animal = Animal.objects.create(
+            nom='Charlie', espece='CHIEN', age_annees=3, categorie_age='adulte',
+            sexe='M', description='Un chien très affectueux.', photo='animaux/test.jpg'
+        )
+
+    async def test_pages_anonymes(self):
+        for url in ('/', '/nos-animaux/?espece=CHIEN', f'/animal/{self.animal.id}/', '/a-propos/'):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual((await self.async_client.get(url))['X-Cache'], 'HIT')
+
+        response = await self.async_client.get('/nos-animaux/', {'fragment': 1})
+        self.assertEqual([animal.nom for animal in response.context['animaux']], ['Charlie'])
+        self.assertEqual(response.context['page'].paginator.count, 1)
+
+        etag = response['ETag']
+        response = await self.async_client.get('/nos-animaux/', {'fragment': 1}, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual((await self.async_client.get('/animal/999999/')).status_code, 404)
+
+    async def test_demande_utilisateur_connecte(self):
+        await self.async_client.aforce_login(self.user)
+        url = f'/animal/{self.animal.id}/'
+
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Bonjour Test')
+        self.assertFalse(response.has_header('X-Cache'))
+
+        response = await self.async_client.post(url, {
+            'nom_complet': 'Test User',
+            'email': self.user.email,
+            'telephone': '0612345678',
+            'type_logement': 'MAISON_JARDIN',
+            'statut_logement': 'PROPRIETAIRE',
+            'motivation': 'Test',
+            'disponibilite': 'CETTE_SEMAINE',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(await DemandeAdoption.objects.filter(utilisateur=self.user).aexists())
+
+
+class DemandeAdoptionAdminTests(BudgetSQLMixin, TestCase):
+    """Nombre de requêtes de l'admin des demandes, indépendant du nombre de lignes"""
+
+    def setUp(self):
+        self.admin = Utilisateur.objects.create_superuser(
+            email='admin@example.com',
+            password='AdminPassword123',
+            first_name='Admin',
+            last_name='Refuge'
+        )
+        self.client.force_login(self.admin)
+        self.numero = 0
+
+    def creer_demandes(self, nombre):
+        """Une demande par nouvel animal et nouvel utilisateur (pire cas pour les N+1)"""
+        for _ in range(nombre):
+            self.numero += 1
+            animal = nouvel_animal(self.numero)
+            animal.save()
+            utilisateur = Utilisateur.objects.create(email=f'adoptant{self.numero}@example.com')
+            nouvelle_demande(animal, utilisateur, f'Adoptant {self.numero}').save()
+
+    def test_export_csv_filtres_de_la_liste(self):
+        """Vérifie que l'export CSV reprend les filtres de la liste et neutralise les formules"""
+        self.creer_demandes(3)
+        DemandeAdoption.objects.filter(nom_complet='Adoptant 2').update(statut='ACCEPTEE', motivation='=1+1')
+        url = reverse('admin:animaux_demandeadoption_exporter', args=['csv'])
+        # Lien d'export de la liste filtrée
+        liste = self.client.get(reverse('admin:animaux_demandeadoption_changelist'), {'statut__exact': 'ACCEPTEE'})
+        self.assertContains(liste, f'{url}?statut__exact=ACCEPTEE')
+
+        response = self.client.get(url, {'statut__exact': 'ACCEPTEE'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="demandes-adoption-', response['Content-Disposition'])
+        lignes = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lignes), 2)
+        self.assertTrue(lignes[0].startswith('N°;Date de demande;Statut'))
+        self.assertIn('Adoptant 2', lignes[1])
+        self.assertIn(";'=1+1;", lignes[1])
+
+        self.assertEqual(self.client.get(reverse('admin:animaux_demandeadoption_exporter', args=['pdf'])).status_code, 404)
+
+    def test_export_par_lots(self):
+        """Vérifie que la mémoire et les requêtes ne dépendent que de la taille des lots"""
+        from .export import EncodeurCSV, flux
+        self.creer_demandes(5)
+        with collecter_requetes() as requetes:
+            morceaux = list(flux(DemandeAdoption.objects.select_related('animal', 'utilisateur'), EncodeurCSV(), taille_lot=2))
+        # En-tête, 3 lots de 2, 2 et 1 demandes, fin ; une requête par lot (+ le lot vide final)
+        self.assertEqual(len(morceaux), 5)
+        self.assertEqual(len(requetes), 4)
+        numeros = [ligne.split(';')[0] for ligne in b''.join(morceaux).decode('utf-8-sig').splitlines()[1:]]
+        self.assertEqual(numeros, [str(pk) for pk in DemandeAdoption.objects.order_by('-pk').values_list('pk', flat=True)])
+
+    async def test_export_asgi_flux_async(self):
+        """Sous ASGI, le flux est async : il n'est pas lu en entier avant l'envoi"""
+        await sync_to_async(self.creer_demandes)(2)
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('admin:animaux_demandeadoption_exporter', args=['csv']))
+        self.assertTrue(response.is_async)
+        contenu = b''.join([morceau async for morceau in response.streaming_content])
+        self.assertEqual(len(contenu.decode('utf-8-sig').splitlines()), 3)
+
+    def test_export_xlsx_action(self):
+        """Vérifie l'action d'export Excel des demandes sélectionnées"""
+        import zipfile
+        from io import BytesIO
+        from xml.etree import ElementTree
+        self.creer_demandes(3)
+        choisies = list(DemandeAdoption.objects.order_by('pk').values_list('pk', flat=True)[:2])
+        DemandeAdoption.objects.filter(pk=choisies[0]).update(motivation='Chats & chiens <3\x01')
+
+        response = self.client.post(reverse('admin:animaux_demandeadoption_changelist'), {
+            'action': 'exporter_xlsx', '_selected_action': choisies,
+        })
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as classeur:
+            self.assertIn('xl/workbook.xml', classeur.namelist())
+            feuille = ElementTree.fromstring(classeur.read('xl/worksheets/sheet1.xml'))
+        espace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        lignes = feuille.findall(f'{espace}sheetData/{espace}row')
+        self.assertEqual(len(lignes), 3)
+        textes = [''.join(cellule.itertext()) for cellule in lignes[2]]
+        self.assertEqual(lignes[2][0].find(f'{espace}v').text, str(choisies[0]))
+        self.assertIn('Chats & chiens <3', textes)
+
+    def test_liste_nombre_requetes_constant(self):
+        url = reverse('admin:animaux_demandeadoption_changelist')
+
+        self.creer_demandes(2)
+        peu, _ = self.compter_requetes(url)
+        peu_filtre, _ = self.compter_requetes(url, animal__espece='CHAT')
+
+        self.creer_demandes(20)
+        self.assertEqual(self.compter_requetes(url)[0], peu)
+        self.assertEqual(self.compter_requetes(url, animal__espece='CHAT')[0], peu_filtre)
+
+    def test_formulaire_nombre_requetes_constant(self):
+        self.creer_demandes(1)
+        demande = DemandeAdoption.objects.get()
+        url = reverse('admin:animaux_demandeadoption_change', args=[demande.pk])
+        peu, _ = self.compter_requetes(url)
+
+        # Le formulaire ne charge pas la liste de tous les animaux
+        self.creer_demandes(20)
+        nombre, response = self.compter_requetes(url)
+        self.assertEqual(nombre, peu)
+        self.assertNotContains(response, 'Animal 21 (Chat)')
+
+    def demander(self, animal, numero):
+        """Demande d'un nouvel utilisateur pour un animal existant"""
+        utilisateur = Utilisateur.objects.create(email=f'concurrent{numero}@example.com')
+        demande = nouvelle_demande(animal, utilisateur, f'Concurrent {numero}')
+        demande.save()
+        return demande
+
+    def test_action_accepter_une_seule_demande_par_animal(self):
+        self.creer_demandes(1)
+        premiere = DemandeAdoption.objects.get()
+        deuxieme = self.demander(premiere.animal, 1)
+        non_selectionnee = self.demander(premiere.animal, 2)
+
+        self.client.post(reverse('admin:animaux_demandeadoption_changelist'), {
+            'action': 'accepter_demandes',
+            '_selected_action': [premiere.pk, deuxieme.pk],
+        })
+
+        statuts = dict(DemandeAdoption.objects.values_list('pk', 'statut'))
+        self.assertEqual(statuts[premiere.pk], 'ACCEPTEE')
+        self.assertEqual(statuts[deuxieme.pk], 'REFUSEE')
+        self.assertEqual(statuts[non_selectionnee.pk], 'REFUSEE')
+        self.assertFalse(Animal.objects.get(pk=premiere.animal_id).disponible)
+
+    def test_accepter_nombre_requetes_constant(self):
+        from .services import accepter_demandes
+
+        self.creer_demandes(23)
+        ids = list(DemandeAdoption.objects.order_by('pk').values_list('pk', flat=True))
+        # Première décision du mois : crée la ligne « acceptées » des statistiques
+        accepter_demandes(ids[:1])
+
+        with collecter_requetes() as peu:
+            accepter_demandes(ids[1:3])
+        with collecter_requetes() as beaucoup:
+            resultat = accepter_demandes(ids[3:])
+
+        self.assertEqual(len(beaucoup), len(peu))
+        self.assertEqual(resultat.acceptees, 20)
+
+    def test_accepter_animal_deja_adopte(self):
+        self.creer_demandes(1)
+        premiere = DemandeAdoption.objects.get()
+        Animal.objects.filter(pk=premiere.animal_id).update(disponible=False)
+
+        response = self.client.get(
+            reverse('admin:animaux_demandeadoption_accepter', args=[premiere.pk]), follow=True
+        )
+
+        self.assertContains(response, 'a déjà été adopté')
+        self.assertEqual(DemandeAdoption.objects.get().statut, 'EN_ATTENTE')
+
+
+class StatistiquesDemandesTests(TestCase):
+    """Résumé des demandes tenu à jour à chaque création et changement de statut"""
+
+    def setUp(self):
+        self.admin = Utilisateur.objects.create_superuser(email='admin@example.com', password='AdminPassword123')
+        self.chien = Animal.objects.create(
+            nom='Rex', espece='CHIEN', age_annees=3, categorie_age='adulte', sexe='M',
+            description='Test', photo='animaux/test.jpg',
+        )
+        self.chat = Animal.objects.create(
+            nom='Luna', espece='CHAT', age_annees=1, categorie_age='junior', sexe='F',
+            description='Test', photo='animaux/test.jpg',
+        )
+        self.numero = 0
+
+    def demander(self, animal, type_logement='MAISON_JARDIN'):
+        """Demande envoyée depuis la fiche de l'animal, par un nouvel utilisateur"""
+        self.numero += 1
+        utilisateur = Utilisateur.objects.create_user(email=f'adoptant{self.numero}@example.com', password='x')
+        self.client.force_login(utilisateur)
+        response = self.client.post(reverse('animaux:detail_animal', args=[animal.id]), {
+            'nom_complet': f'Adoptant {self.numero}', 'email': utilisateur.email, 'telephone': '0612345678',
+            'type_logement': type_logement, 'statut_logement': 'PROPRIETAIRE',
+            'motivation': 'Test', 'disponibilite': 'FLEXIBLE',
+        })
+        self.assertEqual(response.status_code, 302)
+        return DemandeAdoption.objects.get(utilisateur=utilisateur)
+
+    def resume(self):
+        from .models import StatistiqueDemandes
+        return {
+            (ligne.espece, ligne.type_logement, ligne.statut): (ligne.nombre, ligne.decisions)
+            for ligne in StatistiqueDemandes.objects.all() if ligne.nombre
+        }
+
+    def test_mise_a_jour_incrementale(self):
+        from . import services, statistiques
+        premiere = self.demander(self.chien)
+        self.demander(self.chien, 'APPARTEMENT_BALCON')
+        refusee = self.demander(self.chat)
+        self.assertEqual(self.resume(), {
+            ('CHIEN', 'MAISON_JARDIN', 'EN_ATTENTE'): (1, 0),
+            ('CHIEN', 'APPARTEMENT_BALCON', 'EN_ATTENTE'): (1, 0),
+            ('CHAT', 'MAISON_JARDIN', 'EN_ATTENTE'): (1, 0),
+        })
+
+        # Acceptation : la demande concurrente pour le même animal est refusée
+        services.accepter_demandes([premiere.pk])
+        services.refuser_demandes([refusee.pk])
+        self.assertEqual(self.resume(), {
+            ('CHIEN', 'MAISON_JARDIN', 'ACCEPTEE'): (1, 1),
+            ('CHIEN', 'APPARTEMENT_BALCON', 'REFUSEE'): (1, 1),
+            ('CHAT', 'MAISON_JARDIN', 'REFUSEE'): (1, 1),
+        })
+
+        services.remettre_en_attente([refusee.pk])
+        self.client.force_login(self.admin)
+        self.client.post(reverse('admin:animaux_demandeadoption_delete', args=[premiere.pk]), {'post': 'yes'})
+        attendu = {
+            ('CHIEN', 'APPARTEMENT_BALCON', 'REFUSEE'): (1, 1),
+            ('CHAT', 'MAISON_JARDIN', 'EN_ATTENTE'): (1, 0),
+        }
+        self.assertEqual(self.resume(), attendu)
+        # Même résultat qu'un recalcul complet
+        statistiques.reconstruire(taille_lot=1)
+        self.assertEqual(self.resume(), attendu)
+
+    def test_changement_espece(self):
+        from . import services, statistiques
+        demande = self.demander(self.chien)
+        # Erreur de saisie corrigée dans l'admin : les demandes suivent l'animal
+        animal = Animal.objects.get(pk=self.chien.pk)
+        animal.espece = 'CHAT'
+        animal.save()
+        self.assertEqual(self.resume(), {('CHAT', 'MAISON_JARDIN', 'EN_ATTENTE'): (1, 0)})
+
+        services.accepter_demandes([demande.pk])
+        attendu = {('CHAT', 'MAISON_JARDIN', 'ACCEPTEE'): (1, 1)}
+        self.assertEqual(self.resume(), attendu)
+        statistiques.reconstruire()
+        self.assertEqual(self.resume(), attendu)
+
+    def test_suppressions_en_cascade(self):
+        from . import services, statistiques
+        acceptee = self.demander(self.chien)
+        self.demander(self.chien, 'APPARTEMENT_BALCON')
+        services.accepter_demandes([acceptee.pk])
+        gardee = self.demander(self.chat)
+        self.demander(self.chat, 'APPARTEMENT_BALCON')
+        self.demander(self.chat, 'APPARTEMENT_SANS_BALCON')
+
+        # Animal supprimé depuis l'admin : ses demandes partent en cascade
+        self.client.force_login(self.admin)
+        self.client.post(reverse('admin:animaux_animal_delete', args=[self.chien.pk]), {'post': 'yes'})
+        # Compte supprimé : ses demandes aussi (animal non chargé)
+        Utilisateur.objects.get(pk=DemandeAdoption.objects.get(type_logement='APPARTEMENT_BALCON').utilisateur_id).delete()
+        # Action « supprimer la sélection » sur la liste des demandes
+        self.client.post(reverse('admin:animaux_demandeadoption_changelist'), {
+            'action': 'delete_selected', '_selected_action': [gardee.pk], 'post': 'yes',
+        })
+
+        attendu = {('CHAT', 'APPARTEMENT_SANS_BALCON', 'EN_ATTENTE'): (1, 0)}
+        self.assertEqual(self.resume(), attendu)
+        statistiques.reconstruire()
+        self.assertEqual(self.resume(), attendu)
+
+    def test_delai_de_decision(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import services, statistiques
+        demande = self.demander(self.chat)
+        DemandeAdoption.objects.filter(pk=demande.pk).update(date_demande=timezone.now() - timedelta(days=2, hours=3))
+        statistiques.reconstruire()
+        services.accepter_demandes([demande.pk])
+
+        tableau = statistiques.tableau_de_bord()
+        self.assertEqual(tableau['total'], 1)
+        self.assertEqual(tableau['delai_moyen'], '2 j 3 h')
+        self.assertIn(('Acceptée', 1, '2 j 3 h'), tableau['delais'])
+
+    def test_tableau_de_bord_nombre_requetes_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('admin:animaux_demandeadoption_statistiques')
+        self.client.force_login(self.admin)
+        self.client.get(url)
+
+        def compter():
+            with CaptureQueriesContext(connection) as requetes:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(requetes)
+
+        peu = compter()
+        for _ in range(5):
+            self.demander(self.chat, 'APPARTEMENT_SANS_BALCON')
+        self.client.force_login(self.admin)
+        self.assertEqual(compter(), peu)
+        response = self.client.get(url)
+        self.assertContains(response, '5 demandes')
+        self.assertContains(response, 'Appartement sans balcon')
+
+
+class RouteurLectureEcritureTests(SimpleTestCase):
+    """Routage principale / réplique (sans base : seul le choix de l'alias est testé)"""
+
+    def setUp(self):
+        from config.routers import RouteurLectureEcriture
+        self.routeur = RouteurLectureEcriture()
+
+    def test_lectures_catalogue_sur_replique(self):
+        from config.routers import lire_sur_principale
+        self.assertEqual(self.routeur.db_for_read(Animal), 'replica')
+        self.assertEqual(self.routeur.db_for_read(DemandeAdoption), 'default')
+        self.assertEqual(self.routeur.db_for_read(Utilisateur), 'default')
+        self.assertEqual(self.routeur.db_for_write(Animal), 'default')
+        self.assertFalse(self.routeur.allow_migrate('replica', 'animaux'))
+
+        with lire_sur_principale():
+            self.assertEqual(self.routeur.db_for_read(Animal), 'default')
+        self.assertEqual(self.routeur.db_for_read(Animal), 'replica')
+
+    def test_principale_apres_ecriture(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from config.routers import COOKIE_PRINCIPALE, PrincipaleApresEcritureMiddleware
+
+        bases = []
+
+        def vue(request):
+            bases.append(self.routeur.db_for_read(Animal))
+            return HttpResponse()
+
+        middleware = PrincipaleApresEcritureMiddleware(vue)
+        requetes = RequestFactory()
+
+        self.assertNotIn(COOKIE_PRINCIPALE, middleware(requetes.get('/')).cookies)
+        response = middleware(requetes.post('/'))
+        self.assertIn(COOKIE_PRINCIPALE, response.cookies)
+
+        # La requête suivante porte le cookie : elle lit sur la principale
+        requete = requetes.get('/')
+        requete.COOKIES[COOKIE_PRINCIPALE] = '1'
+        middleware(requete)
+        self.assertEqual(bases, ['replica', 'default', 'default'])
+
+    def test_retard_replique_apres_invalidation(self):
+        """Une page invalidée récemment n'est pas reconstruite (ni validée) depuis la réplique en retard"""
+        import time
+        from unittest import mock
+        from django.contrib.auth.models import AnonymousUser
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .cache import _cle_version, cache_page_anonyme, invalider
+        from .conditionnel import validateurs_detail
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        # La réplique n'a pas encore reçu la dernière écriture
+        @cache_page_anonyme('catalogue')
+        def vue(request):
+            base = self.routeur.db_for_read(Animal)
+            return HttpResponse('ancien' if base == 'replica' else 'nouveau')
+
+        def get():
+            requete = RequestFactory().get('/catalogue/')
+            requete.user = AnonymousUser()
+            return vue(requete)
+
+        # Dernière invalidation ancienne : la page est construite sur la réplique
+        cache.set(_cle_version('catalogue'), time.time_ns() - 3600 * 10**9, None)
+        self.assertEqual(get().content, b'ancien')
+
+        # Juste après une écriture : construite sur la principale, puis servie du cache
+        invalider('catalogue')
+        response = get()
+        self.assertEqual((response.content, response['X-Cache']), (b'nouveau', 'MISS'))
+        response = get()
+        self.assertEqual((response.content, response['X-Cache']), (b'nouveau', 'HIT'))
+
+        # Les validateurs ETag / Last-Modified sont lus au même endroit que la page
+        bases = []
+
+        def date_modification(id):
+            bases.append(self.routeur.db_for_read(Animal))
+            return mock.Mock(**{'first.return_value': None})
+
+        invalider('animal:1')
+        requete = RequestFactory().get('/')
+        with mock.patch('animaux.conditionnel._date_modification', date_modification):
+            validateurs_detail(requete, 1)
+            with override_settings(DB_REPLICA_DELAI=0):
+                validateurs_detail(requete, 1)
+        self.assertEqual(bases, ['default', 'replica'])
+
+
+class FichiersStatiquesTests(SimpleTestCase):
+    """collectstatic (empreintes, .gz / .br) et service des statiques par l'application"""
+
+    def setUp(self):
+        sources, self.racine = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, sources)
+        self.addCleanup(shutil.rmtree, self.racine)
+        with open(f'{sources}/style.css', 'w') as fichier:
+            fichier.write('body { background: url("fond.png"); }\n' + '.carte { margin: 0 auto; }\n' * 200)
+        with open(f'{sources}/fond.png', 'wb') as fichier:
+            fichier.write(b'\x89PNG' + bytes(range(256)) * 4)
+        with open(f'{sources}/auth.css', 'w') as fichier:
+            fichier.write('@import url("https://polices.example/a;b");\n'
+                          '/* Connexion */\n.auth-container {\n    display: flex;\n}\n'
+                          '.absente, .auth-container:hover { color: red; }\n'
+                          'body { background: url(\'fond.png\'); }\n')
+        with open(f'{sources}/auth.js', 'w') as fichier:
+            fichier.write('// Initialisation\nconst total = a / b;\nconst motif = /\\/+/g;\n')
+
+        reglages = override_settings(
+            STATIC_ROOT=self.racine, STATICFILES_DIRS=[sources],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            PAQUETS_STATIQUES={'auth': {'gabarits': ['users/login.html'], 'css': ['auth.css'], 'js': ['auth.js']}},
+        )
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        for fonction in (index, paquet):
+            fonction.cache_clear()
+            self.addCleanup(fonction.cache_clear)
+
+    def test_collectstatic_empreintes_et_variantes(self):
+        url = static('style.css')
+        self.assertRegex(url, r'^/static/style\.[0-9a-f]{12}\.css$')
+        nom = url.removeprefix('/static/')
+        for suffixe in ('.gz', '.br'):
+            self.assertTrue(os.path.exists(os.path.join(self.racine, nom + suffixe)))
+        # Image déjà compressée : pas de variante
+        self.assertFalse(os.path.exists(os.path.join(self.racine, static('fond.png').removeprefix('/static/') + '.gz')))
+        with open(os.path.join(self.racine, nom)) as fichier:
+            self.assertIn(static('fond.png').removeprefix('/static/'), fichier.read())
+
+    def test_service_negociation_et_cache(self):
+        url = static('style.css')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'.carte', gzip.decompress(response.getvalue()))
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(int(response['Content-Length']), len(response.getvalue()))
+
+        # Nom sans empreinte : revalidé
+        self.assertEqual(self.client.get('/static/style.css')['Cache-Control'], 'public, no-cache')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/static/inconnu.css').status_code, 404)
+
+    def test_service_plages(self):
+        url = static('fond.png')
+        complet = self.client.get(url).getvalue()
+
+        response = self.client.get(url, HTTP_RANGE='bytes=4-13')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 4-13/{len(complet)}')
+        self.assertEqual(response.getvalue(), complet[4:14])
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=-4').getvalue(), complet[-4:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(complet)}-').status_code, 416)
+        # If-Range périmé : fichier entier
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"ancien"').status_code, 200)
+
+    async def test_service_par_blocs(self):
+        from unittest import mock
+        from django.test import AsyncClient
+        url = static('fond.png')
+        with open(os.path.join(self.racine, url.removeprefix('/static/')), 'rb') as fichier:
+            complet = fichier.read()
+
+        # Fichier et plage lus par blocs bornés, sous WSGI comme sous ASGI (itérateur async)
+        with mock.patch('config.statiques.TAILLE_BLOC', 100):
+            response = await sync_to_async(self.client.get)(url, HTTP_RANGE='bytes=10-359')
+            self.assertEqual([len(bloc) for bloc in response.streaming_content], [100, 100, 100, 50])
+            response = await AsyncClient().get(url, headers={'Range': 'bytes=10-359'})
+            self.assertEqual(response.status_code, 206)
+            self.assertTrue(response.is_async)
+            blocs = [bloc async for bloc in response.streaming_content]
+        self.assertEqual([len(bloc) for bloc in blocs], [100, 100, 100, 50])
+        self.assertEqual(b''.join(blocs), complet[10:360])
+
+    def test_paquets_minifies(self):
+        fond = static('fond.png').removeprefix('/static/')
+        with open(os.path.join(self.racine, static('paquets/auth.css').removeprefix('/static/'))) as fichier:
+            self.assertEqual(
+                fichier.read(),
+                '@import url("https://polices.example/a;b");.auth-container{display:flex}'
+                f'.absente,.auth-container:hover{{color:red}}body{{background:url("../{fond}")}}',
+            )
+        with open(os.path.join(self.racine, static('paquets/auth.js').removeprefix('/static/'))) as fichier:
+            self.assertEqual(fichier.read(), 'const total=a / b;const motif=/\\/+/g;')
+        self.assertLess(paquets.rapport('auth')['minifie'], paquets.rapport('auth')['sources'])
+
+    def test_css_critique_en_ligne(self):
+        html = self.client.get(reverse('users:connexion')).content.decode()
+        # Règles des éléments du gabarit seulement, sans survol ni @import
+        self.assertIn(f'<style>.auth-container{{display:flex}}body{{background:url("{static("fond.png")}")}}</style>', html)
+        self.assertIn(f'<link rel="preload" href="{static("paquets/auth.css")}" as="style"', html)
+        self.assertNotIn('href="/static/auth.css"', html)
+
+    @override_settings(DEBUG=True)
+    def test_sources_en_developpement(self):
+        paquet.cache_clear()
+        html = self.client.get(reverse('users:connexion')).content.decode()
+        self.assertIn('<link rel="stylesheet" href="/static/auth.css">', html)
+        self.assertNotIn('<style>', html)
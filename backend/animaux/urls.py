@@ -1,18 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
 
 app_name = 'animaux'
 
-urlpatterns = [
-    # Page d'accueil
-    path('', views.index, name='accueil'),
 
-    # Page affichant tous les animaux disponibles
-    path('nos-animaux/', views.nos_animaux, name='nos_animaux'),
+def routes(vues):
+    """Routes des pages publiques, servies par `vues` (views ou views_async)"""
+    return [
+        # Page d'accueil
+        path('', vues.index, name='accueil'),
 
-    # Fiche détaillée d’un animal
-    path('animal/<int:id>/', views.detail_animal, name='detail_animal'),
+        # Page affichant tous les animaux disponibles
+        path('nos-animaux/', vues.nos_animaux, name='nos_animaux'),
 
-    # Page de présentation du refuge
-    path('a-propos/', views.a_propos, name='a_propos'),
-]
+        # Fiche détaillée d’un animal
+        path('animal/<int:id>/', vues.detail_animal, name='detail_animal'),
+
+        # Page de présentation du refuge
+        path('a-propos/', vues.a_propos, name='a_propos'),
+    ]
+
+
+# Sous ASGI (ASYNC_VIEWS activé), les pages publiques sont servies par les vues async
+urlpatterns = routes(views_async if settings.ASYNC_VIEWS else views)
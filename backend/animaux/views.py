@@ -1,19 +1,47 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from .models import Animal, DemandeAdoption
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.urls import reverse
-from .forms import DemandeAdoptionForm
+from .forms import DemandeAdoptionForm, FiltreAnimauxForm
+from .cache import cache_page_anonyme
+from . import statistiques
+from .taches import programmer_effets_demande
+from .conditionnel import requete_conditionnelle, validateurs_catalogue, validateurs_detail
 
+# Nombre d'animaux affichés par page sur "Nos animaux"
+ANIMAUX_PAR_PAGE = 12
+
+@cache_page_anonyme('catalogue')
 def index(request):
     animaux_recents = Animal.objects.all().order_by('-id')[:3]
     return render(request, 'animaux/index.html', {'animaux_recents': animaux_recents})
 
+@requete_conditionnelle(validateurs_catalogue)
+@cache_page_anonyme('catalogue')
 def nos_animaux(request):
-    animaux = Animal.objects.all()
-    return render(request, 'animaux/nos_animaux.html', {'animaux': animaux})
+    """
+    Liste paginée des animaux disponibles.
+    Les filtres (nom, espece, sexe, age) sont appliqués en base via les paramètres GET.
+    Avec ?fragment=1, seule la grille est rendue (utilisé par filter.js).
+    """
+    filtres = FiltreAnimauxForm(request.GET)
+    animaux = filtres.filtrer(Animal.objects.filter(disponible=True)).order_by('-date_arrivee', '-id')
+    page = Paginator(animaux, ANIMAUX_PAR_PAGE).get_page(request.GET.get('page'))
 
+    contexte = {
+        'animaux': page.object_list,
+        'page': page,
+        'filtres': filtres.cleaned_data,
+    }
+    if request.GET.get('fragment'):
+        return render(request, 'animaux/_grille_animaux.html', contexte)
+    return render(request, 'animaux/nos_animaux.html', contexte)
+
+@requete_conditionnelle(validateurs_detail)
+@cache_page_anonyme(lambda id: f'animal:{id}')
 def detail_animal(request, id):
     """
     Affiche la fiche d'un animal.
@@ -21,8 +49,31 @@ def detail_animal(request, id):
     """
     animal = get_object_or_404(Animal, id=id)
 
+    if request.method == 'POST':
+        return traiter_demande_adoption(request, animal)
+
+    return render(request, 'animaux/detail_animal.html', {
+        'animal': animal,
+        'form': formulaire_adoption_initial(request, animal)
+    })
+
+
+def formulaire_adoption_initial(request, animal):
+    """GET → Formulaire vide (pré-rempli si connecté)"""
+    if request.user.is_authenticated:
+        return DemandeAdoptionForm(initial={
+            'animal': animal,
+            'nom_complet': request.user.get_full_name(),
+            'email': request.user.email
+        })
+    return DemandeAdoptionForm(initial={'animal': animal})
+
+
+def traiter_demande_adoption(request, animal):
+    """Soumission du formulaire d'adoption (partagé avec views_async.py)"""
+
     # SI L'UTILISATEUR SOUMET LE FORMULAIRE SANS ÊTRE CONNECTÉ
-    if request.method == 'POST' and not request.user.is_authenticated:
+    if not request.user.is_authenticated:
         messages.warning(
             request,
             "Vous devez être connecté pour envoyer une demande d'adoption."
@@ -30,55 +81,48 @@ def detail_animal(request, id):
         return redirect(f"{reverse('users:connexion')}?next={request.path}")
 
     # Traitement formulaire (uniquement si connecté)
-    if request.method == 'POST':
-        form = DemandeAdoptionForm(request.POST)
+    form = DemandeAdoptionForm(request.POST)
 
-        if form.is_valid():
-            try:
-                demande = form.save(commit=False)
-                demande.animal = animal
-                demande.utilisateur = request.user  # Associe l'utilisateur connecté
+    if form.is_valid():
+        try:
+            demande = form.save(commit=False)
+            demande.animal = animal
+            demande.utilisateur = request.user  # Associe l'utilisateur connecté
+            with transaction.atomic():
                 demande.save()
-                messages.success(
-                    request,
-                    f'Votre demande pour adopter {animal.nom} a bien été envoyée ! Nous vous recontacterons rapidement.'
-                )
-                return redirect('animaux:detail_animal', id=animal.id)
-
-            except IntegrityError:
-                messages.error(
-                    request,
-                    f'Vous avez déjà fait une demande pour {animal.nom}. '
-                    'Consultez votre email ou contactez-nous.'
-                )
-
-        else:
+                statistiques.enregistrer(apres=[statistiques.etat(demande)])
+            # E-mails et journal après le COMMIT, par le worker : la réponse ne les attend pas
+            programmer_effets_demande(demande)
+            messages.success(
+                request,
+                f'Votre demande pour adopter {animal.nom} a bien été envoyée ! Nous vous recontacterons rapidement.'
+            )
+            return redirect('animaux:detail_animal', id=animal.id)
+
+        except IntegrityError:
             messages.error(
                 request,
-                "Veuillez corriger les erreurs ci-dessous avant de soumettre votre demande."
+                f'Vous avez déjà fait une demande pour {animal.nom}. '
+                'Consultez votre email ou contactez-nous.'
             )
-            return render(request, 'animaux/detail_animal.html', {
-                'animal': animal,
-                'form': form,
-                'scroll_to_errors': True
-            })
 
     else:
-        # GET → Formulaire vide (pré-rempli si connecté)
-        if request.user.is_authenticated:
-            form = DemandeAdoptionForm(initial={
-                'animal': animal,
-                'nom_complet': request.user.get_full_name(),
-                'email': request.user.email
-            })
-        else:
-            form = DemandeAdoptionForm(initial={'animal': animal})
+        messages.error(
+            request,
+            "Veuillez corriger les erreurs ci-dessous avant de soumettre votre demande."
+        )
+        return render(request, 'animaux/detail_animal.html', {
+            'animal': animal,
+            'form': form,
+            'scroll_to_errors': True
+        })
 
     return render(request, 'animaux/detail_animal.html', {
         'animal': animal,
         'form': form
     })
 
+@cache_page_anonyme()
 def a_propos(request):
     """Page À propos"""
     return render(request, 'animaux/a_propos.html')
@@ -0,0 +1,86 @@
+"""
+Versions async des pages publiques, servies quand ASYNC_VIEWS est activé
+(config/asgi.py l'active par défaut, voir animaux/urls.py).
+
+Les requêtes passent par l'ORM async : sous ASGI, un client lent ou une
+attente de la base n'occupe plus un thread par requête. Les querysets sont
+évalués avant le rendu, car les templates ne peuvent pas interroger la base
+depuis la boucle d'événements.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import AsyncPaginator, Page, Paginator
+from django.shortcuts import aget_object_or_404, render
+
+from .cache import cache_page_anonyme
+from .conditionnel import avalidateurs_catalogue, avalidateurs_detail, requete_conditionnelle
+from .forms import FiltreAnimauxForm
+from .models import Animal
+from .views import ANIMAUX_PAR_PAGE, formulaire_adoption_initial, traiter_demande_adoption
+
+
+async def _charger_utilisateur(request):
+    """
+    Le processeur de contexte `auth` lit request.user, chargé de façon
+    synchrone : on le remplace par l'utilisateur chargé en async.
+    """
+    request.user = await request.auser()
+
+
+async def _apage(animaux, numero):
+    """Page évaluée en async, avec l'API synchrone de Page attendue par les templates"""
+    paginator = AsyncPaginator(animaux, ANIMAUX_PAR_PAGE)
+    page = await paginator.aget_page(numero)
+    objets = await page.aget_object_list()
+    # Paginator sur un range de même longueur : count / num_pages sans requête
+    nombre = await paginator.acount()
+    return Page(objets, page.number, Paginator(range(nombre), ANIMAUX_PAR_PAGE))
+
+
+@cache_page_anonyme('catalogue')
+async def index(request):
+    await _charger_utilisateur(request)
+    animaux_recents = [animal async for animal in Animal.objects.all().order_by('-id')[:3]]
+    return render(request, 'animaux/index.html', {'animaux_recents': animaux_recents})
+
+
+@requete_conditionnelle(avalidateurs_catalogue)
+@cache_page_anonyme('catalogue')
+async def nos_animaux(request):
+    """Liste paginée des animaux disponibles (voir views.nos_animaux)"""
+    await _charger_utilisateur(request)
+    filtres = FiltreAnimauxForm(request.GET)
+    animaux = filtres.filtrer(Animal.objects.filter(disponible=True)).order_by('-date_arrivee', '-id')
+    page = await _apage(animaux, request.GET.get('page'))
+
+    contexte = {
+        'animaux': page.object_list,
+        'page': page,
+        'filtres': filtres.cleaned_data,
+    }
+    if request.GET.get('fragment'):
+        return render(request, 'animaux/_grille_animaux.html', contexte)
+    return render(request, 'animaux/nos_animaux.html', contexte)
+
+
+@requete_conditionnelle(avalidateurs_detail)
+@cache_page_anonyme(lambda id: f'animal:{id}')
+async def detail_animal(request, id):
+    """Fiche d'un animal (voir views.detail_animal)"""
+    await _charger_utilisateur(request)
+    animal = await aget_object_or_404(Animal, id=id)
+
+    # Validation du formulaire (unicité en base) et enregistrement : chemin synchrone
+    if request.method == 'POST':
+        return await sync_to_async(traiter_demande_adoption)(request, animal)
+
+    return render(request, 'animaux/detail_animal.html', {
+        'animal': animal,
+        'form': formulaire_adoption_initial(request, animal)
+    })
+
+
+@cache_page_anonyme()
+async def a_propos(request):
+    """Page À propos"""
+    await _charger_utilisateur(request)
+    return render(request, 'animaux/a_propos.html')
@@ -3,6 +3,8 @@ ASGI config for unispattes_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Lancement : uvicorn config.asgi:application --host 0.0.0.0 --port 8000
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -12,5 +14,19 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Gabarits et routes compilés avant la première requête (config/demarrage.py)
+from config.demarrage import prechauffer  # noqa: E402
+
+prechauffer()
+
+# En développement, les fichiers statiques sont servis comme avec runserver
+from django.conf import settings  # noqa: E402
+
+if settings.DEBUG:
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
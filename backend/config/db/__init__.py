@@ -0,0 +1,6 @@
+"""
+Moteurs de base de Django avec pool de connexions (config/pool.py).
+
+Choisis par config/settings.py quand DB_POOL=1 : ENGINE 'config.db.mysql'
+ou 'config.db.sqlite3' au lieu de 'django.db.backends.…'.
+"""
@@ -0,0 +1,16 @@
+from django.db.backends.mysql import base
+
+from config.pool import AvecPool
+
+
+class DatabaseWrapper(AvecPool, base.DatabaseWrapper):
+
+    @staticmethod
+    def verifier_connexion(connexion):
+        # Aller-retour du protocole MySQL, sans requête à analyser
+        connexion.ping()
+
+    def _set_autocommit(self, autocommit):
+        # Connexion resservie : déjà en autocommit, pas d'aller-retour
+        if self.connection.get_autocommit() != autocommit:
+            super()._set_autocommit(autocommit)
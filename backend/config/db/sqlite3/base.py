@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from config.pool import AvecPool
+
+
+class DatabaseWrapper(AvecPool, base.DatabaseWrapper):
+    pass
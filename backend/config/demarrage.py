@@ -0,0 +1,144 @@
+"""
+Démarrage rapide du conteneur.
+
+`manage.py preparer_demarrage` remplace migrate + collectstatic au lancement :
+- migrations : une seule requête compare les fichiers de migration présents
+  sur le disque aux lignes de django_migrations ; migrate ne tourne que s'il
+  en manque ;
+- statiques : empreinte (chemin, taille, date) des sources, des gabarits et
+  du code de construction des paquets, comparée à celle du dernier
+  collectstatic ; collectstatic ne tourne que si elle a changé.
+
+prechauffer(), appelé par config/asgi.py et config/wsgi.py, compile les
+gabarits du projet et les routes d'URL avant la première requête ; le
+processus maître de Gunicorn (gunicorn.conf.py) y ajoute ceux de l'admin.
+"""
+import hashlib
+import logging
+import os
+import pkgutil
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+
+from . import paquets, statiques
+
+logger = logging.getLogger(__name__)
+
+# Dans STATIC_ROOT (fichier caché : ni servi ni indexé)
+FICHIER_EMPREINTE = '.empreinte-sources'
+
+
+# ========== MIGRATIONS ==========
+
+def migrations_sur_disque():
+    """(app, nom) de toutes les migrations des applications installées, sans les importer"""
+    noms = set()
+    for config in apps.get_app_configs():
+        module, _ = MigrationLoader.migrations_module(config.label)
+        if module is None:
+            continue
+        try:
+            package = import_module(module)
+        except ImportError:
+            continue
+        if not hasattr(package, '__path__'):
+            continue
+        # Même sélection que MigrationLoader
+        noms.update(
+            (config.label, nom) for _, nom, est_package in pkgutil.iter_modules(package.__path__)
+            if not est_package and nom[0] not in '_~'
+        )
+    return noms
+
+
+def migrations_en_attente(using=DEFAULT_DB_ALIAS):
+    """Vrai s'il reste des migrations à appliquer (ou en cas de doute : table absente, base neuve)"""
+    try:
+        appliquees = set(MigrationRecorder.Migration.objects.using(using).values_list('app', 'name'))
+    except DatabaseError:
+        return True
+    return not migrations_sur_disque() <= appliquees
+
+
+# ========== FICHIERS STATIQUES ==========
+
+def empreinte_sources():
+    """Empreinte de tout ce que collectstatic lit : sources, gabarits des paquets, code de construction"""
+    ignores = apps.get_app_config('staticfiles').ignore_patterns
+    fichiers = set()
+    for finder in get_finders():
+        for chemin, stockage in finder.list(ignores):
+            fichiers.add((getattr(stockage, 'prefix', None) or '', chemin, stockage.path(chemin)))
+    for moteur in _moteurs_django():
+        for dossier in moteur.template_dirs:
+            for racine, _, noms in os.walk(dossier):
+                fichiers.update(('gabarits', nom, os.path.join(racine, nom)) for nom in noms)
+    fichiers.update(('code', module.__name__, module.__file__) for module in (paquets, statiques))
+
+    empreinte = hashlib.sha256(repr((settings.STATIC_URL, settings.PAQUETS_STATIQUES)).encode())
+    for prefixe, chemin, complet in sorted(fichiers):
+        etat = os.stat(complet)
+        empreinte.update(f'{prefixe}\0{chemin}\0{etat.st_size}\0{etat.st_mtime_ns}\n'.encode())
+    return empreinte.hexdigest()
+
+
+def _chemin_empreinte():
+    return os.path.join(settings.STATIC_ROOT, FICHIER_EMPREINTE)
+
+
+def statiques_a_jour(empreinte):
+    """Le dernier collectstatic a-t-il été fait sur ces sources (et son manifeste est-il là) ?"""
+    try:
+        with open(_chemin_empreinte(), encoding='utf-8') as fichier:
+            precedente = fichier.read().strip()
+    except OSError:
+        return False
+    return precedente == empreinte and os.path.exists(os.path.join(settings.STATIC_ROOT, 'staticfiles.json'))
+
+
+def enregistrer_empreinte(empreinte):
+    with open(_chemin_empreinte(), 'w', encoding='utf-8') as fichier:
+        fichier.write(empreinte)
+
+
+# ========== PRÉCHAUFFAGE ==========
+
+def _moteurs_django():
+    return [moteur for moteur in engines.all() if isinstance(moteur, DjangoTemplates)]
+
+
+def prechauffer(tous_les_gabarits=False):
+    """
+    Routes d'URL et gabarits des applications du projet compilés d'avance ;
+    `tous_les_gabarits` : aussi ceux des paquets installés (admin,
+    admin_interface…). Renvoie le nombre de gabarits.
+    """
+    debut = time.perf_counter()
+    # Importe toutes les vues et construit les tables de reverse()
+    get_resolver().reverse_dict
+    gabarits = 0
+    for moteur in _moteurs_django():
+        for dossier in moteur.template_dirs:
+            if not tous_les_gabarits and not str(dossier).startswith(str(settings.BASE_DIR)):
+                continue
+            for racine, _, noms in os.walk(dossier):
+                for nom in noms:
+                    relatif = os.path.relpath(os.path.join(racine, nom), dossier).replace(os.sep, '/')
+                    try:
+                        # Chargeur en cache : la compilation sert à toutes les requêtes suivantes
+                        moteur.get_template(relatif)
+                        gabarits += 1
+                    except TemplateSyntaxError:
+                        logger.exception("Gabarit invalide : %s", relatif)
+    logger.info("Préchauffage : %d gabarits en %.0f ms", gabarits, (time.perf_counter() - debut) * 1000)
+    return gabarits
@@ -0,0 +1,28 @@
+"""
+Lanceur des tests (TEST_RUNNER) : réglages propres aux tests, quel que soit
+l'environnement de la machine.
+"""
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class LanceurTests(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Métriques des requêtes de test hors du dossier partagé (/dev/shm) de l'application ;
+        # pas de lignes JSON échantillonnées dans la sortie (le test du journal l'active lui-même)
+        self._dossier_metriques = tempfile.mkdtemp(prefix='unispattes-metriques-')
+        self._reglages = override_settings(
+            METRIQUES_DOSSIER=self._dossier_metriques,
+            INSTRUMENTATION_ECHANTILLON=0,
+        )
+        self._reglages.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._reglages.disable()
+        shutil.rmtree(self._dossier_metriques, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,374 @@
+"""
+Métriques au format Prometheus, communes à tous les workers.
+
+Chaque processus écrit ses compteurs dans son propre fichier de
+METRIQUES_DOSSIER (<pid>.db, projeté en mémoire : une incrémentation ne
+fait aucun appel système). GET /metrics additionne les fichiers de tous les
+processus, y compris ceux des workers déjà recyclés (regroupés dans
+agrege.db) : les compteurs ne reculent pas quand Gunicorn remplace un
+worker. Le maître de Gunicorn vide le dossier au démarrage
+(gunicorn.conf.py). Le dossier doit être propre à la machine ou au
+conteneur : un pid absent y désigne un processus terminé.
+
+Format d'un fichier : en-tête de 8 octets (octets utilisés), puis des
+entrées [longueur de la clé (4 octets), clé UTF-8 complétée à un multiple
+de 8, valeur (double)]. La clé est la ligne Prometheus sans sa valeur :
+unispattes_requetes_total{methode="GET",statut="200",url="animaux:accueil"}.
+
+Sources : performances/instrumentation.py (requêtes, SQL, cache de pages),
+animaux/statistiques.py (demandes d'adoption par statut).
+"""
+import fcntl
+import hmac
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+TAILLE_INITIALE = 64 * 1024
+# Valeurs des processus terminés, fusionnées
+AGREGE = 'agrege.db'
+
+DUREES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DUREES_SQL = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+NOMBRES_SQL = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+# Nom → (type, description, seuils des histogrammes)
+FAMILLES = {
+    'unispattes_requetes_total': ('counter', "Requêtes HTTP servies, par nom d'URL, méthode et statut", None),
+    'unispattes_erreurs_total': ('counter', "Réponses 5xx, par nom d'URL", None),
+    'unispattes_requete_duree_secondes': ('histogram', "Durée des requêtes, par nom d'URL", DUREES),
+    'unispattes_requete_sql_requetes': ('histogram', "Requêtes SQL par requête HTTP, par nom d'URL", NOMBRES_SQL),
+    'unispattes_requete_sql_duree_secondes': ('histogram', "Temps SQL par requête HTTP, par nom d'URL", DUREES_SQL),
+    'unispattes_cache_pages_total': ('counter', "Consultations du cache de pages, par résultat (hit / miss)", None),
+    'unispattes_demandes_adoption_statut_total': (
+        'counter', "Demandes d'adoption passées à ce statut (soumission : EN_ATTENTE)", None,
+    ),
+}
+
+
+def dossier():
+    if settings.METRIQUES_DOSSIER:
+        return settings.METRIQUES_DOSSIER
+    # Mémoire partagée si disponible : les fichiers ne touchent pas le disque
+    racine = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(racine, 'unispattes-metriques')
+
+
+# ========== FICHIER D'UN PROCESSUS ==========
+
+def _taille_cle(longueur):
+    """Longueur + clé, complétées pour aligner la valeur sur 8 octets"""
+    taille = 4 + longueur
+    return taille + (-taille % 8)
+
+
+def _entrees(donnees):
+    """(clé, valeur, position de la valeur) de chaque entrée"""
+    utilise = struct.unpack_from('I', donnees, 0)[0]
+    position = 8
+    while position < utilise:
+        longueur = struct.unpack_from('I', donnees, position)[0]
+        cle = bytes(donnees[position + 4:position + 4 + longueur]).decode()
+        position += _taille_cle(longueur)
+        yield cle, struct.unpack_from('d', donnees, position)[0], position
+        position += 8
+
+
+class FichierValeurs:
+    """Valeurs nommées d'un processus, dans un fichier projeté en mémoire"""
+
+    def __init__(self, chemin):
+        self._fd = os.open(chemin, os.O_RDWR | os.O_CREAT, 0o644)
+        taille = max(os.fstat(self._fd).st_size, TAILLE_INITIALE)
+        os.ftruncate(self._fd, taille)
+        self._memoire = mmap.mmap(self._fd, taille)
+        self._utilise = struct.unpack_from('I', self._memoire, 0)[0] or 8
+        # Fichier repris (pid réutilisé) : les valeurs continuent
+        self._positions = {cle: position for cle, _, position in _entrees(self._memoire)}
+
+    def ajouter(self, cle, valeur):
+        position = self._positions.get(cle)
+        if position is None:
+            position = self._creer(cle)
+        struct.pack_into('d', self._memoire, position, struct.unpack_from('d', self._memoire, position)[0] + valeur)
+
+    def _creer(self, cle):
+        encodee = cle.encode()
+        debut_valeur = self._utilise + _taille_cle(len(encodee))
+        fin = debut_valeur + 8
+        if fin > len(self._memoire):
+            taille = max(2 * len(self._memoire), fin)
+            self._memoire.close()
+            os.ftruncate(self._fd, taille)
+            self._memoire = mmap.mmap(self._fd, taille)
+        struct.pack_into(f'I{len(encodee)}s', self._memoire, self._utilise, len(encodee), encodee)
+        struct.pack_into('d', self._memoire, debut_valeur, 0.0)
+        # Entrée complète avant d'être comptée : un lecteur ne voit jamais d'entrée à moitié écrite
+        struct.pack_into('I', self._memoire, 0, fin)
+        self._utilise = fin
+        self._positions[cle] = debut_valeur
+        return debut_valeur
+
+    def fermer(self):
+        self._memoire.close()
+        os.close(self._fd)
+
+
+_verrou = threading.Lock()
+# (pid, dossier) → FichierValeurs du processus courant
+_fichiers = {}
+
+
+def _ajouter(*valeurs):
+    """(clé, valeur) à ajouter : un seul verrou pour toutes les métriques d'une requête"""
+    chemin = dossier()
+    with _verrou:
+        fichier = _fichiers.get((os.getpid(), chemin))
+        if fichier is None:
+            os.makedirs(chemin, exist_ok=True)
+            fichier = _fichiers[(os.getpid(), chemin)] = FichierValeurs(
+                os.path.join(chemin, f'{os.getpid()}.db')
+            )
+        for cle, valeur in valeurs:
+            fichier.ajouter(cle, valeur)
+
+
+# ========== ENREGISTREMENT ==========
+
+def _echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _cle(nom, etiquettes):
+    if not etiquettes:
+        return nom
+    return _cle_formatee(nom, tuple(sorted(etiquettes.items())))
+
+
+@lru_cache(maxsize=4096)
+def _cle_formatee(nom, etiquettes):
+    # Quelques centaines de combinaisons (noms d'URL × statuts) : formatées une fois par processus
+    return nom + '{' + ','.join(f'{cle}="{_echapper(valeur)}"' for cle, valeur in etiquettes) + '}'
+
+
+def _cle_seuil(serie, seuil):
+    # « le » toujours en dernier : l'exposition regroupe les seuils d'une série par préfixe
+    if serie.endswith('}'):
+        return f'{serie[:-1]},le="{seuil}"}}'
+    return f'{serie}{{le="{seuil}"}}'
+
+
+def incrementer(nom, valeur=1, **etiquettes):
+    _ajouter((_cle(nom, etiquettes), valeur))
+
+
+def _observation(nom, valeur, etiquettes):
+    seuils = FAMILLES[nom][2]
+    serie = _cle('', etiquettes)
+    # Compte non cumulé par intervalle : une seule incrémentation, cumul à l'exposition
+    seuil = next((f'{s:g}' for s in seuils if valeur <= s), '+Inf')
+    return [
+        (_cle_seuil(f'{nom}_bucket{serie}', seuil), 1),
+        (f'{nom}_sum{serie}', valeur),
+        (f'{nom}_count{serie}', 1),
+    ]
+
+
+def observer(nom, valeur, **etiquettes):
+    """Ajoute `valeur` à l'histogramme `nom` (seuils de FAMILLES)"""
+    _ajouter(*_observation(nom, valeur, etiquettes))
+
+
+def enregistrer(compteurs=(), observations=()):
+    """
+    Plusieurs métriques d'un coup : compteurs [(nom, valeur, étiquettes)],
+    observations [(nom d'histogramme, valeur, étiquettes)]
+    """
+    valeurs = [(_cle(nom, etiquettes), valeur) for nom, valeur, etiquettes in compteurs]
+    for nom, valeur, etiquettes in observations:
+        valeurs += _observation(nom, valeur, etiquettes)
+    _ajouter(*valeurs)
+
+
+def reinitialiser():
+    """Remet toutes les métriques à zéro (démarrage du serveur, tests)"""
+    with _verrou:
+        for fichier in _fichiers.values():
+            fichier.fermer()
+        _fichiers.clear()
+        if os.path.isdir(dossier()):
+            for nom in os.listdir(dossier()):
+                if nom.endswith('.db'):
+                    os.remove(os.path.join(dossier(), nom))
+
+
+# ========== EXPOSITION ==========
+
+def _vivant(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _verrou_dossier(mode):
+    """Verrou entre processus : fusion exclusive, lectures partagées"""
+    with open(os.path.join(dossier(), '.verrou'), 'a') as fichier:
+        fcntl.flock(fichier, mode)
+        yield
+
+
+def _fusionner_termines():
+    """
+    Fichiers des processus terminés (workers recyclés) ajoutés à agrege.db
+    puis supprimés : le nombre de fichiers lus par /metrics reste borné.
+    """
+    termines = [
+        nom for nom in os.listdir(dossier())
+        if nom.removesuffix('.db').isdigit() and not _vivant(int(nom.removesuffix('.db')))
+    ]
+    if not termines:
+        return
+    with _verrou_dossier(fcntl.LOCK_EX):
+        agrege = FichierValeurs(os.path.join(dossier(), AGREGE))
+        try:
+            for nom in termines:
+                chemin = os.path.join(dossier(), nom)
+                try:
+                    with open(chemin, 'rb') as fichier:
+                        donnees = fichier.read()
+                except FileNotFoundError:
+                    continue  # déjà fusionné par un autre worker
+                for cle, valeur, _ in _entrees(donnees):
+                    agrege.ajouter(cle, valeur)
+                os.remove(chemin)
+        finally:
+            agrege.fermer()
+
+
+def valeurs():
+    """Somme des valeurs de tous les processus, par clé"""
+    totaux = defaultdict(float)
+    if not os.path.isdir(dossier()):
+        return totaux
+    _fusionner_termines()
+    # Pas de lecture pendant une fusion : un fichier compté deux fois (agrege.db et le sien)
+    with _verrou_dossier(fcntl.LOCK_SH):
+        for nom in os.listdir(dossier()):
+            if not nom.endswith('.db'):
+                continue
+            try:
+                with open(os.path.join(dossier(), nom), 'rb') as fichier:
+                    donnees = fichier.read()
+            except FileNotFoundError:
+                continue
+            for cle, valeur, _ in _entrees(donnees):
+                totaux[cle] += valeur
+    return totaux
+
+
+def _famille(cle):
+    nom = cle.partition('{')[0]
+    for suffixe in ('_bucket', '_sum', '_count'):
+        if nom.endswith(suffixe) and nom[:-len(suffixe)] in FAMILLES:
+            return nom[:-len(suffixe)]
+    return nom
+
+
+def _separer_seuil(cle):
+    """Inverse de _cle_seuil : (série, seuil)"""
+    if ',le="' in cle:
+        serie, _, seuil = cle.rpartition(',le="')
+        serie += '}'
+    else:
+        serie, _, seuil = cle.rpartition('{le="')
+    return serie, seuil[:-2]
+
+
+def _cumuler(lignes):
+    """Intervalles non cumulés → seuils « le » cumulés, dans l'ordre, +Inf compris"""
+    series = defaultdict(dict)
+    autres = []
+    for cle, valeur in lignes:
+        nom = cle.partition('{')[0]
+        if not nom.endswith('_bucket'):
+            autres.append((cle, valeur))
+            continue
+        serie, seuil = _separer_seuil(cle)
+        series[serie][seuil] = valeur
+
+    cumulees = []
+    for serie, comptes in sorted(series.items()):
+        total = 0
+        for seuil in [f'{s:g}' for s in FAMILLES[_famille(serie)][2]] + ['+Inf']:
+            total += comptes.get(seuil, 0)
+            cumulees.append((_cle_seuil(serie, seuil), total))
+    return cumulees + sorted(autres)
+
+
+def _calculees(totaux):
+    """Métriques déduites à l'exposition : taux de succès du cache, demandes par statut"""
+    hits = totaux.get('unispattes_cache_pages_total{resultat="hit"}', 0)
+    misses = totaux.get('unispattes_cache_pages_total{resultat="miss"}', 0)
+    yield (
+        'unispattes_cache_pages_taux_succes', 'gauge', "Part des consultations du cache de pages servies par le cache",
+        [('unispattes_cache_pages_taux_succes', hits / (hits + misses) if hits + misses else 0)],
+    )
+
+    from django.db.models import Sum
+
+    from animaux.models import StatistiqueDemandes
+
+    # Résumé tenu à jour par animaux/statistiques.py : une requête, quel que soit le nombre de demandes
+    par_statut = StatistiqueDemandes.objects.values_list('statut').annotate(total=Sum('nombre')).order_by('statut')
+    yield (
+        'unispattes_demandes_adoption', 'gauge', "Demandes d'adoption en base, par statut",
+        [(_cle('unispattes_demandes_adoption', {'statut': statut}), total) for statut, total in par_statut],
+    )
+
+
+def _formater(valeur):
+    """Valeur exacte : entier tel quel, sinon toutes les décimales du double (pas de {:g} à 6 chiffres)"""
+    valeur = float(valeur)
+    if valeur.is_integer() and abs(valeur) < 2 ** 53:
+        return str(int(valeur))
+    return repr(valeur)
+
+
+def exposition():
+    """Texte de /metrics (format Prometheus 0.0.4)"""
+    totaux = valeurs()
+    familles = defaultdict(list)
+    for cle, valeur in totaux.items():
+        familles[_famille(cle)].append((cle, valeur))
+
+    lignes = []
+    for nom, (type_metrique, description, seuils) in FAMILLES.items():
+        lignes += [f'# HELP {nom} {description}', f'# TYPE {nom} {type_metrique}']
+        echantillons = _cumuler(familles[nom]) if seuils else sorted(familles[nom])
+        lignes += [f'{cle} {_formater(valeur)}' for cle, valeur in echantillons]
+    for nom, type_metrique, description, echantillons in _calculees(totaux):
+        lignes += [f'# HELP {nom} {description}', f'# TYPE {nom} {type_metrique}']
+        lignes += [f'{cle} {_formater(valeur)}' for cle, valeur in echantillons]
+    return '\n'.join(lignes) + '\n'
+
+
+def vue(request):
+    """GET /metrics : jeton METRIQUES_JETON (Authorization: Bearer …) ou session staff"""
+    jeton = settings.METRIQUES_JETON
+    autorise = jeton and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {jeton}')
+    if not autorise and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,372 @@
+"""
+Paquets CSS / JS par page, minifiés, et CSS critique.
+
+PAQUETS_STATIQUES (settings) décrit chaque page : ses gabarits, ses feuilles
+de style et ses scripts. Pendant collectstatic (StockageStatiques), chaque
+page reçoit :
+- paquets/<page>.css : ses feuilles concaténées et minifiées (url() réécrites) ;
+- paquets/<page>.js : ses scripts concaténés et minifiés ;
+- paquets/<page>.critique.css : les règles utiles au premier affichage, celles
+  dont les sélecteurs ne visent que des éléments placés dans les gabarits
+  avant le commentaire {# ========== PLI ========== #} (tout le gabarit
+  sans ce commentaire).
+Ils reçoivent ensuite empreinte et variantes .gz / .br comme les autres.
+
+Les balises {% styles_page %} et {% scripts_page %} (animaux/templatetags/paquets.py)
+insèrent le CSS critique dans la page et chargent le paquet complet sans
+bloquer le rendu. Avec DEBUG=1, ou tant que collectstatic n'a pas produit
+les paquets, elles chargent les fichiers sources tels quels.
+"""
+import gzip
+import os
+import posixpath
+import re
+from functools import cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import get_template
+from django.templatetags.static import static
+
+DOSSIER = 'paquets'
+
+_CHAINE = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+
+
+def noms(page):
+    """Fichiers produits pour `page` : CSS, JS (None sans script) et CSS critique"""
+    config = settings.PAQUETS_STATIQUES[page]
+    return (
+        f'{DOSSIER}/{page}.css',
+        f'{DOSSIER}/{page}.js' if config.get('js') else None,
+        f'{DOSSIER}/{page}.critique.css',
+    )
+
+
+# ========== MINIFICATION ==========
+
+_JETON_CSS = re.compile(rf'({_CHAINE})|/\*.*?\*/', re.S)
+
+
+def minifier_css(css):
+    """Commentaires et espaces superflus retirés ; chaînes intactes"""
+    morceaux = []
+    for partie, chaine in _morceaux(_JETON_CSS, css):
+        if chaine is not None:
+            morceaux.append(chaine)
+            continue
+        partie = re.sub(r'\s+', ' ', partie)
+        partie = re.sub(r'\s*([{};,>])\s*', r'\1', partie)
+        morceaux.append(re.sub(r':\s+', ':', partie))
+    return ''.join(morceaux).replace(';}', '}').strip()
+
+
+def _morceaux(jeton, texte):
+    """(texte hors chaîne, None) et (None, chaîne) alternés ; commentaires retirés"""
+    position, hors_chaine = 0, ''
+    for correspondance in jeton.finditer(texte):
+        # Commentaire : remplacé par un espace (a/**/b ne devient pas ab)
+        hors_chaine += texte[position:correspondance.start()] + ('' if correspondance.group(1) else ' ')
+        if correspondance.group(1):
+            yield hors_chaine, None
+            yield None, correspondance.group(1)
+            hors_chaine = ''
+        position = correspondance.end()
+    yield hors_chaine + texte[position:], None
+
+
+# Après ces caractères (ou mots-clés), un / ouvre une expression régulière et non une division
+_AVANT_REGEX = set('(,=:[!&|?{};+-*%<>~^')
+_MOTS_AVANT_REGEX = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+# Espaces supprimables à côté de ces caractères (pas + - / : a - -b, a / /re/)
+_PONCTUATION_JS = set('{}()[];,:=<>!&|?*%')
+
+
+def minifier_js(js):
+    """
+    Commentaires, indentation et lignes vides retirés. Un saut de ligne est
+    gardé là où il peut terminer une instruction (insertion automatique des
+    points-virgules). Prudent plutôt que maximal : ni renommage ni réécriture.
+    """
+    sortie = []
+    i, taille = 0, len(js)
+    dernier = ''  # dernier jeton significatif : distingue division et expression régulière
+
+    def blanc(caractere):
+        if sortie and sortie[-1] in ' \n':
+            if caractere == '\n':
+                sortie[-1] = '\n'
+        elif sortie:
+            sortie.append(caractere)
+
+    def ajouter(jeton):
+        if sortie and sortie[-1] in ' \n':
+            precedent = sortie[-2][-1]
+            if sortie[-1] == ' ' and (jeton[0] in _PONCTUATION_JS or precedent in _PONCTUATION_JS):
+                sortie.pop()
+            elif sortie[-1] == '\n' and (precedent in '{;,(' or jeton == '}'):
+                sortie.pop()
+        sortie.append(jeton)
+
+    while i < taille:
+        c = js[i]
+        if c in ' \t\r\n':
+            debut = i
+            while i < taille and js[i] in ' \t\r\n':
+                i += 1
+            blanc('\n' if '\n' in js[debut:i] else ' ')
+        elif js.startswith('//', i):
+            i = js.find('\n', i)
+            i = taille if i == -1 else i
+        elif js.startswith('/*', i):
+            fin = js.find('*/', i + 2)
+            fin = taille if fin == -1 else fin + 2
+            blanc('\n' if '\n' in js[i:fin] else ' ')
+            i = fin
+        elif c in '"\'`' or (c == '/' and (not dernier or dernier in _AVANT_REGEX or dernier in _MOTS_AVANT_REGEX)):
+            fin = _fin_litteral(js, i)
+            ajouter(js[i:fin])
+            dernier, i = 'litteral', fin
+        elif mot := re.match(r'[\w$]+', js[i:i + 64]):
+            ajouter(mot.group())
+            dernier = mot.group()
+            i += len(dernier)
+        else:
+            ajouter(c)
+            dernier = c
+            i += 1
+
+    return ''.join(sortie).strip()
+
+
+def _fin_litteral(js, debut):
+    """Fin d'une chaîne, d'un gabarit `…` ou d'une expression régulière commençant à `debut`"""
+    delimiteur = js[debut]
+    i, classe = debut + 1, False
+    while i < len(js):
+        c = js[i]
+        if c == '\\':
+            i += 2
+            continue
+        if delimiteur == '/':
+            if c == '[':
+                classe = True
+            elif c == ']':
+                classe = False
+            elif c == '/' and not classe:
+                i += 1
+                while i < len(js) and (js[i].isalnum() or js[i] == '_'):
+                    i += 1
+                return i
+            elif c == '\n':
+                return i
+        elif c == delimiteur:
+            return i + 1
+        i += 1
+    return i
+
+
+# ========== ASSEMBLAGE ==========
+
+_URL_CSS = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+# L'URL d'une police Google contient des « ; » : ils ne terminent pas l'instruction
+_IMPORT = re.compile(rf'@import\s*(?:url\(\s*(?:{_CHAINE}|[^)]*)\s*\)|{_CHAINE})[^;]*;')
+
+
+def _reecrire_urls(css, source, cible):
+    """url() relatives de `source` réécrites par cible(chemin depuis la racine des statiques)"""
+    def remplacer(correspondance):
+        url = correspondance.group(2).strip()
+        # data:, https:, chemin absolu, #fragment : inchangés
+        if re.match(r'[a-z][a-z0-9+.-]*:|/|#', url, re.I):
+            return correspondance.group(0)
+        return f"url('{cible(posixpath.normpath(posixpath.join(posixpath.dirname(source), url)))}')"
+    return _URL_CSS.sub(remplacer, css)
+
+
+def assembler(page, lire):
+    """Contenu des paquets de `page` : {'css', 'js', 'critique'} ; lire(nom) → texte d'un fichier statique"""
+    config = settings.PAQUETS_STATIQUES[page]
+    imports, feuilles, absolues = [], [], []
+    for source in config['css']:
+        texte = lire(source)
+        # @import n'est valide qu'en tête de feuille : regroupés en tête du paquet
+        imports += [i for i in _IMPORT.findall(texte) if i not in imports]
+        texte = _IMPORT.sub('', texte)
+        feuilles.append(_reecrire_urls(texte, source, lambda chemin: posixpath.relpath(chemin, DOSSIER)))
+        # Le CSS critique est inséré dans la page : URL absolues
+        absolues.append(_reecrire_urls(texte, source, lambda chemin: settings.STATIC_URL + chemin))
+
+    css = minifier_css('\n'.join(imports + feuilles))
+    return {
+        'css': css,
+        'js': '\n;'.join(minifier_js(lire(source)) for source in config.get('js', [])) or None,
+        'critique': critique(minifier_css('\n'.join(absolues)), jetons(config['gabarits'])),
+    }
+
+
+def construire(stockage):
+    """Écrit les paquets de toutes les pages dans `stockage` (collectstatic) ; renvoie leurs noms"""
+    def lire(nom):
+        if not stockage.exists(nom):
+            raise ValueError(f"Paquets statiques : fichier introuvable : {nom}")
+        with stockage.open(nom) as fichier:
+            return fichier.read().decode('utf-8')
+
+    ecrits = []
+    for page in settings.PAQUETS_STATIQUES:
+        contenus = assembler(page, lire)
+        for nom, contenu in zip(noms(page), (contenus['css'], contenus['js'], contenus['critique'])):
+            if nom is None:
+                continue
+            chemin = stockage.path(nom)
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            with open(chemin, 'w', encoding='utf-8') as fichier:
+                fichier.write(contenu)
+            ecrits.append(nom)
+    return ecrits
+
+
+# ========== CSS CRITIQUE ==========
+
+_PLI = re.compile(r'\{#\s*=+\s*PLI\b')
+_INCLUDE = re.compile(r'\{%\s*include\s+[\'"]([^\'"]+)[\'"]')
+# Balises qui produisent des images (animaux/templatetags/images_responsives.py)
+_IMAGES = re.compile(r'\{%\s*(?:photo_responsive|image_statique)\b')
+_INTERACTIONS = re.compile(r':(?:hover|focus|focus-within|focus-visible|active|visited)\b')
+
+
+def jetons(gabarits):
+    """(balises, classes, id) des éléments placés avant le pli des gabarits et de leurs {% include %}"""
+    balises, classes, ids = {'html', 'body'}, set(), set()
+    a_lire, lus = list(gabarits), set()
+    while a_lire:
+        nom = a_lire.pop()
+        if nom in lus:
+            continue
+        lus.add(nom)
+        source = _PLI.split(get_template(nom).template.source, 1)[0]
+        a_lire += _INCLUDE.findall(source)
+        balises.update(balise.lower() for balise in re.findall(r'<([a-zA-Z][\w-]*)', source))
+        for valeur in re.findall(r'\sclass\s*=\s*"([^"]*)"', source):
+            classes.update(valeur.split())
+        ids.update(re.findall(r'\sid\s*=\s*"([^"]*)"', source))
+        if _IMAGES.search(source):
+            balises.update(('picture', 'source', 'img'))
+            classes.add('photo-responsive')
+    return balises, classes, ids
+
+
+def _blocs(css):
+    """(prélude, contenu) des blocs de premier niveau ; (instruction, None) pour @import…;"""
+    debut = ouverture = profondeur = 0
+    i = 0
+    while i < len(css):
+        c = css[i]
+        if c in '"\'':
+            i = _fin_litteral(css, i)
+            continue
+        if c == '{':
+            if profondeur == 0:
+                ouverture = i
+            profondeur += 1
+        elif c == '}':
+            profondeur -= 1
+            if profondeur == 0:
+                yield css[debut:ouverture].strip(), css[ouverture + 1:i]
+                debut = i + 1
+        elif c == ';' and profondeur == 0:
+            yield css[debut:i + 1].strip(), None
+            debut = i + 1
+        i += 1
+
+
+def _selecteurs(prelude):
+    """Sélecteurs d'une liste (virgules hors parenthèses)"""
+    resultat, profondeur, debut = [], 0, 0
+    for i, c in enumerate(prelude):
+        profondeur += (c == '(') - (c == ')')
+        if c == ',' and profondeur == 0:
+            resultat.append(prelude[debut:i])
+            debut = i + 1
+    return resultat + [prelude[debut:]]
+
+
+def _visible(selecteur, jetons_pli):
+    """Le sélecteur peut-il viser un élément avant le pli (tous ses composés y figurent) ?"""
+    if _INTERACTIONS.search(selecteur):
+        return False
+    balises, classes, ids = jetons_pli
+    simplifie = re.sub(r'\[[^\]]*\]|::?[\w-]+(?:\([^)]*\))?', '', selecteur)
+    for compose in re.split(r'[\s>+~]+', simplifie.strip()):
+        balise = re.match(r'[a-zA-Z][\w-]*', compose)
+        if balise and balise.group().lower() not in balises:
+            return False
+        if not set(re.findall(r'\.([\w-]+)', compose)) <= classes:
+            return False
+        if not set(re.findall(r'#([\w-]+)', compose)) <= ids:
+            return False
+    return True
+
+
+def critique(css, jetons_pli):
+    """Règles de `css` (minifié) qui s'appliquent avant le pli, animations utilisées comprises"""
+    regles, animations = [], {}
+    for prelude, contenu in _blocs(css):
+        if contenu is None:
+            # @import (polices) : chargé avec le paquet complet
+            continue
+        if prelude.startswith(('@media', '@supports')):
+            interne = critique(contenu, jetons_pli)
+            if interne:
+                regles.append(f'{prelude}{{{interne}}}')
+        elif prelude.startswith('@keyframes'):
+            animations[prelude.split()[-1]] = f'{prelude}{{{contenu}}}'
+        elif prelude.startswith('@font-face'):
+            regles.append(f'{prelude}{{{contenu}}}')
+        elif not prelude.startswith('@'):
+            visibles = [s for s in _selecteurs(prelude) if _visible(s, jetons_pli)]
+            if visibles:
+                regles.append(f"{','.join(visibles)}{{{contenu}}}")
+    texte = ''.join(regles)
+    return texte + ''.join(bloc for nom, bloc in animations.items() if re.search(rf'\b{re.escape(nom)}\b', texte))
+
+
+# ========== PAGES ==========
+
+@cache
+def paquet(page):
+    """(URL du CSS, URL du JS ou None, CSS critique) de `page` si collectstatic les a produits ; None sinon"""
+    if settings.DEBUG:
+        return None
+    css, js, nom_critique = noms(page)
+    try:
+        with staticfiles_storage.open(staticfiles_storage.stored_name(nom_critique)) as fichier:
+            contenu = fichier.read().decode('utf-8')
+    except (OSError, ValueError):
+        return None
+    return static(css), static(js) if js else None, contenu
+
+
+def page_du_gabarit(nom):
+    """Page de PAQUETS_STATIQUES qui utilise le gabarit `nom`, ou None"""
+    return next((page for page, config in settings.PAQUETS_STATIQUES.items() if nom in config['gabarits']), None)
+
+
+def rapport(page):
+    """Tailles (octets) des sources de `page`, de ses paquets minifiés puis compressés, et du CSS critique"""
+    def lire(nom):
+        with open(finders.find(nom), encoding='utf-8') as fichier:
+            return fichier.read()
+
+    config = settings.PAQUETS_STATIQUES[page]
+    sources = sum(len(lire(nom).encode()) for nom in [*config['css'], *config.get('js', [])])
+    contenus = assembler(page, lire)
+    paquets = [contenus['css'].encode(), (contenus['js'] or '').encode()]
+    return {
+        'sources': sources,
+        'minifie': sum(len(contenu) for contenu in paquets),
+        'gzip': sum(len(gzip.compress(contenu, compresslevel=9, mtime=0)) for contenu in paquets if contenu),
+        'critique': len(contenus['critique'].encode()),
+    }
@@ -0,0 +1,267 @@
+"""
+Pool de connexions à la base, par worker (DB_POOL=1, voir config/settings.py).
+
+Sans pool, chaque requête ouvre une connexion MySQL (TCP + authentification)
+et la ferme à la fin : sur les pages légères (accueil, À propos), cette
+poignée de main coûte plus que les requêtes elles-mêmes. Avec le pool, la
+connexion est rendue au lieu d'être fermée et resservie à la requête
+suivante :
+- taille bornée : au plus POOL['taille'] connexions par worker et par base ;
+  au-delà, la requête attend qu'une connexion soit rendue (POOL['attente_max']
+  secondes, puis OperationalError) ;
+- vérification : une connexion inactive depuis plus de POOL['verifier_apres']
+  secondes, ou rendue après une erreur, est testée (ping) avant d'être
+  resservie ; en échec elle est remplacée par une neuve ;
+- recyclage : une connexion ouverte depuis plus de POOL['duree_max'] secondes
+  est fermée à son retour (avant le wait_timeout de MySQL) ;
+- métriques du processus : statistiques().
+
+Les moteurs config.db.mysql et config.db.sqlite3 branchent le pool sur ceux
+de Django (AvecPool) : get_new_connection() emprunte, _close() rend.
+"""
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+
+
+class PoolEpuise(Exception):
+    pass
+
+
+class PoolConnexions:
+
+    def __init__(self, ouvrir, verifier, fermer, taille=10, attente_max=5.0, verifier_apres=10.0, duree_max=3600.0):
+        self.ouvrir = ouvrir
+        self.verifier = verifier
+        self.fermer_connexion = fermer
+        self.taille = taille
+        self.attente_max = attente_max
+        self.verifier_apres = verifier_apres
+        self.duree_max = duree_max
+        self._condition = threading.Condition()
+        # (connexion, ouverte à, rendue à) ; la dernière rendue est resservie en premier
+        self._libres = deque()
+        # id(connexion) → ouverte à
+        self._empruntees = {}
+        # Libres + empruntées + en cours d'ouverture
+        self._ouvertes = 0
+        self._compteurs = {
+            'emprunts': 0, 'attentes': 0, 'attente_totale': 0.0, 'attente_max': 0.0,
+            'expirations': 0, 'ouvertures': 0, 'reconnexions': 0, 'recyclages': 0,
+        }
+
+    def prendre(self):
+        """(connexion, neuve ?) ; PoolEpuise si aucune ne se libère à temps"""
+        debut = time.monotonic()
+        with self._condition:
+            self._compteurs['emprunts'] += 1
+            attendu = False
+            while not self._libres and self._ouvertes >= self.taille:
+                if not attendu:
+                    self._compteurs['attentes'] += 1
+                    attendu = True
+                reste = self.attente_max - (time.monotonic() - debut)
+                if reste <= 0:
+                    self._compteurs['expirations'] += 1
+                    raise PoolEpuise(f"Aucune connexion libre après {self.attente_max:g} s ({self.taille} ouvertes)")
+                self._condition.wait(reste)
+            if attendu:
+                attente = time.monotonic() - debut
+                self._compteurs['attente_totale'] += attente
+                self._compteurs['attente_max'] = max(self._compteurs['attente_max'], attente)
+            if self._libres:
+                connexion, ouverte, rendue = self._libres.pop()
+            else:
+                # Place réservée : l'ouverture (réseau) se fait hors du verrou
+                connexion = None
+                self._ouvertes += 1
+
+        try:
+            if connexion is not None and time.monotonic() - rendue > self.verifier_apres:
+                try:
+                    self.verifier(connexion)
+                except Exception:
+                    self._fermer(connexion)
+                    connexion = None
+                    self._compter('reconnexions')
+            neuve = connexion is None
+            if neuve:
+                connexion, ouverte = self.ouvrir(), time.monotonic()
+                self._compter('ouvertures')
+        except BaseException:
+            with self._condition:
+                self._ouvertes -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._empruntees[id(connexion)] = ouverte
+        return connexion, neuve
+
+    def rendre(self, connexion, sale=False):
+        """`sale` : transaction en cours ou erreur pendant l'emprunt, annulée et vérifiée ici"""
+        with self._condition:
+            ouverte = self._empruntees.pop(id(connexion), None)
+        garder = ouverte is not None
+        if garder and sale:
+            try:
+                connexion.rollback()
+                self.verifier(connexion)
+            except Exception:
+                garder = False
+                self._compter('reconnexions')
+        if garder and time.monotonic() - ouverte > self.duree_max:
+            garder = False
+            self._compter('recyclages')
+        if not garder:
+            self._fermer(connexion)
+
+        with self._condition:
+            if garder:
+                self._libres.append((connexion, ouverte, time.monotonic()))
+            elif ouverte is not None:
+                self._ouvertes -= 1
+            self._condition.notify()
+
+    def fermer(self):
+        """Ferme les connexions libres (les empruntées le seront à leur retour)"""
+        with self._condition:
+            libres = [connexion for connexion, _, _ in self._libres]
+            self._libres.clear()
+            self._ouvertes -= len(libres)
+            self._condition.notify_all()
+        for connexion in libres:
+            self._fermer(connexion)
+
+    def statistiques(self):
+        with self._condition:
+            etat = dict(self._compteurs)
+            etat.update(
+                taille=self.taille, ouvertes=self._ouvertes,
+                libres=len(self._libres), empruntees=len(self._empruntees),
+            )
+        etat['attente_moyenne'] = etat['attente_totale'] / etat['attentes'] if etat['attentes'] else 0.0
+        return etat
+
+    def _compter(self, compteur):
+        with self._condition:
+            self._compteurs[compteur] += 1
+
+    def _fermer(self, connexion):
+        try:
+            self.fermer_connexion(connexion)
+        except Exception:
+            pass
+
+
+# ========== POOLS DU PROCESSUS ==========
+
+_verrou = threading.Lock()
+# (alias, base) → PoolConnexions
+_pools = {}
+# Pools hérités du processus parent par fork (voir _apres_fork)
+_herites = []
+
+
+def obtenir_pool(cle, creer):
+    with _verrou:
+        if cle not in _pools:
+            _pools[cle] = creer()
+        return _pools[cle]
+
+
+def statistiques():
+    """Métriques des pools du processus, par alias de base"""
+    with _verrou:
+        pools = list(_pools.items())
+    return {alias: pool_base.statistiques() for (alias, _), pool_base in pools}
+
+
+def fermer_pools():
+    with _verrou:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool_base in pools:
+        pool_base.fermer()
+
+
+def _apres_fork():
+    """
+    Enfant : repart sans connexion. Celles du parent ne sont pas fermées ici
+    (MySQL clorait aussi la session du parent, qui partage la socket) mais
+    gardées en référence pour ne jamais être détruites.
+    """
+    global _verrou
+    _verrou = threading.Lock()
+    _herites.extend(_pools.values())
+    _pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_apres_fork)
+
+
+# ========== MOTEURS DE BASE ==========
+
+class AvecPool:
+    """
+    À placer avant le DatabaseWrapper de Django : connexions empruntées au
+    pool et rendues à la fermeture si settings_dict contient POOL.
+    """
+
+    _connexion_neuve = True
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL')
+        if self.alias == NO_DB_ALIAS or not options:
+            return None
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured("Le pool remplace les connexions persistantes : CONN_MAX_AGE doit valoir 0")
+        # Le nom de la base change pendant les tests (base de test) : un pool par base
+        return obtenir_pool((self.alias, self.settings_dict['NAME']), partial(self._creer_pool, options))
+
+    def _creer_pool(self, options):
+        return PoolConnexions(
+            partial(super().get_new_connection, self.get_connection_params()),
+            self.verifier_connexion,
+            lambda connexion: connexion.close(),
+            **options,
+        )
+
+    @staticmethod
+    def verifier_connexion(connexion):
+        curseur = connexion.cursor()
+        try:
+            curseur.execute('SELECT 1')
+        finally:
+            curseur.close()
+
+    def get_new_connection(self, conn_params):
+        pool_base = self.pool
+        if pool_base is None:
+            return super().get_new_connection(conn_params)
+        try:
+            connexion, self._connexion_neuve = pool_base.prendre()
+        except PoolEpuise as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+        return connexion
+
+    def init_connection_state(self):
+        # Connexion resservie : sa session est déjà configurée
+        if self._connexion_neuve:
+            super().init_connection_state()
+
+    def _close(self):
+        pool_base = self.pool
+        if pool_base is None or self.connection is None:
+            return super()._close()
+        sale = self.in_atomic_block or not self.autocommit or self.errors_occurred
+        with self.wrap_database_errors:
+            pool_base.rendre(self.connection, sale=sale)
+        self.connection = None
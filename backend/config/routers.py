@@ -0,0 +1,103 @@
+"""
+Routage lecture / écriture entre la base principale et la réplique.
+
+Seules les lectures du catalogue (Animal) partent sur la réplique ; tout le
+reste (demandes d'adoption, utilisateurs, sessions, écritures) reste sur la
+base principale. Un visiteur qui vient d'écrire (POST, action admin…) lit
+sur la principale pendant DB_REPLICA_DELAI secondes, le temps que la
+réplique rattrape son retard.
+
+Activé seulement si l'alias 'replica' est défini (voir config/settings.py).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REPLIQUE = 'replica'
+PRINCIPALE = 'default'
+
+# Modèles dont les lectures peuvent être servies par la réplique
+MODELES_CATALOGUE = {'animaux.Animal'}
+
+# Cookie posé après une écriture : les lectures suivantes restent sur la principale
+COOKIE_PRINCIPALE = 'lire_principale'
+
+_lire_principale = ContextVar('lire_principale', default=False)
+
+
+@contextmanager
+def lire_sur_principale():
+    """Force les lectures sur la base principale dans ce bloc"""
+    jeton = _lire_principale.set(True)
+    try:
+        yield
+    finally:
+        _lire_principale.reset(jeton)
+
+
+class RouteurLectureEcriture:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label in MODELES_CATALOGUE and not _lire_principale.get():
+            return REPLIQUE
+        return PRINCIPALE
+
+    def db_for_write(self, model, **hints):
+        return PRINCIPALE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données des deux côtés : les relations sont toujours valides
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit le schéma par réplication
+        return db == PRINCIPALE
+
+
+def _ecrit(request):
+    return request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def _marquer_ecriture(request, response):
+    if _ecrit(request) and response.status_code < 500:
+        response.set_cookie(
+            COOKIE_PRINCIPALE, '1',
+            max_age=settings.DB_REPLICA_DELAI,
+            httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+
+def PrincipaleApresEcritureMiddleware(get_response):
+    """
+    Lit sur la principale pendant une requête d'écriture et tant que le
+    cookie posé par la dernière écriture n'a pas expiré.
+    """
+    def doit_lire_principale(request):
+        return _ecrit(request) or COOKIE_PRINCIPALE in request.COOKIES
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not doit_lire_principale(request):
+                return await get_response(request)
+            with lire_sur_principale():
+                response = await get_response(request)
+            return _marquer_ecriture(request, response)
+
+        return markcoroutinefunction(middleware)
+
+    def middleware(request):
+        if not doit_lire_principale(request):
+            return get_response(request)
+        with lire_sur_principale():
+            response = get_response(request)
+        return _marquer_ecriture(request, response)
+
+    return middleware
+
+
+PrincipaleApresEcritureMiddleware.sync_capable = True
+PrincipaleApresEcritureMiddleware.async_capable = True
@@ -37,28 +37,83 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'animaux',
     'users',
+    'performances',
+    'taches',
 ]
 
 # Modèle utilisateur personnalisé
 AUTH_USER_MODEL = 'users.Utilisateur'
 
 # Base de données
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': os.environ.get('DB_NAME', 'unispattes_db'),
-        'USER': os.environ.get('DB_USER', 'unispattes_user'),
-        'PASSWORD': os.environ.get('DB_PASSWORD', 'root'),
-        'HOST': os.environ.get('DB_HOST', 'db'),
-        'PORT': os.environ.get('DB_PORT', '3306'),
-        'OPTIONS': {
-            'charset': 'utf8mb4',
-        },
+# DB_ENGINE=sqlite : base locale sans MySQL (tests du routage principale / réplique)
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DB_NAME', 'unispattes_db'),
+            'USER': os.environ.get('DB_USER', 'unispattes_user'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', 'root'),
+            'HOST': os.environ.get('DB_HOST', 'db'),
+            'PORT': os.environ.get('DB_PORT', '3306'),
+            'OPTIONS': {
+                'charset': 'utf8mb4',
+            },
+        }
     }
-}
+
+# Réplique en lecture pour le catalogue (voir config/routers.py)
+# MySQL : DB_REPLICA_HOST (+ DB_REPLICA_PORT / _USER / _PASSWORD, sinon ceux de la principale)
+# SQLite : DB_REPLICA=1 → même fichier ouvert en lecture seule (ou DB_REPLICA_NAME)
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and os.environ.get('DB_REPLICA') == '1':
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME'])}?mode=ro",
+    }
+elif os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+    }
+
+if 'replica' in DATABASES:
+    # En test, la réplique pointe sur la base de test principale
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['config.routers.RouteurLectureEcriture']
+
+# Pool de connexions par worker (config/pool.py) : DB_POOL=1
+# Connexions gardées ouvertes entre les requêtes, au plus DB_POOL_TAILLE par base et par worker
+if os.environ.get('DB_POOL') == '1':
+    for reglages in DATABASES.values():
+        reglages['ENGINE'] = reglages['ENGINE'].replace('django.db.backends.', 'config.db.')
+        reglages['POOL'] = {
+            'taille': int(os.environ.get('DB_POOL_TAILLE', 10)),
+            # Attente max (s) d'une connexion libre quand toutes sont prises
+            'attente_max': float(os.environ.get('DB_POOL_ATTENTE', 5)),
+            # Inactivité (s) au-delà de laquelle une connexion est vérifiée avant de resservir
+            'verifier_apres': float(os.environ.get('DB_POOL_VERIFICATION', 10)),
+            # Durée de vie (s) d'une connexion, sous le wait_timeout de MySQL
+            'duree_max': float(os.environ.get('DB_POOL_DUREE_MAX', 3600)),
+        }
+
+# Durée (s) pendant laquelle un visiteur qui vient d'écrire lit sur la principale
+DB_REPLICA_DELAI = int(os.environ.get('DB_REPLICA_DELAI', 10))
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Fichiers statiques servis avant sessions et base (config/statiques.py)
+    'config.statiques.ServeurStatiquesMiddleware',
+    # Durées (vue, SQL, gabarits) et cache de chaque requête : Server-Timing et journal (performances/instrumentation.py)
+    'performances.instrumentation.MesureRequeteMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,6 +122,40 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if 'replica' in DATABASES:
+    MIDDLEWARE.insert(0, 'config.routers.PrincipaleApresEcritureMiddleware')
+
+# Instrumentation des requêtes : en-tête Server-Timing (INSTRUMENTATION_ENTETE=0 pour le retirer)
+# et une ligne JSON journalisée pour cette fraction des requêtes (0 = aucune)
+INSTRUMENTATION_ENTETE = os.environ.get('INSTRUMENTATION_ENTETE', '1') == '1'
+INSTRUMENTATION_ECHANTILLON = float(os.environ.get('INSTRUMENTATION_ECHANTILLON', 0.01))
+
+# Métriques Prometheus (config/metriques.py) : GET /metrics, réservé au staff ou au jeton
+# METRIQUES_JETON (Authorization: Bearer …) ; un fichier par worker dans METRIQUES_DOSSIER
+METRIQUES = os.environ.get('METRIQUES', '1') == '1'
+METRIQUES_JETON = os.environ.get('METRIQUES_JETON', '')
+METRIQUES_DOSSIER = os.environ.get('METRIQUES_DOSSIER', '')
+
+# Lanceur des tests : métriques dans un dossier temporaire, journal échantillonné coupé (config/lanceur_tests.py)
+TEST_RUNNER = 'config.lanceur_tests.LanceurTests'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'performances.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Budgets de requêtes SQL par vue (performances/budgets.py) : vérifiés en développement,
+# les dépassements sont journalisés (ou lèvent une erreur si BUDGETS_SQL_STRICTS)
+BUDGETS_SQL_STRICTS = os.environ.get('BUDGETS_SQL_STRICTS') == '1'
+if DEBUG:
+    MIDDLEWARE.insert(0, 'performances.budgets.BudgetSQLMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -86,6 +175,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Vues async pour les pages publiques et les comptes (animaux/ et users/views_async.py).
+# Activé par config/asgi.py ; sous WSGI, les vues synchrones restent plus rapides.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -105,6 +198,30 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Profil de hachage des mots de passe : compromis délibéré entre le coût CPU d'une
+# connexion et la résistance au cassage (users/hachage.py). standard = réglage Django,
+# econome = 4x moins d'itérations PBKDF2, renforce = 2x plus. Les mots de passe
+# existants sont rehachés au profil courant à la connexion suivante.
+HACHAGE_PROFIL = os.environ.get('HACHAGE_PROFIL', 'standard')
+_HACHEURS_PROFIL = {
+    'standard': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'econome': 'users.hachage.PBKDF2Econome',
+    'renforce': 'users.hachage.PBKDF2Renforce',
+}
+PASSWORD_HASHERS = [_HACHEURS_PROFIL[HACHAGE_PROFIL]] + [
+    hacheur for hacheur in (
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ) if hacheur != _HACHEURS_PROFIL[HACHAGE_PROFIL]
+]
+
+# Pool de hachage des vues async : threads et hachages en attente avant de refuser (503)
+HACHAGE_THREADS = int(os.environ.get('HACHAGE_THREADS', os.cpu_count() or 1))
+HACHAGE_FILE_MAX = int(os.environ.get('HACHAGE_FILE_MAX', 64))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
@@ -128,13 +245,88 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic : noms avec empreinte (cache immutable) et variantes .gz / .br (config/statiques.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'config.statiques.StockageStatiques'},
+}
+
+# Paquets CSS / JS minifiés et CSS critique par page, produits par collectstatic (config/paquets.py)
+PAQUETS_STATIQUES = {
+    'accueil': {
+        'gabarits': ['animaux/index.html'],
+        'css': ['animaux/css/style.css'],
+    },
+    'nos_animaux': {
+        'gabarits': ['animaux/nos_animaux.html'],
+        'css': ['animaux/css/nos_animaux.css'],
+        'js': ['animaux/js/script.js', 'animaux/js/filter.js'],
+    },
+    'detail_animal': {
+        'gabarits': ['animaux/detail_animal.html'],
+        'css': ['animaux/css/detail_animal.css'],
+    },
+    'a_propos': {
+        'gabarits': ['animaux/a_propos.html'],
+        'css': ['animaux/css/a_propos.css'],
+    },
+    'auth': {
+        'gabarits': ['users/login.html', 'users/register.html'],
+        'css': ['users/css/auth.css'],
+    },
+}
+
 # Media files (uploads futurs)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache
+# LocMem suffit avec un seul processus (runserver, uvicorn) ; avec plusieurs workers,
+# utiliser un backend partagé (docker-compose.yml : FileBasedCache sur un volume commun)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'unispattes'),
+    }
+}
+
+# Durée de vie (secondes) des pages publiques en cache, invalidées dès qu'un
+# animal ou une demande change (voir animaux/cache.py)
+CACHE_PAGES_DUREE = int(os.environ.get('CACHE_PAGES_DUREE', 600))
+
+# Tâches en arrière-plan (django.tasks) : file en base, exécutée par `manage.py executer_taches`.
+# TACHES_IMMEDIATES=1 : exécution immédiate dans la requête (développement sans worker)
+TASKS = {
+    'default': {
+        'BACKEND': (
+            'django.tasks.backends.immediate.ImmediateBackend'
+            if os.environ.get('TACHES_IMMEDIATES') == '1'
+            else 'taches.backends.BaseDeDonneesBackend'
+        ),
+        # Tâche RUNNING depuis plus longtemps (worker tué) : reprise par un autre worker
+        'OPTIONS': {'delai_reprise': int(os.environ.get('TACHES_DELAI_REPRISE', 900))},
+    }
+}
+
+# E-mails (notifications des demandes d'adoption) : affichés dans la console par défaut,
+# SMTP avec EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'UniSpattes <ne-pas-repondre@unispattes.fr>')
+
 # URL de redirection pour login_required
 LOGIN_URL = 'users:connexion'
 
+# Limitation des tentatives de connexion (users/limitation.py) : échecs comptés
+# dans le cache sur une fenêtre glissante, par email et par adresse IP
+CONNEXION_FENETRE = int(os.environ.get('CONNEXION_FENETRE', 15 * 60))
+CONNEXION_MAX_EMAIL = int(os.environ.get('CONNEXION_MAX_EMAIL', 5))
+CONNEXION_MAX_IP = int(os.environ.get('CONNEXION_MAX_IP', 20))
+
 # Configuration Admin Interface
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 SILENCED_SYSTEM_CHECKS = ['security.W019']
@@ -0,0 +1,293 @@
+"""
+Fichiers statiques : noms avec empreinte, variantes compressées et service
+par l'application elle-même.
+
+collectstatic (StockageStatiques) écrit chaque fichier sous un nom qui
+contient l'empreinte de son contenu (style.3f2a1c9b.css, références des CSS
+réécrites) et, pour les formats texte (CSS, JS, SVG…), une variante .gz et
+.br quand elle est plus petite. ServeurStatiquesMiddleware sert ensuite
+STATIC_ROOT avant sessions et base de données :
+- variante choisie selon Accept-Encoding (br, puis gzip) ;
+- Cache-Control immutable pour les noms avec empreinte : leur contenu ne
+  change jamais, un visiteur qui revient ne les redemande pas ;
+- ETag / Last-Modified (304) et requêtes Range (206) sur le fichier d'origine ;
+- contenu envoyé par blocs de TAILLE_BLOC (itérateur async sous ASGI) :
+  jamais un fichier ou une plage entière en mémoire.
+
+Le module brotli est facultatif : sans lui, seules les variantes gzip sont
+produites. Les paquets CSS / JS par page sont construits au même moment
+(config/paquets.py). STATIC_ROOT est indexé au premier fichier demandé : relancer le
+serveur après un collectstatic.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from functools import cache
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import paquets
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+EXTENSIONS_COMPRESSIBLES = {'.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf'}
+# Variantes (suffixe, Content-Encoding), par ordre de préférence
+ENCODAGES = [('.br', 'br'), ('.gz', 'gzip')]
+
+CACHE_IMMUABLE = 'public, max-age=31536000, immutable'
+# Nom sans empreinte : contenu susceptible de changer, revalidé à chaque fois (304 le plus souvent)
+CACHE_REVALIDE = 'public, no-cache'
+TAILLE_BLOC = 64 * 1024
+
+
+def _compresser(contenu):
+    """Variantes compressées de `contenu` qui font gagner au moins 5 %"""
+    variantes = {'.gz': gzip.compress(contenu, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(contenu, quality=11)
+    return {suffixe: donnees for suffixe, donnees in variantes.items() if len(donnees) < len(contenu) * 0.95}
+
+
+class StockageStatiques(ManifestStaticFilesStorage):
+    # Manifeste absent ou incomplet (développement, tests, fichier référencé mais absent) : nom d'origine
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            # Paquets par page (config/paquets.py) : empreinte et compression comme les autres fichiers
+            for nom in paquets.construire(self):
+                paths[nom] = (self, nom)
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for nom in sorted({*paths, *self.hashed_files.values()}):
+            if os.path.splitext(nom)[1].lower() not in EXTENSIONS_COMPRESSIBLES or not self.exists(nom):
+                continue
+            source = self.path(nom)
+            # Variantes déjà à jour (collectstatic relancé sans modification) : pas recompressées
+            if all(
+                os.path.exists(source + suffixe) and os.path.getmtime(source + suffixe) >= os.path.getmtime(source)
+                for suffixe, _ in ENCODAGES if suffixe != '.br' or brotli is not None
+            ):
+                continue
+            with open(source, 'rb') as fichier:
+                contenu = fichier.read()
+            for suffixe, donnees in _compresser(contenu).items():
+                with open(source + suffixe, 'wb') as fichier:
+                    fichier.write(donnees)
+                yield nom, nom + suffixe, True
+
+
+# ========== SERVICE ==========
+
+@dataclass(frozen=True)
+class Representation:
+    chemin: str
+    taille: int
+    etag: str
+    encodage: str | None = None
+
+
+@dataclass(frozen=True)
+class FichierStatique:
+    original: Representation
+    type_contenu: str
+    modifie: float
+    immuable: bool
+    variantes: dict = field(default_factory=dict)
+
+
+def _representation(chemin, etat, encodage=None):
+    suffixe = f'-{encodage}' if encodage else ''
+    return Representation(chemin, etat.st_size, f'"{etat.st_mtime_ns:x}-{etat.st_size:x}{suffixe}"', encodage)
+
+
+@cache
+def index():
+    """URL relative à STATIC_URL → FichierStatique, pour tout STATIC_ROOT"""
+    racine = str(settings.STATIC_ROOT or '')
+    if not racine or not os.path.isdir(racine):
+        return {}
+    try:
+        with open(os.path.join(racine, 'staticfiles.json'), encoding='utf-8') as fichier:
+            empreintes = set(json.load(fichier)['paths'].values())
+    except (OSError, ValueError, KeyError):
+        empreintes = set()
+
+    fichiers = {}
+    for dossier, _, noms in os.walk(racine):
+        for nom in noms:
+            chemin = os.path.join(dossier, nom)
+            relatif = os.path.relpath(chemin, racine).replace(os.sep, '/')
+            # Variantes, manifeste et fichiers cachés (empreinte des sources, config/demarrage.py)
+            if nom.endswith(('.gz', '.br')) or nom.startswith('.') or relatif == 'staticfiles.json':
+                continue
+            etat = os.stat(chemin)
+            type_contenu, _ = mimetypes.guess_type(nom)
+            type_contenu = type_contenu or 'application/octet-stream'
+            if type_contenu.startswith('text/') or type_contenu in ('application/javascript', 'application/json'):
+                type_contenu += '; charset=utf-8'
+            variantes = {}
+            for suffixe, encodage in ENCODAGES:
+                if os.path.exists(chemin + suffixe):
+                    variantes[encodage] = _representation(chemin + suffixe, os.stat(chemin + suffixe), encodage)
+            fichiers[relatif] = FichierStatique(
+                original=_representation(chemin, etat),
+                type_contenu=type_contenu,
+                modifie=etat.st_mtime,
+                immuable=relatif in empreintes,
+                variantes=variantes,
+            )
+    return fichiers
+
+
+def _encodages_acceptes(entete):
+    """Encodages acceptés par le client (q > 0)"""
+    acceptes = set()
+    for element in entete.split(','):
+        nom, _, parametres = element.strip().partition(';')
+        q = re.search(r'q\s*=\s*([0-9]*\.?[0-9]+)', parametres)
+        if nom and (q is None or float(q.group(1)) > 0):
+            acceptes.add(nom.strip().lower())
+    return acceptes
+
+
+def _plage(entete, taille):
+    """(début, fin incluse) d'un en-tête Range à une seule plage ; None si ignoré ; False si hors limites"""
+    correspondance = re.fullmatch(r'\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*', entete)
+    if not correspondance or correspondance.groups() == ('', ''):
+        # Plusieurs plages ou syntaxe inconnue : fichier entier (autorisé par la RFC 9110)
+        return None
+    debut, fin = correspondance.groups()
+    if debut == '':
+        # bytes=-500 : les 500 derniers octets
+        debut, fin = max(taille - int(fin), 0), taille - 1
+    else:
+        debut, fin = int(debut), min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        return False
+    return debut, fin
+
+
+def _blocs(chemin, debut, longueur):
+    """`longueur` octets du fichier à partir de `debut`, par blocs de TAILLE_BLOC"""
+    with open(chemin, 'rb') as fichier:
+        fichier.seek(debut)
+        while longueur > 0 and (bloc := fichier.read(min(TAILLE_BLOC, longueur))):
+            longueur -= len(bloc)
+            yield bloc
+
+
+async def _ablocs(chemin, debut, longueur):
+    """Version async de _blocs() : chaque lecture dans un thread, la boucle d'événements reste libre"""
+    blocs = _blocs(chemin, debut, longueur)
+    suivant = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (bloc := await suivant(blocs, None)) is not None:
+            yield bloc
+    finally:
+        # Client parti avant la fin : fichier refermé
+        blocs.close()
+
+
+def _preparer(request, fichier):
+    """(réponse, lecture) : lecture = (chemin, début, longueur) du contenu à envoyer, ou None"""
+    representation = fichier.original
+    plage = None
+    if 'HTTP_RANGE' in request.META and request.META.get('HTTP_IF_RANGE', representation.etag) == representation.etag:
+        # Les plages portent sur le fichier d'origine, jamais sur une variante compressée
+        plage = _plage(request.META['HTTP_RANGE'], representation.taille)
+    elif fichier.variantes:
+        acceptes = _encodages_acceptes(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        representation = next(
+            (variante for encodage, variante in fichier.variantes.items() if encodage in acceptes), representation,
+        )
+
+    response = StreamingHttpResponse(content_type=fichier.type_contenu)
+    response['Cache-Control'] = CACHE_IMMUABLE if fichier.immuable else CACHE_REVALIDE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = representation.etag
+    response['Last-Modified'] = http_date(fichier.modifie)
+    if fichier.variantes:
+        response['Vary'] = 'Accept-Encoding'
+    if representation.encodage:
+        response['Content-Encoding'] = representation.encodage
+
+    conditionnelle = get_conditional_response(
+        request, etag=representation.etag, last_modified=int(fichier.modifie), response=response,
+    )
+    if conditionnelle is not response:
+        return conditionnelle, None
+
+    if plage is False:
+        response.status_code = 416
+        response['Content-Range'] = f'bytes */{representation.taille}'
+        return response, None
+    debut, longueur = 0, representation.taille
+    if plage:
+        debut, fin = plage
+        longueur = fin - debut + 1
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {debut}-{fin}/{representation.taille}'
+    response['Content-Length'] = longueur
+    if request.method == 'HEAD':
+        return response, None
+    return response, (representation.chemin, debut, longueur)
+
+
+def _fichier_demande(request):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    prefixe = urlsplit(settings.STATIC_URL).path
+    if not request.path_info.startswith(prefixe):
+        return None
+    return index().get(request.path_info[len(prefixe):])
+
+
+def ServeurStatiquesMiddleware(get_response):
+    """Sert les fichiers de STATIC_ROOT (voir plus haut) ; le reste passe au middleware suivant"""
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            fichier = _fichier_demande(request)
+            if fichier is None:
+                return await get_response(request)
+            response, lecture = _preparer(request, fichier)
+            if lecture:
+                response.streaming_content = _ablocs(*lecture)
+            return response
+
+        return markcoroutinefunction(middleware)
+
+    def middleware(request):
+        fichier = _fichier_demande(request)
+        if fichier is None:
+            return get_response(request)
+        response, lecture = _preparer(request, fichier)
+        if lecture:
+            response.streaming_content = _blocs(*lecture)
+        return response
+
+    return middleware
+
+
+ServeurStatiquesMiddleware.sync_capable = True
+ServeurStatiquesMiddleware.async_capable = True
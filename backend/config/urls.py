@@ -3,10 +3,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from config import metriques
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('animaux.urls')),
     path('users/', include('users.urls')),
+    path('metrics', metriques.vue, name='metriques'),
 ]
 
 if settings.DEBUG:
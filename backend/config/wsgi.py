@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Gabarits et routes compilés avant la première requête (config/demarrage.py)
+from config.demarrage import prechauffer  # noqa: E402
+
+prechauffer()
@@ -0,0 +1,90 @@
+"""
+Serveur de production : Gunicorn, workers uvicorn (config/asgi.py) ou
+synchrones (config/wsgi.py avec SERVEUR_INTERFACE=wsgi).
+
+    gunicorn -c gunicorn.conf.py
+
+Le processus maître charge Django une seule fois (preload_app) et le
+préchauffe : applications importées (admin_interface, colorfield…), routes
+et gabarits compilés, admin compris. Les workers sont créés ensuite par fork
+et partagent cette mémoire en copie sur écriture. Chaque worker vérifie ses
+connexions à la base avant d'accepter des requêtes et est remplacé après
+SERVEUR_MAX_REQUETES requêtes, sans couper celles en cours.
+"""
+import gc
+import os
+
+INTERFACE = os.environ.get('SERVEUR_INTERFACE', 'asgi')
+
+if INTERFACE == 'wsgi':
+    wsgi_app = 'config.wsgi:application'
+    # Un thread par worker : la connexion ouverte au démarrage sert aux requêtes
+    worker_class = 'sync'
+else:
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+
+bind = os.environ.get('SERVEUR_ADRESSE', '0.0.0.0:8000')
+workers = int(os.environ.get('SERVEUR_WORKERS', os.cpu_count() or 1))
+preload_app = True
+
+# Recyclage : décalé d'un worker à l'autre pour qu'ils ne redémarrent pas tous ensemble
+max_requests = int(os.environ.get('SERVEUR_MAX_REQUETES', 2000))
+max_requests_jitter = max_requests // 10
+graceful_timeout = 30
+timeout = 60
+keepalive = 5
+
+# Battements des workers en mémoire plutôt que sur disque
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def when_ready(server):
+    """Maître, application chargée, avant le premier fork"""
+    from django.conf import settings
+    from django.db import connections
+
+    from config import metriques, pool
+    from config.demarrage import prechauffer
+
+    # Compteurs de /metrics : repartent de zéro avec le serveur (fichiers des workers précédents)
+    metriques.reinitialiser()
+    prechauffer(tous_les_gabarits=True)
+    # Aucune connexion ne doit être héritée par les workers (ni rendue au pool du maître)
+    connections.close_all()
+    pool.fermer_pools()
+    # Objets du préchauffage hors du ramasse-miettes : les workers ne les réécrivent pas
+    gc.freeze()
+    server.log.info("Django préchargé, workers : %s", server.num_workers)
+    if server.num_workers > 1 and settings.CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+        # Un cache par worker : invalidations et limites de connexion ne valent que pour un seul
+        server.log.warning(
+            "Cache LocMem avec %s workers : pages périmées servies par les autres workers après une "
+            "modification ; définir CACHE_BACKEND (ex : FileBasedCache, voir docker-compose.yml)",
+            server.num_workers,
+        )
+
+
+def post_worker_init(worker):
+    """Worker : la base doit répondre avant la première requête"""
+    from django.db import connections
+
+    for connexion in connections.all():
+        connexion.ensure_connection()
+
+
+def worker_exit(server, worker):
+    """
+    Worker recyclé ou arrêté : bilan de son pool de connexions (DB_POOL=1).
+    Pas appelé pour les workers uvicorn, qui s'arrêtent sur le signal reçu.
+    """
+    from config import pool
+
+    for alias, etat in pool.statistiques().items():
+        server.log.info(
+            "Pool %s (worker %s) : %d emprunts, %d ouvertures, %d attentes, %d reconnexions, %d expirations",
+            alias, worker.pid, etat['emprunts'], etat['ouvertures'], etat['attentes'],
+            etat['reconnexions'], etat['expirations'],
+        )
+    pool.fermer_pools()
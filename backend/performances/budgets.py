@@ -0,0 +1,177 @@
+"""
+Budgets de requêtes SQL par vue : nombre maximum et durée SQL cumulée.
+
+Un budget se déclare dans BUDGETS (par nom d'URL, « animaux:* » accepté) ou
+avec le décorateur @budget_sql sur la vue. BudgetSQLMiddleware (ajouté avec
+DEBUG=1) compte les requêtes de chaque réponse ; un dépassement est
+journalisé avec la pile d'appel de chaque requête, ou lève DepassementBudget
+si BUDGETS_SQL_STRICTS est vrai (tests : voir BudgetSQLMixin).
+"""
+import fnmatch
+import logging
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import modify_settings, override_settings
+
+logger = logging.getLogger(__name__)
+
+MIDDLEWARE = 'performances.budgets.BudgetSQLMiddleware'
+
+
+@dataclass(frozen=True)
+class Budget:
+    requetes: int
+    temps_ms: float | None = None
+
+
+# Nom d'URL (motif fnmatch) → budget ; le premier motif qui correspond s'applique.
+# Les requêtes de session et d'utilisateur connecté sont comprises.
+BUDGETS = {
+    # Pages publiques : session, utilisateur, animaux, pagination ; POST d'une demande d'adoption
+    'animaux:*': Budget(requetes=10, temps_ms=200),
+    # Connexion / inscription en POST : utilisateur, compteur de tentatives, session
+    'users:*': Budget(requetes=12, temps_ms=200),
+    # Listes de l'admin : indépendantes du nombre de lignes affichées
+    'admin:animaux_animal_changelist': Budget(requetes=8, temps_ms=300),
+    # Actions accepter / refuser comprises (POST sur la liste), avec la mise à jour des statistiques
+    'admin:animaux_demandeadoption_changelist': Budget(requetes=18, temps_ms=300),
+    'admin:users_utilisateur_changelist': Budget(requetes=8, temps_ms=300),
+}
+
+
+class DepassementBudget(AssertionError):
+    pass
+
+
+def budget_sql(requetes, temps_ms=None):
+    """Décorateur de vue : budget prioritaire sur BUDGETS"""
+    def decorateur(vue):
+        vue.budget_sql = Budget(requetes, temps_ms)
+        return vue
+    return decorateur
+
+
+def budget_pour(resolver_match):
+    """Budget de la vue résolue, ou None si elle n'en a pas"""
+    if resolver_match is None:
+        return None
+    budget = getattr(resolver_match.func, 'budget_sql', None)
+    if budget is not None:
+        return budget
+    for motif, budget in BUDGETS.items():
+        if fnmatch.fnmatchcase(resolver_match.view_name, motif):
+            return budget
+    return None
+
+
+# ========== COLLECTE DES REQUÊTES ==========
+
+@dataclass
+class RequeteSQL:
+    sql: str
+    duree: float
+    pile: list = field(repr=False)
+
+
+def _pile_projet():
+    """Cadres d'appel du projet (hors Django, bibliothèques et ce module)"""
+    racine = str(settings.BASE_DIR)
+    return [
+        cadre for cadre in traceback.extract_stack()
+        if cadre.filename.startswith(racine)
+        and 'site-packages' not in cadre.filename
+        and cadre.filename != __file__
+    ]
+
+
+class _Collecteur:
+    """execute_wrapper : note chaque requête, sa durée et d'où elle vient"""
+
+    def __init__(self):
+        self.requetes = []
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.requetes.append(RequeteSQL(sql, time.perf_counter() - debut, _pile_projet()))
+
+
+@contextmanager
+def collecter_requetes():
+    """Requêtes SQL du bloc, sur toutes les bases (principale et réplique éventuelle)"""
+    collecteur = _Collecteur()
+    with ExitStack() as pile:
+        for connection in connections.all():
+            pile.enter_context(connection.execute_wrapper(collecteur))
+        yield collecteur.requetes
+
+
+def rapport_depassement(vue, budget, requetes):
+    """Description du dépassement (requêtes et piles d'appel), ou None si le budget est tenu"""
+    temps_ms = sum(requete.duree for requete in requetes) * 1000
+    depassements = []
+    if len(requetes) > budget.requetes:
+        depassements.append(f"{len(requetes)} requêtes (budget : {budget.requetes})")
+    if budget.temps_ms is not None and temps_ms > budget.temps_ms:
+        depassements.append(f"{temps_ms:.1f} ms de SQL (budget : {budget.temps_ms} ms)")
+    if not depassements:
+        return None
+
+    lignes = [f"Budget SQL dépassé pour {vue} : {', '.join(depassements)}"]
+    for numero, requete in enumerate(requetes, 1):
+        lignes.append(f"\n{numero}. [{requete.duree * 1000:.1f} ms] {requete.sql}")
+        lignes.extend(ligne.rstrip() for ligne in traceback.format_list(requete.pile))
+    return '\n'.join(lignes)
+
+
+# ========== VÉRIFICATION ==========
+
+def BudgetSQLMiddleware(get_response):
+    """Vérifie le budget SQL de la vue appelée (développement et tests)"""
+    def middleware(request):
+        with collecter_requetes() as requetes:
+            response = get_response(request)
+
+        budget = budget_pour(request.resolver_match)
+        if budget is not None:
+            rapport = rapport_depassement(request.resolver_match.view_name, budget, requetes)
+            if rapport and settings.BUDGETS_SQL_STRICTS:
+                raise DepassementBudget(rapport)
+            if rapport:
+                logger.warning(rapport)
+        return response
+
+    return middleware
+
+
+class BudgetSQLMixin:
+    """
+    Pour un TestCase : chaque requête du client de test respecte le budget
+    de sa vue, sinon le test échoue avec le détail des requêtes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for reglage in (
+            modify_settings(MIDDLEWARE={'prepend': MIDDLEWARE}),
+            override_settings(BUDGETS_SQL_STRICTS=True),
+        ):
+            reglage.enable()
+            cls.addClassCleanup(reglage.disable)
+
+    def compter_requetes(self, url, **params):
+        """(nombre de requêtes SQL, réponse) d'un GET sur `url`, caches déjà remplis"""
+        # Premier appel : remplit les caches (thème admin_interface, permissions…)
+        self.client.get(url, params)
+        with collecter_requetes() as requetes:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(requetes), response
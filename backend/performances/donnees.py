@@ -0,0 +1,284 @@
+"""
+Génération d'un jeu de données synthétique (animaux, utilisateurs, demandes).
+
+Les descriptions, races et photos sont reprises de animaux_backup.json ;
+les insertions passent par bulk_create (pas de save() ni de signaux) et le
+mot de passe des comptes n'est haché qu'une fois. Le travail est découpé
+en lots indépendants (chacun avec son propre générateur aléatoire), qui
+peuvent être répartis sur plusieurs processus (voir seed_scale).
+"""
+import json
+import random
+from contextlib import contextmanager
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.utils import timezone
+
+from animaux.models import Animal, DemandeAdoption
+from animaux.statistiques import DECISIONS
+from config.routers import lire_sur_principale
+
+from . import processus as processus_lots
+
+FIXTURE_ANIMAUX = Path(settings.BASE_DIR) / 'animaux_backup.json'
+
+PRENOMS = ['Camille', 'Léa', 'Hugo', 'Louis', 'Emma', 'Jules', 'Chloé', 'Nathan', 'Inès', 'Lucas']
+NOMS = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau']
+NOMS_ANIMAUX = ['Luna', 'Max', 'Nala', 'Simba', 'Milo', 'Oscar', 'Rocky', 'Bella', 'Caramel', 'Filou']
+MOTIVATIONS = [
+    "Nous souhaitons offrir un foyer aimant à cet animal.",
+    "J'ai toujours eu des animaux et j'ai du temps à lui consacrer.",
+    "Notre famille cherche un compagnon calme pour les enfants.",
+]
+
+# Mot de passe commun des comptes générés
+MOT_DE_PASSE = 'Unispattes123!'
+PREFIXE_EMAILS = 'adoptant'
+
+# Historique simulé : arrivées des animaux et dates des demandes
+JOURS_HISTORIQUE = 3 * 365
+DELAI_DECISION_MAX = 30
+
+
+@lru_cache(maxsize=1)
+def modeles_animaux():
+    """Champs des animaux de la fixture, servant de modèles (description, race, photo…)"""
+    with open(FIXTURE_ANIMAUX, encoding='utf-8') as fichier:
+        return [objet['fields'] for objet in json.load(fichier) if objet['model'] == 'animaux.animal']
+
+
+@contextmanager
+def dates_explicites(modele, *champs):
+    """
+    Désactive auto_now / auto_now_add le temps d'un bulk_create : les dates
+    fournies sont gardées. Sans `champs`, tous les champs horodatés du modèle.
+    """
+    if champs:
+        champs = [modele._meta.get_field(champ) for champ in champs]
+    else:
+        champs = [
+            champ for champ in modele._meta.concrete_fields
+            if getattr(champ, 'auto_now', False) or getattr(champ, 'auto_now_add', False)
+        ]
+    etats = [(champ, champ.auto_now, champ.auto_now_add) for champ in champs]
+    for champ in champs:
+        champ.auto_now = champ.auto_now_add = False
+    try:
+        yield
+    finally:
+        for champ, auto_now, auto_now_add in etats:
+            champ.auto_now, champ.auto_now_add = auto_now, auto_now_add
+
+
+def _rng(graine, modele, debut):
+    """Générateur propre au lot : mêmes données quel que soit le découpage en processus"""
+    return random.Random(f"{graine}:{modele}:{debut}")
+
+
+def lots(total, taille):
+    """Bornes [debut, fin) des lots de `taille` éléments"""
+    return [(debut, min(debut + taille, total)) for debut in range(0, total, taille)]
+
+
+def lot_animaux(debut, fin, graine):
+    rng = _rng(graine, 'animaux', debut)
+    modeles = modeles_animaux()
+    aujourd_hui = date.today()
+    animaux = []
+    for i in range(debut, fin):
+        modele = rng.choice(modeles)
+        animaux.append(Animal(
+            nom=f"{rng.choice(NOMS_ANIMAUX)} {i}",
+            espece=modele['espece'],
+            race=modele['race'],
+            age_annees=modele['age_annees'],
+            age_mois=modele['age_mois'],
+            categorie_age=modele['categorie_age'],
+            sexe=rng.choice(['M', 'F']),
+            description=modele['description'],
+            photo=modele['photo'],
+            date_arrivee=aujourd_hui - timedelta(days=rng.randrange(JOURS_HISTORIQUE)),
+            # ~1 animal sur 5 déjà adopté
+            disponible=rng.random() > 0.2,
+        ))
+    with dates_explicites(Animal, 'date_arrivee'):
+        Animal.objects.bulk_create(animaux)
+    return len(animaux)
+
+
+def lot_utilisateurs(debut, fin, graine, mot_de_passe, prefixe=PREFIXE_EMAILS):
+    """`mot_de_passe` : déjà haché (make_password), commun à tous les comptes"""
+    Utilisateur = get_user_model()
+    rng = _rng(graine, 'utilisateurs', debut)
+    maintenant = timezone.now()
+    utilisateurs = []
+    for i in range(debut, fin):
+        email = f"{prefixe}{i}@example.com"
+        inscription = maintenant - timedelta(minutes=rng.randrange(JOURS_HISTORIQUE * 24 * 60))
+        utilisateurs.append(Utilisateur(
+            email=email,
+            username=email,
+            first_name=rng.choice(PRENOMS),
+            last_name=rng.choice(NOMS),
+            password=mot_de_passe,
+            date_inscription=inscription,
+            date_joined=inscription,
+        ))
+    with dates_explicites(Utilisateur, 'date_inscription'):
+        Utilisateur.objects.bulk_create(utilisateurs)
+    return len(utilisateurs)
+
+
+def lot_demandes(debut, fin, total, graine, animaux, utilisateurs):
+    """
+    Demandes [debut, fin) sur `total` : chaque lot tire ses couples
+    (utilisateur, animal) dans sa propre tranche de l'ensemble des couples,
+    donc jamais deux fois le même. L'email de la demande est celui de
+    l'utilisateur : unique_together = (email, animal) est respecté.
+
+    `animaux` : clés primaires ; `utilisateurs` : couples (clé primaire, email).
+    """
+    rng = _rng(graine, 'demandes', debut)
+    couples = len(animaux) * len(utilisateurs)
+    # Tranche de l'espace des couples proportionnelle à la part du lot
+    tranche = range(debut * couples // total, fin * couples // total)
+    statuts = [statut for statut, _ in DemandeAdoption.STATUT_DEMANDE_CHOICES]
+    maintenant = timezone.now()
+
+    demandes = []
+    # range() n'est pas matérialisé : le tirage reste léger même pour des milliards de couples
+    for couple in rng.sample(tranche, min(fin - debut, len(tranche))):
+        utilisateur, email = utilisateurs[couple // len(animaux)]
+        statut = rng.choices(statuts, weights=[6, 1, 3])[0]
+        anciennete = rng.randrange(1, JOURS_HISTORIQUE * 24 * 60)
+        date_demande = maintenant - timedelta(minutes=anciennete)
+        # Acceptée ou refusée : décision dans les DELAI_DECISION_MAX jours, jamais dans le futur
+        date_decision = None
+        if statut in DECISIONS:
+            delai = min(rng.randrange(1, DELAI_DECISION_MAX * 24 * 60), anciennete)
+            date_decision = date_demande + timedelta(minutes=delai)
+        demandes.append(DemandeAdoption(
+            animal_id=animaux[couple % len(animaux)],
+            utilisateur_id=utilisateur,
+            nom_complet=f"{rng.choice(PRENOMS)} {rng.choice(NOMS)}",
+            email=email,
+            telephone=f"06{rng.randrange(10 ** 8):08d}",
+            type_logement=rng.choice(DemandeAdoption.TYPE_LOGEMENT_CHOICES)[0],
+            statut_logement=rng.choice(DemandeAdoption.STATUT_LOGEMENT_CHOICES)[0],
+            a_autres_animaux=rng.random() < 0.4,
+            motivation=rng.choice(MOTIVATIONS),
+            disponibilite=rng.choice(DemandeAdoption.CHOIX_DISPONIBILITE)[0],
+            date_demande=date_demande,
+            date_decision=date_decision,
+            statut=statut,
+            traitee=statut != 'EN_ATTENTE',
+        ))
+    with dates_explicites(DemandeAdoption, 'date_demande'):
+        DemandeAdoption.objects.bulk_create(demandes)
+    return len(demandes)
+
+
+# ========== EXÉCUTION DES LOTS (un ou plusieurs processus) ==========
+
+def _executer_lots(taches, processus=1, contexte=None, progression=None):
+    """
+    Exécute les lots `taches` = [(nom de fonction, arguments)], sur un pool
+    de processus si demandé ; renvoie le nombre de lignes créées.
+    `contexte` : arguments nommés communs par fonction, envoyés une seule fois par processus.
+    """
+    import multiprocessing
+
+    if processus > 1 and len(taches) > 1:
+        # Les connexions ouvertes ne doivent pas être partagées avec les processus
+        connections.close_all()
+        pool = multiprocessing.get_context('spawn').Pool(
+            min(processus, len(taches)), processus_lots.initialiser, (contexte or {},),
+        )
+    else:
+        pool = None
+        processus_lots.definir_contexte(contexte or {})
+
+    total = 0
+    try:
+        if pool is not None:
+            resultats = pool.imap_unordered(processus_lots.executer, taches)
+        else:
+            resultats = map(processus_lots.executer, taches)
+        for cree in resultats:
+            total += cree
+            if progression:
+                progression(cree)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return total
+
+
+def generer(animaux, utilisateurs, demandes, graine=0, taille_lot=2000,
+            processus=1, prefixe=PREFIXE_EMAILS, progression=None):
+    """
+    Génère le jeu de données ; renvoie le nombre de lignes créées par modèle.
+    `progression(modele, lignes)` est appelée après chaque lot.
+    """
+    Utilisateur = get_user_model()
+    mot_de_passe = make_password(MOT_DE_PASSE)
+
+    def suivi(modele):
+        return (lambda lignes: progression(modele, lignes)) if progression else None
+
+    with lire_sur_principale():
+        dernier_animal = Animal.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        crees = {
+            'animaux': _executer_lots(
+                [('lot_animaux', (debut, fin, graine)) for debut, fin in lots(animaux, taille_lot)],
+                processus, progression=suivi('animaux'),
+            ),
+            'utilisateurs': _executer_lots(
+                [('lot_utilisateurs', (debut, fin, graine, mot_de_passe, prefixe))
+                 for debut, fin in lots(utilisateurs, taille_lot)],
+                processus, progression=suivi('utilisateurs'),
+            ),
+        }
+
+        # Les demandes portent sur les lignes créées ci-dessus
+        pks_animaux = list(Animal.objects.filter(pk__gt=dernier_animal).order_by('pk').values_list('pk', flat=True))
+        comptes = list(
+            Utilisateur.objects.filter(email__startswith=prefixe, email__endswith='@example.com')
+            .order_by('pk').values_list('pk', 'email')
+        )
+        demandes = min(demandes, len(pks_animaux) * len(comptes))
+        crees['demandes'] = _executer_lots(
+            [('lot_demandes', (debut, fin, demandes, graine)) for debut, fin in lots(demandes, taille_lot)],
+            processus,
+            contexte={'lot_demandes': {'animaux': pks_animaux, 'utilisateurs': comptes}},
+            progression=suivi('demandes'),
+        )
+
+    return crees
+
+
+# ========== OBJETS À L'UNITÉ (tests) ==========
+
+def nouvel_animal(numero, **champs):
+    """Animal minimal, non enregistré ; `champs` remplace les valeurs par défaut"""
+    return Animal(**{
+        'nom': f'Animal {numero}', 'espece': 'CHAT', 'age_annees': 2, 'categorie_age': 'adulte',
+        'sexe': 'F', 'description': 'Test', 'photo': 'animaux/test.jpg', **champs,
+    })
+
+
+def nouvelle_demande(animal, utilisateur, nom_complet, **champs):
+    """Demande minimale, non enregistrée, avec l'email de l'utilisateur"""
+    return DemandeAdoption(**{
+        'animal': animal, 'utilisateur': utilisateur, 'nom_complet': nom_complet, 'email': utilisateur.email,
+        'telephone': '0612345678', 'type_logement': 'MAISON_JARDIN', 'statut_logement': 'PROPRIETAIRE',
+        'motivation': 'Test', 'disponibilite': 'FLEXIBLE', **champs,
+    })
@@ -0,0 +1,207 @@
+"""
+Mesure de chaque requête, laissée active en production.
+
+MesureRequeteMiddleware note pour chaque requête : durée totale, durée de la
+vue, nombre et durée des requêtes SQL, temps de rendu des gabarits, hit ou
+miss du cache de pages (en-tête X-Cache de animaux/cache.py). Le résultat part :
+- dans l'en-tête Server-Timing (onglet Réseau du navigateur) ;
+- dans une ligne JSON du logger « performances.instrumentation » pour une
+  fraction INSTRUMENTATION_ECHANTILLON des requêtes, avec le nom d'URL
+  (animaux:detail_animal, admin:animaux_animal_changelist…) ;
+- dans les compteurs et histogrammes par nom d'URL de /metrics
+  (config/metriques.py), pour toutes les requêtes.
+
+La mesure en cours est dans une ContextVar : elle suit la requête dans les
+threads de sync_to_async (ORM des vues async). Les requêtes SQL sont
+chronométrées par un execute_wrapper posé sur chaque connexion à son
+ouverture, les rendus par une enveloppe de Template.render : hors requête
+mesurée, tous deux se réduisent à un test. La mesure est aussi posée sur
+request.mesure : le bench (performances/mesures.py) y lit ses totaux.
+"""
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+from config import metriques
+
+logger = logging.getLogger(__name__)
+
+METHODES = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+@dataclass
+class MesureRequete:
+    debut: float
+    debut_vue: float | None = None
+    vue: float = 0.0
+    requetes_sql: int = 0
+    sql: float = 0.0
+    rendu: float = 0.0
+    profondeur_rendu: int = 0
+
+
+_mesure = ContextVar('mesure_requete', default=None)
+
+
+# ========== SQL ET GABARITS ==========
+
+def _chronometrer_sql(execute, sql, params, many, context):
+    mesure = _mesure.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesure.sql += time.perf_counter() - debut
+        mesure.requetes_sql += 1
+
+
+def _installer_sql(connection, **kwargs):
+    # connection_created : à chaque ouverture (ou emprunt au pool) de la connexion
+    if _chronometrer_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_chronometrer_sql)
+
+
+def _envelopper_rendu(render):
+    def render_chronometre(template, context):
+        mesure = _mesure.get()
+        if mesure is None:
+            return render(template, context)
+        # Un {% include %} est compté dans le rendu du gabarit qui l'inclut
+        mesure.profondeur_rendu += 1
+        debut = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            mesure.profondeur_rendu -= 1
+            if mesure.profondeur_rendu == 0:
+                mesure.rendu += time.perf_counter() - debut
+
+    render_chronometre.instrumente = True
+    return render_chronometre
+
+
+def installer():
+    """Pose les chronomètres SQL et gabarits (une seule fois par processus)"""
+    connection_created.connect(_installer_sql, dispatch_uid='performances.instrumentation')
+    # Connexions déjà ouvertes du thread courant (tests : une connexion pour toute la classe)
+    for connection in connections.all(initialized_only=True):
+        _installer_sql(connection)
+    if not getattr(Template.render, 'instrumente', False):
+        Template.render = _envelopper_rendu(Template.render)
+
+
+# ========== RÉSULTAT ==========
+
+def server_timing(mesure, total, cache=None):
+    """Valeur de l'en-tête Server-Timing (durées en ms)"""
+    entrees = [
+        f'total;dur={total * 1000:.1f}',
+        f'vue;dur={mesure.vue * 1000:.1f}',
+        f'sql;dur={mesure.sql * 1000:.1f};desc="{mesure.requetes_sql} requetes"',
+        f'rendu;dur={mesure.rendu * 1000:.1f}',
+    ]
+    if cache:
+        entrees.append(f'cache;desc="{cache}"')
+    return ', '.join(entrees)
+
+
+def enregistrer_metriques(request, response, mesure, total, cache=None):
+    """Compteurs et histogrammes de /metrics (config/metriques.py)"""
+    correspondance = request.resolver_match
+    # URL non résolue (404) : une seule série, quel que soit le chemin demandé
+    url = correspondance.view_name if correspondance else 'inconnue'
+    # Méthode choisie par le client : hors de cette liste, une seule série
+    methode = request.method if request.method in METHODES else 'autre'
+    etiquettes = {'url': url}
+    compteurs = [('unispattes_requetes_total', 1, {**etiquettes, 'methode': methode, 'statut': response.status_code})]
+    if response.status_code >= 500:
+        compteurs.append(('unispattes_erreurs_total', 1, etiquettes))
+    if cache:
+        compteurs.append(('unispattes_cache_pages_total', 1, {'resultat': cache}))
+    metriques.enregistrer(compteurs, [
+        ('unispattes_requete_duree_secondes', total, etiquettes),
+        ('unispattes_requete_sql_requetes', mesure.requetes_sql, etiquettes),
+        ('unispattes_requete_sql_duree_secondes', mesure.sql, etiquettes),
+    ])
+
+
+def _terminer(request, response, mesure):
+    total = time.perf_counter() - mesure.debut
+    if mesure.debut_vue is not None:
+        mesure.vue = time.perf_counter() - mesure.debut_vue
+    # Pages publiques : posé par cache_page_anonyme
+    cache = response.get('X-Cache', '').lower() or None
+    if settings.INSTRUMENTATION_ENTETE:
+        response['Server-Timing'] = server_timing(mesure, total, cache)
+    if settings.METRIQUES:
+        enregistrer_metriques(request, response, mesure, total, cache)
+    if settings.INSTRUMENTATION_ECHANTILLON and random.random() < settings.INSTRUMENTATION_ECHANTILLON:
+        correspondance = request.resolver_match
+        logger.info(json.dumps({
+            'url': correspondance.view_name if correspondance else None,
+            'methode': request.method,
+            'statut': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'vue_ms': round(mesure.vue * 1000, 2),
+            'sql_requetes': mesure.requetes_sql,
+            'sql_ms': round(mesure.sql * 1000, 2),
+            'rendu_ms': round(mesure.rendu * 1000, 2),
+            'cache': cache,
+        }))
+    return response
+
+
+# ========== MIDDLEWARE ==========
+
+def MesureRequeteMiddleware(get_response):
+    """Mesure la requête, de ce middleware à la réponse (voir plus haut)"""
+    installer()
+
+    def commencer_vue(request, view_func, view_args, view_kwargs):
+        # Appelé juste avant la vue, après les autres middlewares
+        mesure = _mesure.get()
+        if mesure is not None:
+            mesure.debut_vue = time.perf_counter()
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            mesure = request.mesure = MesureRequete(time.perf_counter())
+            jeton = _mesure.set(mesure)
+            try:
+                response = await get_response(request)
+            finally:
+                _mesure.reset(jeton)
+            return _terminer(request, response, mesure)
+
+        async def process_view(request, view_func, view_args, view_kwargs):
+            commencer_vue(request, view_func, view_args, view_kwargs)
+
+        middleware.process_view = process_view
+        return markcoroutinefunction(middleware)
+
+    def middleware(request):
+        mesure = request.mesure = MesureRequete(time.perf_counter())
+        jeton = _mesure.set(mesure)
+        try:
+            response = get_response(request)
+        finally:
+            _mesure.reset(jeton)
+        return _terminer(request, response, mesure)
+
+    middleware.process_view = commencer_vue
+    return middleware
+
+
+MesureRequeteMiddleware.sync_capable = True
+MesureRequeteMiddleware.async_capable = True
@@ -0,0 +1,240 @@
+import json
+import statistics
+import subprocess
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from animaux.models import Animal
+from config import paquets
+from performances import donnees
+from performances.mesures import centile, mesurer, premier_rendu
+
+# Cache dédié : le bench ne vide jamais le cache réel
+CACHE_BENCH = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}}
+
+EMAIL_ADMIN = 'bench-admin@example.com'
+
+
+def urls_mesurees(animal_id):
+    """Nom → (URL, connecté en admin ?)"""
+    return {
+        'accueil': (reverse('animaux:accueil'), False),
+        'nos_animaux': (reverse('animaux:nos_animaux'), False),
+        'nos_animaux_filtres': (reverse('animaux:nos_animaux') + '?espece=CHAT&sexe=F&page=2', False),
+        'detail_animal': (reverse('animaux:detail_animal', args=[animal_id]), False),
+        'a_propos': (reverse('animaux:a_propos'), False),
+        'connexion': (reverse('users:connexion'), False),
+        'inscription': (reverse('users:inscription'), False),
+        'admin_animaux': (reverse('admin:animaux_animal_changelist'), True),
+        'admin_demandes': (reverse('admin:animaux_demandeadoption_changelist'), True),
+    }
+
+
+def _commit_git():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _resume(mesures):
+    durees = [m.duree * 1000 for m in mesures]
+    return {
+        'statut': mesures[-1].statut,
+        'latence_ms': {
+            'p50': round(centile(durees, 50), 2),
+            'p95': round(centile(durees, 95), 2),
+            'p99': round(centile(durees, 99), 2),
+            'moyenne': round(statistics.fmean(durees), 2),
+        },
+        'requetes_sql': max(m.requetes_sql for m in mesures),
+        'temps_sql_ms': round(statistics.fmean(m.temps_sql for m in mesures) * 1000, 2),
+        'rendu_ms': round(statistics.fmean(m.temps_rendu for m in mesures) * 1000, 2),
+        'octets': mesures[-1].octets,
+    }
+
+
+def _resume_rendu(rendus):
+    return {
+        'ms': round(centile([r.duree * 1000 for r in rendus], 50), 2),
+        'octets_bloquants': rendus[-1].octets,
+        'ressources_bloquantes': rendus[-1].ressources,
+        'non_servies': rendus[-1].manquantes,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les pages publiques, connexion/inscription et les listes de l'admin "
+        "sur un jeu de données généré : latences p50/p95/p99, requêtes SQL, rendu, taille, "
+        "premier rendu (ressources bloquantes) et gains des paquets statiques"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animaux', type=int, default=500)
+        parser.add_argument('--utilisateurs', type=int, default=200)
+        parser.add_argument('--demandes', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=30, help="Requêtes mesurées par URL (défaut : 30)")
+        parser.add_argument('--graine', type=int, default=0, help="Graine du générateur (jeu de données reproductible)")
+        parser.add_argument('--url', action='append', dest='noms', help="Ne mesurer que cette URL (répétable)")
+        parser.add_argument(
+            '--avec-cache', action='store_true',
+            help="Garde le cache de pages entre deux requêtes (par défaut il est vidé : rendu complet)",
+        )
+        parser.add_argument('--sortie', help="Fichier JSON des résultats (défaut : bench-<date>.json)")
+        parser.add_argument('--comparer', help="JSON d'un bench précédent : affiche les écarts")
+        parser.add_argument(
+            '--base-actuelle', action='store_true',
+            help="Génère les données dans la base configurée au lieu d'une base de test temporaire",
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations doit être au moins 1")
+
+        try:
+            setup_test_environment()
+            environnement_test = True
+        except RuntimeError:
+            # Déjà en place (bench lancé depuis la suite de tests)
+            environnement_test = False
+        anciennes_bases = None
+        if not options['base_actuelle']:
+            anciennes_bases = setup_databases(verbosity=0, interactive=False, aliases=set(settings.DATABASES))
+        try:
+            with override_settings(CACHES=CACHE_BENCH):
+                resultats = self._bench(options)
+        finally:
+            if anciennes_bases is not None:
+                teardown_databases(anciennes_bases, verbosity=0)
+            if environnement_test:
+                teardown_test_environment()
+
+        sortie = options['sortie'] or f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(resultats, fichier, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {sortie}"))
+
+    def _bench(self, options):
+        self.stdout.write("Génération du jeu de données…")
+        crees = donnees.generer(
+            options['animaux'], options['utilisateurs'], options['demandes'], graine=options['graine'],
+        )
+        animal = Animal.objects.order_by('pk').values_list('pk', flat=True).first()
+        if animal is None:
+            raise CommandError("--animaux doit être au moins 1")
+        Utilisateur = get_user_model()
+        admin = Utilisateur.objects.filter(email=EMAIL_ADMIN).first() or Utilisateur.objects.create_superuser(
+            email=EMAIL_ADMIN, password=donnees.MOT_DE_PASSE, first_name='Bench', last_name='Admin',
+        )
+
+        anonyme = Client()
+        connecte = Client()
+        connecte.force_login(admin)
+
+        urls = urls_mesurees(animal)
+        if options['noms']:
+            inconnues = set(options['noms']) - set(urls)
+            if inconnues:
+                raise CommandError(f"URL inconnue(s) : {', '.join(sorted(inconnues))} (choix : {', '.join(urls)})")
+            urls = {nom: urls[nom] for nom in options['noms']}
+
+        resultats = {}
+        for nom, (url, en_admin) in urls.items():
+            client = connecte if en_admin else anonyme
+            # Échauffement : caches de processus (templates, permissions, thème admin)
+            mesurer(client, url)
+            mesures = []
+            for _ in range(options['iterations']):
+                if not options['avec_cache']:
+                    cache.clear()
+                mesures.append(mesurer(client, url))
+            resultats[nom] = {'url': url, **_resume(mesures)}
+
+            # Premier rendu : la page et ses ressources bloquantes (CSS critique en ligne ou feuilles)
+            rendus = []
+            for _ in range(options['iterations']):
+                if not options['avec_cache']:
+                    cache.clear()
+                rendus.append(premier_rendu(client, url))
+            resultats[nom]['premier_rendu'] = _resume_rendu(rendus)
+            if page := paquets.page_du_gabarit(rendus[-1].gabarit):
+                resultats[nom]['paquet'] = {'page': page, **paquets.rapport(page)}
+
+        precedent = None
+        if options['comparer']:
+            with open(options['comparer'], encoding='utf-8') as fichier:
+                precedent = json.load(fichier)['resultats']
+        self._afficher(resultats, precedent)
+
+        return {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_git(),
+            'django': django.get_version(),
+            'base': connection.vendor,
+            'jeu_de_donnees': {**crees, 'graine': options['graine']},
+            'iterations': options['iterations'],
+            'cache': options['avec_cache'],
+            'resultats': resultats,
+        }
+
+    def _afficher(self, resultats, precedent=None):
+        self.stdout.write(
+            f"\n{'URL':22} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>5} {'SQL ms':>8} "
+            f"{'rendu ms':>9} {'octets':>9}"
+        )
+        for nom, r in resultats.items():
+            ligne = (
+                f"{nom:22} {r['latence_ms']['p50']:8.1f} {r['latence_ms']['p95']:8.1f} "
+                f"{r['latence_ms']['p99']:8.1f} {r['requetes_sql']:5} {r['temps_sql_ms']:8.1f} "
+                f"{r['rendu_ms']:9.1f} {r['octets']:9}"
+            )
+            if r['statut'] != 200:
+                ligne += f"  (HTTP {r['statut']})"
+            if precedent and nom in precedent:
+                avant = precedent[nom]
+                ecart = (r['latence_ms']['p50'] / avant['latence_ms']['p50'] - 1) if avant['latence_ms']['p50'] else 0
+                ligne += f"  p50 {ecart:+.0%}, SQL {r['requetes_sql'] - avant['requetes_sql']:+d}"
+            self.stdout.write(ligne)
+        self._afficher_rendus(resultats, precedent)
+
+    def _afficher_rendus(self, resultats, precedent=None):
+        """Premier rendu et octets économisés par les paquets (sources → minifié → gzip)"""
+        self.stdout.write(
+            f"\n{'URL':22} {'rendu ms':>9} {'bloquant':>9} {'sources':>8} {'minifié':>8} "
+            f"{'gzip':>7} {'critique':>9} {'gain':>6}"
+        )
+        non_servies = 0
+        for nom, r in resultats.items():
+            rendu = r['premier_rendu']
+            non_servies += rendu['non_servies']
+            ligne = f"{nom:22} {rendu['ms']:9.1f} {rendu['octets_bloquants']:9}"
+            if paquet := r.get('paquet'):
+                ligne += (
+                    f" {paquet['sources']:8} {paquet['minifie']:8} {paquet['gzip']:7} {paquet['critique']:9}"
+                    f" {1 - paquet['gzip'] / paquet['sources']:6.0%}"
+                )
+            avant = (precedent or {}).get(nom, {}).get('premier_rendu')
+            if avant:
+                ecart = (rendu['ms'] / avant['ms'] - 1) if avant['ms'] else 0
+                ligne += f"  rendu {ecart:+.0%}, bloquant {rendu['octets_bloquants'] - avant['octets_bloquants']:+d} o"
+            self.stdout.write(ligne)
+        if non_servies:
+            self.stdout.write(self.style.WARNING(
+                f"{non_servies} ressource(s) bloquante(s) non servie(s) : lancer collectstatic avec DEBUG=0"
+            ))
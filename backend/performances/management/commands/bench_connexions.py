@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from animaux.models import Animal
+from config import pool
+from performances.mesures import centile
+
+MODES = {'sans_pool': '0', 'pool': '1'}
+
+# Aucun cache : chaque requête interroge la base
+SANS_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def urls_animaux(animal_id):
+    return {
+        'accueil': reverse('animaux:accueil'),
+        'nos_animaux': reverse('animaux:nos_animaux'),
+        'detail_animal': reverse('animaux:detail_animal', args=[animal_id]),
+        'a_propos': reverse('animaux:a_propos'),
+    }
+
+
+@contextmanager
+def ouvertures_comptees(latence):
+    """
+    Compte les connexions réellement ouvertes et ajoute `latence` secondes à
+    chacune : poignée de main TCP + authentification d'un MySQL distant,
+    quand la base locale (SQLite) n'en a pas.
+    """
+    connexion = connections[DEFAULT_DB_ALIAS]
+    # Moteur de Django sous-jacent (sous AvecPool pour le pool)
+    moteur = next(
+        classe for classe in type(connexion).__mro__
+        if classe.__module__.startswith('django.db.backends.') and 'get_new_connection' in vars(classe)
+    )
+    origine = moteur.get_new_connection
+    compte = {'ouvertures': 0}
+    verrou = threading.Lock()
+
+    def get_new_connection(self, conn_params):
+        with verrou:
+            compte['ouvertures'] += 1
+        time.sleep(latence)
+        return origine(self, conn_params)
+
+    moteur.get_new_connection = get_new_connection
+    try:
+        yield compte
+    finally:
+        moteur.get_new_connection = origine
+
+
+def _requetes(url, nombre):
+    """`nombre` GET de `url` avec fin de requête comme sous un vrai serveur ; durées en s"""
+    # Hors environnement de test : « testserver » n'est pas dans ALLOWED_HOSTS
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    durees = []
+    for _ in range(nombre):
+        debut = time.perf_counter()
+        reponse = client.get(url)
+        # Le client de test garde la connexion : le serveur, lui, la ferme (ou la rend au pool)
+        close_old_connections()
+        durees.append(time.perf_counter() - debut)
+        if reponse.status_code != 200:
+            raise CommandError(f"{url} : HTTP {reponse.status_code}")
+    return durees
+
+
+class Command(BaseCommand):
+    help = (
+        "Effet du pool de connexions (config/pool.py) sur les vues d'animaux : mêmes requêtes "
+        "sans pool (une connexion par requête) puis avec pool, latences, débit et connexions ouvertes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Requêtes par URL (défaut : 200)")
+        parser.add_argument('--threads', type=int, default=4, help="Requêtes simultanées (défaut : 4)")
+        parser.add_argument(
+            '--latence-connexion', type=float, default=0.0,
+            help="Millisecondes ajoutées à chaque ouverture de connexion (SQLite à la place de MySQL)",
+        )
+        parser.add_argument('--taille', type=int, help="DB_POOL_TAILLE du mode pool (défaut : réglage courant)")
+        # Processus enfant : mesure un seul mode, résultats en JSON
+        parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self._mesurer(options)))
+            return
+
+        # Un processus par mode : le moteur de base est choisi au chargement des settings
+        resultats = {}
+        for mode, db_pool in MODES.items():
+            env = {**os.environ, 'DB_POOL': db_pool}
+            if options['taille']:
+                env['DB_POOL_TAILLE'] = str(options['taille'])
+            processus = subprocess.run(
+                [
+                    sys.executable, 'manage.py', 'bench_connexions', '--mode', mode,
+                    '--iterations', str(options['iterations']), '--threads', str(options['threads']),
+                    '--latence-connexion', str(options['latence_connexion']),
+                ],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if processus.returncode:
+                erreur = processus.stderr.strip().splitlines() or [f"code {processus.returncode}"]
+                raise CommandError(f"{mode} : {erreur[-1]}")
+            resultats[mode] = json.loads(processus.stdout.strip().splitlines()[-1])
+        self._afficher(resultats, options)
+
+    def _mesurer(self, options):
+        avec_pool = bool(connections[DEFAULT_DB_ALIAS].settings_dict.get('POOL'))
+        if avec_pool != (options['mode'] == 'pool'):
+            raise CommandError("DB_POOL n'est pas pris en compte par ces settings (DATABASES redéfini ?)")
+        animal = Animal.objects.order_by('pk').values_list('pk', flat=True).first()
+        if animal is None:
+            raise CommandError("Aucun animal en base : lancer seed_scale ou charger les données de démonstration")
+        close_old_connections()
+
+        resultats = {}
+        with override_settings(CACHES=SANS_CACHE), ouvertures_comptees(options['latence_connexion'] / 1000) as compte:
+            for nom, url in urls_animaux(animal).items():
+                # Échauffement : gabarits compilés, pool rempli
+                _requetes(url, options['threads'])
+                compte['ouvertures'] = 0
+                parts = [options['iterations'] // options['threads']] * options['threads']
+                debut = time.perf_counter()
+                with ThreadPoolExecutor(options['threads']) as executeur:
+                    durees = [d for lot in executeur.map(_requetes, [url] * len(parts), parts) for d in lot]
+                duree = time.perf_counter() - debut
+                durees_ms = [d * 1000 for d in durees]
+                resultats[nom] = {
+                    'p50': centile(durees_ms, 50),
+                    'p95': centile(durees_ms, 95),
+                    'moyenne': statistics.fmean(durees_ms),
+                    'debit': len(durees) / duree,
+                    'ouvertures': compte['ouvertures'],
+                }
+        return {'vues': resultats, 'pool': pool.statistiques().get(DEFAULT_DB_ALIAS)}
+
+    def _afficher(self, resultats, options):
+        self.stdout.write(
+            f"{options['iterations']} requêtes par URL, {options['threads']} thread(s), "
+            f"+{options['latence_connexion']:g} ms par connexion ouverte\n"
+        )
+        self.stdout.write(
+            f"{'URL':15} {'mode':10} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>8} {'connexions':>11}"
+        )
+        for nom in resultats['sans_pool']['vues']:
+            for mode in MODES:
+                r = resultats[mode]['vues'][nom]
+                ligne = (
+                    f"{nom:15} {mode:10} {r['p50']:8.2f} {r['p95']:8.2f} {r['debit']:8.0f} {r['ouvertures']:11}"
+                )
+                if mode == 'pool':
+                    avant = resultats['sans_pool']['vues'][nom]
+                    ligne += f"  p50 {r['p50'] / avant['p50'] - 1:+.0%}, débit {r['debit'] / avant['debit'] - 1:+.0%}"
+                self.stdout.write(ligne)
+
+        metriques = resultats['pool']['pool']
+        if metriques:
+            self.stdout.write(
+                f"\nPool : {metriques['emprunts']} emprunts, {metriques['ouvertures']} ouvertures, "
+                f"{metriques['attentes']} attentes ({metriques['attente_moyenne'] * 1000:.1f} ms en moyenne), "
+                f"{metriques['reconnexions']} reconnexions, {metriques['expirations']} expirations "
+                f"(taille {metriques['taille']})"
+            )
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from performances import sauvegarde
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte utilisateurs, animaux et demandes en JSON Lines (format dumpdata --format jsonl), "
+        "par lots et en mémoire bornée ; compressé si le fichier finit par .gz"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Fichier de sortie (ex : sauvegarde.jsonl.gz)")
+        parser.add_argument(
+            '--modele', action='append', dest='modeles',
+            help=f"Modèle à exporter, répétable (défaut : {', '.join(sauvegarde.MODELES)})",
+        )
+        parser.add_argument('--taille-lot', type=int, default=sauvegarde.TAILLE_LOT)
+        parser.add_argument(
+            '--reprendre', action='store_true',
+            help="Reprend un export interrompu au dernier lot écrit",
+        )
+
+    def handle(self, *args, **options):
+        modeles = options['modeles'] or sauvegarde.MODELES
+        inconnus = set(modeles) - set(sauvegarde.MODELES)
+        if inconnus:
+            raise CommandError(f"Modèle(s) inconnu(s) : {', '.join(sorted(inconnus))}")
+        # Toujours dans l'ordre des clés étrangères
+        modeles = [label for label in sauvegarde.MODELES if label in modeles]
+
+        debut = time.perf_counter()
+        exportes = sauvegarde.exporter(
+            options['fichier'], modeles, taille_lot=options['taille_lot'],
+            reprendre=options['reprendre'], progression=self._progression,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{sum(exportes.values())} objets exportés dans {options['fichier']} "
+            f"en {time.perf_counter() - debut:.1f} s."
+        ))
+
+    def _progression(self, modele, lignes):
+        self.stdout.write(f"{modele:24} +{lignes}")
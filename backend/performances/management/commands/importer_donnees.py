@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from performances import sauvegarde
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un fichier JSON Lines (exporter_donnees ou dumpdata --format jsonl) par bulk_create, "
+        "en gardant les clés primaires ; .gz accepté"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier')
+        parser.add_argument('--taille-lot', type=int, default=sauvegarde.TAILLE_LOT)
+        parser.add_argument(
+            '--reprendre', action='store_true',
+            help="Reprend un import interrompu après le dernier lot validé",
+        )
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        importes = sauvegarde.importer(
+            options['fichier'], taille_lot=options['taille_lot'],
+            reprendre=options['reprendre'], progression=self._progression,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{sum(importes.values())} objets importés en {time.perf_counter() - debut:.1f} s."
+        ))
+
+    def _progression(self, modele, lignes):
+        self.stdout.write(f"{modele:24} +{lignes}")
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from config import demarrage
+
+
+class Command(BaseCommand):
+    help = (
+        "Prépare le démarrage du serveur : migrate seulement s'il reste des migrations, "
+        "collectstatic seulement si les sources des statiques ont changé"
+    )
+    # Les contrôles système tournent déjà dans migrate / collectstatic quand ils sont nécessaires
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forcer', action='store_true', help="Lance migrate et collectstatic dans tous les cas")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        verbosite = max(options['verbosity'] - 1, 0)
+
+        if options['forcer'] or demarrage.migrations_en_attente():
+            self.stdout.write("Migrations à appliquer…")
+            call_command('migrate', interactive=False, verbosity=verbosite)
+        else:
+            self.stdout.write("Migrations : à jour")
+
+        empreinte = demarrage.empreinte_sources()
+        if options['forcer'] or not demarrage.statiques_a_jour(empreinte):
+            self.stdout.write("Fichiers statiques modifiés : collectstatic…")
+            call_command('collectstatic', interactive=False, verbosity=verbosite)
+            demarrage.enregistrer_empreinte(empreinte)
+        else:
+            self.stdout.write("Fichiers statiques : à jour")
+
+        self.stdout.write(self.style.SUCCESS(f"Démarrage préparé en {time.perf_counter() - debut:.2f} s"))
@@ -0,0 +1,79 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from animaux import statistiques
+from animaux.cache import invalider
+from performances import donnees
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un gros jeu de données synthétique (animaux, utilisateurs, demandes) "
+        "par bulk_create, éventuellement sur plusieurs processus"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animaux', type=int, default=100_000)
+        parser.add_argument('--utilisateurs', type=int, default=500_000)
+        parser.add_argument('--demandes', type=int, default=2_000_000)
+        parser.add_argument('--processus', type=int, default=1, help="Processus d'insertion en parallèle (MySQL)")
+        parser.add_argument('--taille-lot', type=int, default=2000, help="Lignes par bulk_create (défaut : 2000)")
+        parser.add_argument('--graine', type=int, default=0, help="Graine du générateur (données reproductibles)")
+        parser.add_argument(
+            '--prefixe', default=donnees.PREFIXE_EMAILS,
+            help="Préfixe des emails générés (<prefixe><n>@example.com)",
+        )
+
+    def handle(self, *args, **options):
+        processus = options['processus']
+        if processus > 1 and connection.vendor == 'sqlite':
+            # Une seule écriture à la fois sur un fichier SQLite
+            self.stdout.write(self.style.WARNING("SQLite : génération sur un seul processus."))
+            processus = 1
+
+        Utilisateur = get_user_model()
+        if Utilisateur.objects.filter(email__startswith=options['prefixe'], email__endswith='@example.com').exists():
+            raise CommandError(
+                f"Des comptes {options['prefixe']}…@example.com existent déjà : choisir un autre --prefixe."
+            )
+
+        objectifs = {
+            'animaux': options['animaux'],
+            'utilisateurs': options['utilisateurs'],
+            'demandes': options['demandes'],
+        }
+        avancement = dict.fromkeys(objectifs, 0)
+        debut = time.perf_counter()
+
+        def progression(modele, lignes):
+            avancement[modele] += lignes
+            self.stdout.write(
+                f"\r{modele:13} {avancement[modele]:>10} / {objectifs[modele]}",
+                ending='\n' if avancement[modele] >= objectifs[modele] else '',
+            )
+            self.stdout.flush()
+
+        crees = donnees.generer(
+            options['animaux'], options['utilisateurs'], options['demandes'],
+            graine=options['graine'], taille_lot=options['taille_lot'],
+            processus=processus, prefixe=options['prefixe'], progression=progression,
+        )
+
+        # Nouveaux animaux : les pages du catalogue en cache sont périmées
+        invalider('catalogue')
+
+        if crees['demandes']:
+            # Demandes insérées par bulk_create : résumé du tableau de bord recalculé
+            self.stdout.write("Statistiques des demandes…")
+            statistiques.reconstruire()
+
+        duree = time.perf_counter() - debut
+        lignes = sum(crees.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{crees['animaux']} animaux, {crees['utilisateurs']} utilisateurs, "
+            f"{crees['demandes']} demandes en {duree:.1f} s ({lignes / duree:.0f} lignes/s)."
+        ))
+        self.stdout.write(f"Mot de passe des comptes générés : {donnees.MOT_DE_PASSE}.")
@@ -0,0 +1,108 @@
+"""
+Mesure d'une requête : durée totale, requêtes SQL (nombre et durée),
+temps de rendu des templates et taille de la réponse ; premier rendu
+d'une page (HTML et ressources qui bloquent son affichage).
+"""
+import math
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class Mesure:
+    duree: float
+    requetes_sql: int
+    temps_sql: float
+    temps_rendu: float
+    octets: int
+    statut: int
+
+
+def mesurer(client, url):
+    """
+    GET `url` avec le client de test et renvoie sa Mesure. Le temps de rendu
+    est celui noté par MesureRequeteMiddleware (performances/instrumentation.py).
+    """
+    with _capturer_requetes() as captures:
+        debut = time.perf_counter()
+        response = client.get(url)
+        duree = time.perf_counter() - debut
+
+    requetes = [requete for capture in captures for requete in capture.captured_queries]
+    return Mesure(
+        duree=duree,
+        requetes_sql=len(requetes),
+        temps_sql=sum(float(requete['time']) for requete in requetes),
+        temps_rendu=response.wsgi_request.mesure.rendu,
+        octets=len(response.content),
+        statut=response.status_code,
+    )
+
+
+@contextmanager
+def _capturer_requetes():
+    """Requêtes de toutes les bases (principale et réplique éventuelle)"""
+    with ExitStack() as pile:
+        yield [
+            pile.enter_context(CaptureQueriesContext(connection))
+            for connection in connections.all()
+        ]
+
+
+@dataclass
+class PremierRendu:
+    duree: float
+    octets: int
+    ressources: int
+    manquantes: int
+    gabarit: str | None
+
+
+# Feuilles de style chargées normalement, scripts de <head> sans defer / async
+_BLOQUANTES = re.compile(
+    r'<link\b(?=[^>]*\brel="stylesheet")[^>]*\bhref="([^"]+)"'
+    r'|<script\b(?![^>]*\b(?:defer|async)\b)[^>]*\bsrc="([^"]+)"'
+)
+
+
+def premier_rendu(client, url):
+    """
+    Ce qu'attend le navigateur avant d'afficher `url` : la page, puis les
+    ressources bloquantes de son <head> (compressées si possible). Les
+    ressources non servies (statiques non collectés) sont comptées à part.
+    """
+    debut = time.perf_counter()
+    response = client.get(url)
+    html = response.content.decode()
+    # <noscript> : ignoré par un navigateur qui exécute JavaScript
+    entete = re.sub(r'<noscript>.*?</noscript>', '', html[:html.find('</head>')], flags=re.S)
+    octets, ressources, manquantes = len(response.content), 0, 0
+    for feuille, script in _BLOQUANTES.findall(entete):
+        chemin = feuille or script
+        # Ressource d'un autre domaine (polices…) : hors mesure
+        ressource = None if chemin.startswith('//') or not chemin.startswith('/') else client.get(
+            chemin, HTTP_ACCEPT_ENCODING='br, gzip',
+        )
+        if ressource is None or ressource.status_code != 200:
+            manquantes += 1
+            continue
+        ressources += 1
+        octets += len(ressource.getvalue())
+    return PremierRendu(
+        duree=time.perf_counter() - debut,
+        octets=octets,
+        ressources=ressources,
+        manquantes=manquantes,
+        gabarit=response.templates[0].name if response.templates else None,
+    )
+
+
+def centile(valeurs, p):
+    """Centile `p` (0-100) par rang le plus proche"""
+    triees = sorted(valeurs)
+    return triees[max(1, math.ceil(p / 100 * len(triees))) - 1]
@@ -0,0 +1,32 @@
+"""
+Exécution de lots de génération sur plusieurs processus (voir donnees.py).
+
+Module séparé de donnees.py : un processus démarré en « spawn » doit
+pouvoir l'importer avant django.setup(), donc sans importer de modèles.
+"""
+_contexte = {}
+
+
+def definir_contexte(contexte):
+    """Arguments nommés communs par fonction (ex : clés primaires pour lot_demandes)"""
+    _contexte.clear()
+    _contexte.update(contexte)
+
+
+def initialiser(contexte):
+    """Processus de travail : Django prêt et contexte partagé"""
+    import django
+    django.setup()
+
+    # Connexion ouverte d'avance : SQLite lit ses limites (taille des lots) sur la connexion
+    from django.db import connection
+    connection.ensure_connection()
+    definir_contexte(contexte)
+
+
+def executer(tache):
+    """`tache` = (nom d'une fonction de donnees.py, arguments)"""
+    from performances import donnees
+
+    nom, arguments = tache
+    return getattr(donnees, nom)(*arguments, **_contexte.get(nom, {}))
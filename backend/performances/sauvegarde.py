@@ -0,0 +1,199 @@
+"""
+Sauvegarde et restauration en JSON Lines des utilisateurs, animaux et demandes.
+
+Même format que `dumpdata --format jsonl` (un objet par ligne), mais la
+mémoire reste bornée : l'export lit la base par lots paginés sur la clé
+primaire, l'import insère par bulk_create au fil de la lecture. Après une
+interruption, --reprendre repart du dernier lot écrit (fichier
+<sauvegarde>.reprise-export / .reprise-import). Un nom en .gz est compressé.
+"""
+import gzip
+import itertools
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from animaux import statistiques
+from animaux.cache import invalider
+from config.routers import lire_sur_principale
+
+from .donnees import dates_explicites
+
+# Ordre des clés étrangères : une demande référence un animal et un utilisateur
+MODELES = ['users.Utilisateur', 'animaux.Animal', 'animaux.DemandeAdoption']
+TAILLE_LOT = 2000
+
+
+class _EncodeurExact(DjangoJSONEncoder):
+    """DjangoJSONEncoder arrondit les heures à la milliseconde : une sauvegarde garde les microsecondes"""
+
+    def default(self, o):
+        if isinstance(o, (datetime, time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _compresse(chemin):
+    return str(chemin).endswith('.gz')
+
+
+def _lire_reprise(chemin):
+    try:
+        with open(chemin, encoding='utf-8') as fichier:
+            return json.load(fichier)
+    except FileNotFoundError:
+        return None
+
+
+def _ecrire_reprise(chemin, etat):
+    """Écriture atomique : le fichier de reprise n'est jamais à moitié écrit"""
+    temporaire = f'{chemin}.tmp'
+    with open(temporaire, 'w', encoding='utf-8') as fichier:
+        json.dump(etat, fichier)
+    os.replace(temporaire, chemin)
+
+
+def _supprimer_reprise(chemin):
+    try:
+        os.remove(chemin)
+    except FileNotFoundError:
+        pass
+
+
+# ========== EXPORT ==========
+
+def exporter(chemin, modeles=MODELES, taille_lot=TAILLE_LOT, reprendre=False, progression=None):
+    """
+    Écrit les objets de `modeles` dans `chemin` ; renvoie le nombre de lignes par modèle.
+    `progression(modele, lignes)` est appelée après chaque lot.
+    """
+    reprise = f'{chemin}.reprise-export'
+    etat = (_lire_reprise(reprise) if reprendre else None) or {'octets': 0, 'derniers': {}, 'termines': []}
+    exportes = dict.fromkeys(modeles, 0)
+
+    # Fichier tronqué au dernier lot complet (une ligne à moitié écrite est perdue)
+    with open(chemin, 'r+b' if etat['octets'] else 'wb') as fichier, lire_sur_principale():
+        fichier.truncate(etat['octets'])
+        fichier.seek(etat['octets'])
+
+        for label in modeles:
+            if label in etat['termines']:
+                continue
+            modele = apps.get_model(label)
+            m2m = [champ.name for champ in modele._meta.local_many_to_many]
+            objets = modele._default_manager.order_by('pk').prefetch_related(*m2m)
+            dernier = etat['derniers'].get(label)
+
+            while True:
+                lot = list((objets if dernier is None else objets.filter(pk__gt=dernier))[:taille_lot])
+                if not lot:
+                    break
+                # Groupes et permissions (m2m de l'utilisateur) par clé naturelle :
+                # leurs clés primaires diffèrent d'une base à l'autre
+                donnees = serializers.serialize(
+                    'jsonl', lot, cls=_EncodeurExact, use_natural_foreign_keys=bool(m2m),
+                ).encode()
+                if _compresse(chemin):
+                    # Un membre gzip par lot : le fichier reste lisible s'il est tronqué entre deux lots
+                    donnees = gzip.compress(donnees)
+                fichier.write(donnees)
+                fichier.flush()
+                os.fsync(fichier.fileno())
+
+                dernier = lot[-1].pk
+                exportes[label] += len(lot)
+                etat['octets'] = fichier.tell()
+                etat['derniers'][label] = dernier
+                _ecrire_reprise(reprise, etat)
+                if progression:
+                    progression(label, len(lot))
+
+            etat['termines'].append(label)
+            _ecrire_reprise(reprise, etat)
+
+    _supprimer_reprise(reprise)
+    return exportes
+
+
+# ========== IMPORT ==========
+
+def _liens_m2m(objets):
+    """Lignes des tables de liaison (groupes, permissions) des objets désérialisés"""
+    liens = defaultdict(list)
+    for objet in objets:
+        for nom, cibles in (objet.m2m_data or {}).items():
+            champ = objet.object._meta.get_field(nom)
+            table = champ.remote_field.through
+            liens[table].extend(
+                table(**{champ.m2m_column_name(): objet.object.pk, champ.m2m_reverse_name(): cible})
+                for cible in cibles
+            )
+    return liens
+
+
+def _inserer(lignes, ignorer_conflits):
+    """Insère un lot de lignes JSON ; renvoie les objets insérés par modèle"""
+    inseres = {}
+    objets = serializers.deserialize('jsonl', lignes)
+    with transaction.atomic():
+        for modele, groupe in itertools.groupby(objets, key=lambda objet: type(objet.object)):
+            groupe = list(groupe)
+            with dates_explicites(modele):
+                modele._default_manager.bulk_create(
+                    [objet.object for objet in groupe], ignore_conflicts=ignorer_conflits,
+                )
+            for table, liens in _liens_m2m(groupe).items():
+                table._default_manager.bulk_create(liens, ignore_conflicts=ignorer_conflits)
+            inseres.setdefault(modele, []).extend(objet.object for objet in groupe)
+    return inseres
+
+
+def importer(chemin, taille_lot=TAILLE_LOT, reprendre=False, progression=None):
+    """
+    Insère les objets de `chemin` (clés primaires conservées) ; renvoie le
+    nombre de lignes par modèle. `progression(modele, lignes)` après chaque lot.
+    """
+    reprise = f'{chemin}.reprise-import'
+    deja_importees = ((_lire_reprise(reprise) if reprendre else None) or {}).get('lignes', 0)
+    lignes_lues = deja_importees
+    importes = {}
+
+    ouvrir = gzip.open if _compresse(chemin) else open
+    with ouvrir(chemin, 'rt', encoding='utf-8') as fichier:
+        # Lignes déjà importées : relues mais pas réinsérées
+        fichier = itertools.islice(fichier, deja_importees, None)
+        while lot := list(itertools.islice(fichier, taille_lot)):
+            # Premier lot après une reprise : il a pu être validé juste avant l'interruption
+            inseres = _inserer(lot, ignorer_conflits=reprendre and lignes_lues == deja_importees)
+            lignes_lues += len(lot)
+            _ecrire_reprise(reprise, {'lignes': lignes_lues})
+
+            for modele, objets in inseres.items():
+                importes[modele._meta.label] = importes.get(modele._meta.label, 0) + len(objets)
+                if modele._meta.label == 'animaux.Animal':
+                    # bulk_create n'envoie pas post_save : fiches en cache invalidées ici
+                    invalider(*(f'animal:{objet.pk}' for objet in objets))
+                if progression:
+                    progression(modele._meta.label, len(objets))
+
+    # Clés primaires explicites : les séquences (PostgreSQL) sont recalées, comme après loaddata
+    modeles = [apps.get_model(label) for label in importes]
+    sequences = connection.ops.sequence_reset_sql(no_style(), modeles)
+    if sequences:
+        with connection.cursor() as curseur:
+            for requete in sequences:
+                curseur.execute(requete)
+
+    invalider('catalogue')
+    if 'animaux.DemandeAdoption' in importes:
+        # bulk_create ne passe pas par statistiques.enregistrer()
+        statistiques.reconstruire()
+    _supprimer_reprise(reprise)
+    return importes
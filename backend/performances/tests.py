@@ -0,0 +1,445 @@
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError
+from django.db.models import F
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from animaux.cache import _cle_version
+from animaux.models import Animal, DemandeAdoption
+from config import demarrage, metriques, pool
+from performances.budgets import Budget, BudgetSQLMixin, DepassementBudget, budget_pour, budget_sql
+from users.models import Utilisateur
+
+
+class BenchTests(TestCase):
+
+    def test_generation_donnees(self):
+        from performances import donnees
+        crees = donnees.generer(animaux=5, utilisateurs=3, demandes=20, graine=1, taille_lot=4)
+
+        self.assertEqual(Animal.objects.count(), 5)
+        self.assertEqual(Utilisateur.objects.count(), 3)
+        # Au plus un couple (email, animal) par demande : 3 x 5 = 15
+        self.assertEqual(crees, {'animaux': 5, 'utilisateurs': 3, 'demandes': 15})
+        self.assertEqual(
+            DemandeAdoption.objects.values('email', 'animal').distinct().count(), 15
+        )
+
+    def test_bench_resultats_json(self):
+        sortie = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        self.addCleanup(os.remove, sortie)
+
+        call_command(
+            'bench', base_actuelle=True, animaux=3, utilisateurs=2, demandes=4,
+            iterations=2, sortie=sortie, stdout=StringIO(),
+        )
+
+        with open(sortie, encoding='utf-8') as fichier:
+            resultats = json.load(fichier)['resultats']
+        self.assertIn('admin_demandes', resultats)
+        for nom, resultat in resultats.items():
+            self.assertEqual(resultat['statut'], 200, nom)
+            self.assertEqual(set(resultat['latence_ms']), {'p50', 'p95', 'p99', 'moyenne'})
+        self.assertGreater(resultats['nos_animaux']['requetes_sql'], 0)
+        # Temps de rendu lu dans la mesure de MesureRequeteMiddleware
+        self.assertGreater(resultats['nos_animaux']['rendu_ms'], 0)
+
+    def test_seed_scale(self):
+        version = cache.get(_cle_version('catalogue'))
+        call_command(
+            'seed_scale', animaux=30, utilisateurs=10, demandes=100, taille_lot=7,
+            prefixe='seed', stdout=StringIO(),
+        )
+        self.assertEqual(DemandeAdoption.objects.count(), 100)
+        # Pages du catalogue invalidées ; décisions datées après la demande
+        self.assertNotEqual(cache.get(_cle_version('catalogue')), version)
+        decidees = DemandeAdoption.objects.exclude(statut='EN_ATTENTE')
+        self.assertTrue(decidees.exists())
+        self.assertEqual(decidees.filter(date_decision__gt=F('date_demande')).count(), decidees.count())
+        self.assertFalse(DemandeAdoption.objects.filter(statut='EN_ATTENTE', date_decision__isnull=False).exists())
+        self.assertEqual(DemandeAdoption.objects.values('email', 'animal').distinct().count(), 100)
+        # Dates d'historique (et non la date du jour)
+        self.assertGreater(Animal.objects.values('date_arrivee').distinct().count(), 1)
+
+        # Relancer avec le même préfixe créerait des emails en double
+        with self.assertRaises(CommandError):
+            call_command('seed_scale', animaux=1, utilisateurs=1, demandes=1, prefixe='seed', stdout=StringIO())
+
+
+class SauvegardeTests(TestCase):
+
+    def setUp(self):
+        from performances import donnees
+        donnees.generer(animaux=6, utilisateurs=4, demandes=12, graine=2, taille_lot=5)
+        self.dossier = tempfile.mkdtemp()
+
+    def _etat(self):
+        return (
+            list(Utilisateur.objects.order_by('pk').values_list('pk', 'email', 'date_inscription')),
+            list(Animal.objects.order_by('pk').values_list('pk', 'nom', 'date_arrivee', 'date_modification')),
+            list(DemandeAdoption.objects.order_by('pk').values_list('pk', 'animal', 'utilisateur', 'date_demande')),
+        )
+
+    def _vider(self):
+        DemandeAdoption.objects.all().delete()
+        Animal.objects.all().delete()
+        Utilisateur.objects.all().delete()
+
+    def test_export_import_compresse(self):
+        from django.contrib.auth.models import Group
+        groupe = Group.objects.create(name='benevoles')
+        Utilisateur.objects.order_by('pk').first().groups.add(groupe)
+        avant = self._etat()
+        fichier = os.path.join(self.dossier, 'sauvegarde.jsonl.gz')
+
+        call_command('exporter_donnees', fichier, taille_lot=5, stdout=StringIO())
+        self._vider()
+        call_command('importer_donnees', fichier, taille_lot=7, stdout=StringIO())
+
+        # Mêmes clés primaires, relations et dates (auto_now / auto_now_add ignorés)
+        self.assertEqual(self._etat(), avant)
+        self.assertEqual(list(groupe.user_set.all()), [Utilisateur.objects.order_by('pk').first()])
+        self.assertFalse(os.path.exists(fichier + '.reprise-import'))
+
+    def test_reprise_apres_interruption(self):
+        from performances import sauvegarde
+        avant = self._etat()
+        fichier = os.path.join(self.dossier, 'sauvegarde.jsonl')
+
+        def interrompre(modele, lignes):
+            raise KeyboardInterrupt
+
+        # Export interrompu après le premier lot, puis repris
+        with self.assertRaises(KeyboardInterrupt):
+            sauvegarde.exporter(fichier, taille_lot=3, progression=interrompre)
+        sauvegarde.exporter(fichier, taille_lot=3, reprendre=True)
+        with open(fichier, encoding='utf-8') as lignes:
+            self.assertEqual(sum(1 for _ in lignes), 4 + 6 + 12)
+
+        self._vider()
+        # Import interrompu après le premier lot validé, puis repris sans doublon
+        with self.assertRaises(KeyboardInterrupt):
+            sauvegarde.importer(fichier, taille_lot=3, progression=interrompre)
+        self.assertEqual(Utilisateur.objects.count(), 3)
+        importes = sauvegarde.importer(fichier, taille_lot=3, reprendre=True)
+
+        self.assertEqual(self._etat(), avant)
+        self.assertEqual(importes, {'users.Utilisateur': 1, 'animaux.Animal': 6, 'animaux.DemandeAdoption': 12})
+
+
+class BudgetsSQLTests(BudgetSQLMixin, TestCase):
+    """Pages publiques, connexion/inscription et listes de l'admin dans leur budget SQL"""
+
+    def setUp(self):
+        from performances import donnees
+        donnees.generer(animaux=40, utilisateurs=15, demandes=60, graine=3)
+        self.admin = Utilisateur.objects.create_superuser(
+            email='admin@example.com', password='AdminPassword123', first_name='Admin', last_name='Refuge',
+        )
+        self.animal = Animal.objects.filter(disponible=True).order_by('pk').first()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertIn(response.status_code, (200, 302), url)
+        return response
+
+    def test_pages_publiques(self):
+        urls = [
+            reverse('animaux:accueil'),
+            reverse('animaux:nos_animaux'),
+            reverse('animaux:nos_animaux') + '?espece=CHAT&sexe=F&page=2',
+            reverse('animaux:detail_animal', args=[self.animal.pk]),
+            reverse('animaux:a_propos'),
+            reverse('users:connexion'),
+            reverse('users:inscription'),
+        ]
+        for url in urls:
+            self.get(url)
+        # Connecté : formulaire d'adoption pré-rempli, puis déconnexion
+        self.client.force_login(Utilisateur.objects.exclude(pk=self.admin.pk).first())
+        for url in urls[:4]:
+            self.get(url)
+        self.get(reverse('users:deconnexion'))
+
+    def test_listes_admin(self):
+        self.client.force_login(self.admin)
+        # Premier passage : création du thème de l'admin (une fois pour toutes)
+        self.get(reverse('admin:index'))
+        for nom in ('animaux_animal', 'animaux_demandeadoption', 'users_utilisateur'):
+            self.assertIsNotNone(budget_pour(self.get(reverse(f'admin:{nom}_changelist')).resolver_match))
+
+    def test_depassement_detaille(self):
+        from unittest import mock
+        from performances.budgets import BUDGETS
+
+        with mock.patch.dict(BUDGETS, {'animaux:*': Budget(requetes=0)}):
+            with self.assertRaises(DepassementBudget) as erreur:
+                self.client.get(reverse('animaux:nos_animaux'))
+        # Requêtes fautives et pile d'appel dans le projet
+        self.assertIn('budget : 0', str(erreur.exception))
+        self.assertIn('animaux', str(erreur.exception))
+        self.assertIn('views.py', str(erreur.exception))
+
+    def test_decorateur_prioritaire(self):
+        from django.urls import resolve
+        correspondance = resolve(reverse('animaux:a_propos'))
+        self.assertEqual(budget_pour(correspondance), Budget(requetes=10, temps_ms=200))
+        # Vue jetable : décorer views.a_propos fixerait son budget pour le reste des tests
+        correspondance.func = budget_sql(requetes=0)(lambda request: None)
+        self.assertEqual(budget_pour(correspondance), Budget(requetes=0))
+        self.assertFalse(hasattr(resolve(reverse('animaux:a_propos')).func, 'budget_sql'))
+
+
+class DemarrageTests(TestCase):
+
+    def test_migrations_en_attente(self):
+        self.assertFalse(demarrage.migrations_en_attente())
+        MigrationRecorder.Migration.objects.filter(app='animaux').latest('id').delete()
+        self.assertTrue(demarrage.migrations_en_attente())
+
+    def test_collectstatic_seulement_si_sources_modifiees(self):
+        sources, racine = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, sources)
+        self.addCleanup(shutil.rmtree, racine)
+        with open(os.path.join(sources, 'style.css'), 'w') as fichier:
+            fichier.write('body { color: red; }')
+
+        def preparer():
+            sortie = StringIO()
+            call_command('preparer_demarrage', stdout=sortie)
+            return sortie.getvalue()
+
+        with override_settings(
+            STATIC_ROOT=racine, STATICFILES_DIRS=[sources], PAQUETS_STATIQUES={},
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        ):
+            premier = preparer()
+            self.assertIn("Migrations : à jour", premier)
+            self.assertIn("collectstatic", premier)
+            self.assertIn("Fichiers statiques : à jour", preparer())
+
+            with open(os.path.join(sources, 'style.css'), 'w') as fichier:
+                fichier.write('body { color: blue; }')
+            self.assertIn("collectstatic", preparer())
+            self.assertIn("Fichiers statiques : à jour", preparer())
+
+    def test_prechauffage(self):
+        # Gabarits des applications du projet : pages publiques, comptes, e-mails, admin personnalisé
+        self.assertGreaterEqual(demarrage.prechauffer(), 8)
+        # Processus maître de Gunicorn : aussi l'admin et admin_interface
+        self.assertGreater(demarrage.prechauffer(tous_les_gabarits=True), demarrage.prechauffer())
+
+
+class PoolConnexionsTests(SimpleTestCase):
+    # Base SQLite à part (test_moteur_django), jamais celle de la suite
+    databases = {'default'}
+
+    def creer_pool(self, **options):
+        pool_base = pool.PoolConnexions(
+            lambda: sqlite3.connect(':memory:', check_same_thread=False),
+            pool.AvecPool.verifier_connexion,
+            lambda connexion: connexion.close(),
+            **options,
+        )
+        self.addCleanup(pool_base.fermer)
+        return pool_base
+
+    def test_taille_bornee(self):
+        pool_base = self.creer_pool(taille=1, attente_max=0.05)
+        connexion, neuve = pool_base.prendre()
+        self.assertTrue(neuve)
+        with self.assertRaises(pool.PoolEpuise):
+            pool_base.prendre()
+
+        # Rendue par un autre thread pendant l'attente : resservie, pas rouverte
+        pool_base.attente_max = 5
+        threading.Timer(0.05, pool_base.rendre, [connexion]).start()
+        self.assertEqual(pool_base.prendre(), (connexion, False))
+
+        etat = pool_base.statistiques()
+        self.assertEqual(
+            (etat['emprunts'], etat['ouvertures'], etat['attentes'], etat['expirations'], etat['ouvertes']),
+            (3, 1, 2, 1, 1),
+        )
+
+    def test_connexion_coupee_remplacee(self):
+        pool_base = self.creer_pool(verifier_apres=0)
+        connexion, _ = pool_base.prendre()
+        pool_base.rendre(connexion)
+        # Coupée côté serveur pendant qu'elle attendait dans le pool
+        connexion.close()
+
+        nouvelle, neuve = pool_base.prendre()
+        self.assertIsNot(nouvelle, connexion)
+        self.assertTrue(neuve)
+        etat = pool_base.statistiques()
+        self.assertEqual((etat['reconnexions'], etat['ouvertures'], etat['ouvertes']), (1, 2, 1))
+
+    def test_moteur_django(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        # Gestionnaire à part : les connexions de la suite de tests ne sont pas touchées
+        connexions = ConnectionHandler({'default': {
+            'ENGINE': 'config.db.sqlite3',
+            'NAME': os.path.join(dossier, 'essai.sqlite3'),
+            'POOL': {'taille': 1, 'attente_max': 0.05},
+        }})
+        base = connexions['default']
+        self.addCleanup(pool.fermer_pools)
+
+        for _ in range(3):
+            with base.cursor() as curseur:
+                curseur.execute('SELECT 1')
+            base.close()
+        # Erreur pendant l'emprunt : connexion vérifiée au retour, toujours servie
+        with self.assertRaises(OperationalError), base.cursor() as curseur:
+            curseur.execute('SELECT * FROM table_absente')
+        base.close()
+
+        etat = base.pool.statistiques()
+        self.assertEqual((etat['emprunts'], etat['ouvertures'], etat['reconnexions']), (4, 1, 0))
+
+        # Pool épuisé : erreur de base de données de Django
+        connexion, _ = base.pool.prendre()
+        with self.assertRaises(OperationalError):
+            base.ensure_connection()
+        base.pool.rendre(connexion)
+
+
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        from performances import donnees
+        donnees.generer(animaux=3, utilisateurs=1, demandes=0, graine=4)
+        self.url = reverse('animaux:detail_animal', args=[Animal.objects.order_by('pk').first().pk])
+        cache.clear()
+
+    def mesures(self, response):
+        """Server-Timing → {nom: (durée, description)}"""
+        mesures = {}
+        for entree in response['Server-Timing'].split(', '):
+            nom, *parametres = entree.split(';')
+            valeurs = dict(parametre.split('=', 1) for parametre in parametres)
+            mesures[nom] = (float(valeurs.get('dur', 0)), valeurs.get('desc', '').strip('"'))
+        return mesures
+
+    def test_server_timing(self):
+        mesures = self.mesures(self.client.get(self.url))
+        self.assertEqual(set(mesures), {'total', 'vue', 'sql', 'rendu', 'cache'})
+        self.assertGreater(mesures['rendu'][0], 0)
+        self.assertLessEqual(mesures['vue'][0], mesures['total'][0])
+        self.assertNotEqual(mesures['sql'][1], '0 requetes')
+        self.assertEqual(mesures['cache'][1], 'miss')
+
+        # Page servie par le cache : ni gabarit ni requête sur les animaux
+        mesures = self.mesures(self.client.get(self.url))
+        self.assertEqual((mesures['cache'][1], mesures['rendu'][0]), ('hit', 0))
+
+    @override_settings(INSTRUMENTATION_ECHANTILLON=1, INSTRUMENTATION_ENTETE=False)
+    def test_journal_echantillonne(self):
+        with self.assertLogs('performances.instrumentation', 'INFO') as journal:
+            response = self.client.get(self.url)
+            self.client.get(reverse('users:connexion'))
+        self.assertNotIn('Server-Timing', response)
+
+        lignes = [json.loads(ligne.split(':', 2)[2]) for ligne in journal.output]
+        self.assertEqual([ligne['url'] for ligne in lignes], ['animaux:detail_animal', 'users:connexion'])
+        self.assertGreater(lignes[0]['sql_requetes'], 0)
+        self.assertEqual(lignes[0]['cache'], 'miss')
+
+
+class MetriquesTests(TestCase):
+
+    def setUp(self):
+        self.dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dossier)
+        reglages = override_settings(METRIQUES_DOSSIER=self.dossier, METRIQUES_JETON='jeton')
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_agregation_entre_processus(self):
+        # Deux workers, un actif (processus parent) et un déjà arrêté : leurs fichiers restent comptés
+        termine = subprocess.Popen(['true'])
+        termine.wait()
+        for pid, valeur in ((os.getppid(), 2), (termine.pid, 3)):
+            fichier = metriques.FichierValeurs(os.path.join(self.dossier, f'{pid}.db'))
+            fichier.ajouter('unispattes_erreurs_total{url="animaux:accueil"}', valeur)
+        metriques.incrementer('unispattes_erreurs_total', url='animaux:accueil')
+        self.assertEqual(metriques.valeurs()['unispattes_erreurs_total{url="animaux:accueil"}'], 6)
+
+        # Le fichier du worker arrêté est fusionné dans agrege.db, une seule fois
+        fichiers = sorted(nom for nom in os.listdir(self.dossier) if nom.endswith('.db'))
+        self.assertEqual(fichiers, sorted([f'{os.getppid()}.db', f'{os.getpid()}.db', metriques.AGREGE]))
+        self.assertEqual(metriques.valeurs()['unispattes_erreurs_total{url="animaux:accueil"}'], 6)
+
+        # Fichier agrandi au-delà de sa taille initiale, puis repris (pid réutilisé)
+        chemin = os.path.join(self.dossier, f'{os.getppid()}.db')
+        fichier = metriques.FichierValeurs(chemin)
+        for numero in range(2000):
+            fichier.ajouter(f'unispattes_requetes_total{{url="vue_{numero:04}"}}', numero)
+        self.assertGreater(os.path.getsize(chemin), metriques.TAILLE_INITIALE)
+        metriques.FichierValeurs(chemin).ajouter('unispattes_requetes_total{url="vue_1999"}', 1)
+        self.assertEqual(metriques.valeurs()['unispattes_requetes_total{url="vue_1999"}'], 2000)
+
+        # Au-delà de 10^6, chaque incrément reste visible (rate() ne lit pas zéro)
+        self.assertEqual(metriques._formater(1234571.0), '1234571')
+        self.assertEqual(metriques._formater(0.1 + 0.2), '0.30000000000000004')
+
+        metriques.reinitialiser()
+        self.assertEqual(metriques.valeurs(), {})
+
+    def test_exposition(self):
+        from animaux import statistiques
+        from performances import donnees
+        donnees.generer(animaux=3, utilisateurs=2, demandes=4, graine=5)
+        statistiques.reconstruire()
+        cache.clear()
+        url = reverse('animaux:detail_animal', args=[Animal.objects.order_by('pk').first().pk])
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get('/inexistante/')
+        self.client.generic('PROPFIND-123', '/inexistante/')
+
+        demandes = DemandeAdoption.objects.filter(pk=DemandeAdoption.objects.order_by('pk').first().pk)
+        avant = statistiques.etats(demandes)
+        with self.captureOnCommitCallbacks(execute=True):
+            demandes.update(statut='ACCEPTEE')
+            statistiques.enregistrer(avant, statistiques.avec_statut(avant, 'ACCEPTEE'))
+
+        self.assertEqual(self.client.get(reverse('metriques')).status_code, 403)
+        response = self.client.get(reverse('metriques'), HTTP_AUTHORIZATION='Bearer jeton')
+        self.assertEqual(response.status_code, 200)
+        echantillons = dict(
+            ligne.rsplit(' ', 1) for ligne in response.content.decode().splitlines() if not ligne.startswith('#')
+        )
+
+        detail = 'url="animaux:detail_animal"'
+        self.assertEqual(echantillons[f'unispattes_requetes_total{{methode="GET",statut="200",{detail}}}'], '2')
+        self.assertEqual(echantillons['unispattes_requetes_total{methode="GET",statut="404",url="inconnue"}'], '1')
+        self.assertEqual(echantillons['unispattes_requetes_total{methode="autre",statut="404",url="inconnue"}'], '1')
+        # Histogramme cumulé : +Inf = _count, seuils croissants
+        self.assertEqual(echantillons[f'unispattes_requete_duree_secondes_bucket{{{detail},le="+Inf"}}'], '2')
+        self.assertEqual(echantillons[f'unispattes_requete_duree_secondes_count{{{detail}}}'], '2')
+        seuils = [
+            float(echantillons[f'unispattes_requete_sql_requetes_bucket{{{detail},le="{seuil:g}"}}'])
+            for seuil in metriques.NOMBRES_SQL
+        ]
+        self.assertEqual(seuils, sorted(seuils))
+        self.assertEqual(echantillons['unispattes_cache_pages_taux_succes'], '0.5')
+        self.assertEqual(echantillons['unispattes_demandes_adoption_statut_total{statut="ACCEPTEE"}'], '1')
+        total = sum(
+            int(valeur) for cle, valeur in echantillons.items() if cle.startswith('unispattes_demandes_adoption{')
+        )
+        self.assertEqual(total, 4)
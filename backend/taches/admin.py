@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Tache
+
+
+@admin.register(Tache)
+class TacheAdmin(admin.ModelAdmin):
+    """Suivi des tâches en arrière-plan (lecture seule)"""
+
+    list_display = ('id', 'chemin', 'file', 'statut', 'date_creation', 'date_fin')
+    list_filter = ('statut', 'file', 'chemin')
+    date_hierarchy = 'date_creation'
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
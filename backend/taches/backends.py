@@ -0,0 +1,144 @@
+"""
+Backend django.tasks stocké en base : enqueue() insère une ligne Tache,
+un ou plusieurs workers (`manage.py executer_taches`) les exécutent.
+
+Un worker réserve une tâche par un UPDATE conditionnel (statut READY →
+RUNNING) : deux workers ne peuvent pas prendre la même, sur MySQL comme
+sur SQLite, sans verrou de ligne. Une tâche restée RUNNING plus de
+OPTIONS['delai_reprise'] secondes (worker tué en cours d'exécution) est
+reprise par le prochain worker de la même façon.
+"""
+import logging
+from datetime import timedelta
+from traceback import format_exception
+
+from django.db.models import Q
+from django.tasks.backends.base import BaseTaskBackend
+from django.tasks.base import TaskContext, TaskError, TaskResult, TaskResultStatus
+from django.tasks.exceptions import TaskResultDoesNotExist
+from django.tasks.signals import task_enqueued, task_finished, task_started
+from django.utils import timezone
+from django.utils.json import normalize_json
+from django.utils.module_loading import import_string
+
+from .models import Tache
+
+logger = logging.getLogger(__name__)
+
+
+class BaseDeDonneesBackend(BaseTaskBackend):
+    supports_defer = True
+    supports_async_task = True
+    supports_get_result = True
+    supports_priority = True
+
+    def enqueue(self, task, args, kwargs):
+        self.validate_task(task)
+        tache = Tache.objects.create(
+            chemin=task.module_path,
+            file=task.queue_name,
+            priorite=task.priority,
+            arguments=normalize_json({'args': args, 'kwargs': kwargs}),
+            executer_apres=task.run_after,
+        )
+        resultat = self._resultat(tache, task)
+        task_enqueued.send(type(self), task_result=resultat)
+        return resultat
+
+    def get_result(self, result_id):
+        try:
+            return self._resultat(Tache.objects.get(pk=int(result_id)))
+        except (ValueError, Tache.DoesNotExist):
+            raise TaskResultDoesNotExist(result_id) from None
+
+    def _resultat(self, tache, task=None):
+        """TaskResult (API django.tasks) d'une ligne Tache"""
+        task = (task or import_string(tache.chemin)).using(
+            priority=tache.priorite, queue_name=tache.file, run_after=tache.executer_apres, backend=self.alias,
+        )
+        resultat = TaskResult(
+            task=task,
+            id=str(tache.pk),
+            status=tache.statut,
+            enqueued_at=tache.date_creation,
+            started_at=tache.date_debut,
+            last_attempted_at=tache.date_derniere_tentative,
+            finished_at=tache.date_fin,
+            args=tache.arguments['args'],
+            kwargs=tache.arguments['kwargs'],
+            backend=self.alias,
+            errors=[TaskError(**erreur) for erreur in tache.erreurs],
+            worker_ids=tache.workers,
+        )
+        object.__setattr__(resultat, '_return_value', tache.valeur_retour)
+        return resultat
+
+    # ========== WORKER ==========
+
+    def __init__(self, alias, params):
+        super().__init__(alias, params)
+        self.delai_reprise = timedelta(seconds=self.options.get('delai_reprise', 900))
+
+    def reserver(self, worker_id, files=None):
+        """
+        Réserve la prochaine tâche prête (priorité, puis ordre d'arrivée), ou
+        abandonnée par un worker arrêté ; None si la file est vide
+        """
+        maintenant = timezone.now()
+        disponibles = (
+            Q(statut=TaskResultStatus.READY)
+            | Q(statut=TaskResultStatus.RUNNING, date_debut__lt=maintenant - self.delai_reprise)
+        )
+        pretes = Tache.objects.filter(
+            Q(executer_apres__isnull=True) | Q(executer_apres__lte=maintenant),
+            disponibles,
+            file__in=files or self.queues,
+        ).order_by('-priorite', 'id')
+
+        for pk, statut in pretes.values_list('pk', 'statut')[:10]:
+            # Un autre worker a pu la prendre entre la lecture et l'UPDATE : on passe à la suivante
+            if Tache.objects.filter(disponibles, pk=pk).update(
+                statut=TaskResultStatus.RUNNING,
+                date_debut=maintenant,
+                date_derniere_tentative=maintenant,
+            ):
+                tache = Tache.objects.get(pk=pk)
+                if statut == TaskResultStatus.RUNNING:
+                    logger.warning("Tâche %s reprise : en cours depuis plus de %s", tache, self.delai_reprise)
+                tache.workers.append(worker_id)
+                return tache
+        return None
+
+    def remettre_en_file(self, tache):
+        """Tâche réservée mais non exécutée (worker interrompu) : de nouveau prête"""
+        Tache.objects.filter(pk=tache.pk, statut=TaskResultStatus.RUNNING).update(
+            statut=TaskResultStatus.READY, date_debut=None,
+        )
+
+    def executer(self, tache):
+        """Exécute une tâche réservée et enregistre son résultat"""
+        resultat = self._resultat(tache)
+        task_started.send(type(self), task_result=resultat)
+        try:
+            task = resultat.task
+            if task.takes_context:
+                valeur = task.call(TaskContext(task_result=resultat), *resultat.args, **resultat.kwargs)
+            else:
+                valeur = task.call(*resultat.args, **resultat.kwargs)
+            tache.valeur_retour = normalize_json(valeur)
+            tache.statut = TaskResultStatus.SUCCESSFUL
+        except KeyboardInterrupt:
+            raise
+        except BaseException as erreur:
+            logger.exception("Échec de la tâche %s", tache)
+            tache.erreurs.append({
+                'exception_class_path': f'{type(erreur).__module__}.{type(erreur).__qualname__}',
+                'traceback': ''.join(format_exception(erreur)),
+            })
+            tache.statut = TaskResultStatus.FAILED
+
+        tache.date_fin = timezone.now()
+        tache.save(update_fields=['statut', 'valeur_retour', 'erreurs', 'workers', 'date_fin'])
+        resultat = self._resultat(tache)
+        task_finished.send(type(self), task_result=resultat)
+        return resultat
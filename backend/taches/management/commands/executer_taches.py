@@ -0,0 +1,71 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.tasks import DEFAULT_TASK_BACKEND_ALIAS, task_backends
+
+from taches.backends import BaseDeDonneesBackend
+
+
+class Command(BaseCommand):
+    help = "Worker : exécute les tâches en arrière-plan mises en file en base (notifications, vignettes, journal)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', action='append', dest='files', help="File à traiter, répétable (défaut : toutes)")
+        parser.add_argument(
+            '--intervalle', type=float, default=1.0,
+            help="Attente (s) entre deux consultations d'une file vide (défaut : 1)",
+        )
+        parser.add_argument(
+            '--une-fois', action='store_true',
+            help="Exécute les tâches prêtes puis s'arrête (tests, cron)",
+        )
+        parser.add_argument('--backend', default=DEFAULT_TASK_BACKEND_ALIAS)
+
+    def handle(self, *args, **options):
+        backend = task_backends[options['backend']]
+        if not isinstance(backend, BaseDeDonneesBackend):
+            raise CommandError(
+                f"Le backend « {options['backend']} » n'est pas une file en base "
+                "(TASKS['default'] doit être taches.backends.BaseDeDonneesBackend)."
+            )
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        bavard = options['verbosity'] >= 1
+        executees = 0
+        if bavard:
+            self.stdout.write(f"Worker {worker_id} démarré.")
+
+        # SIGTERM (docker stop, redémarrage) : la tâche en cours se termine, puis le worker s'arrête
+        arret = threading.Event()
+        signal_precedent = signal.signal(signal.SIGTERM, lambda signum, frame: arret.set())
+        try:
+            while not arret.is_set():
+                if not options['une_fois']:
+                    # Comme entre deux requêtes : connexions périmées ou en erreur fermées
+                    close_old_connections()
+                tache = backend.reserver(worker_id, options['files'])
+                if tache is None:
+                    if options['une_fois']:
+                        break
+                    arret.wait(options['intervalle'])
+                    continue
+                try:
+                    resultat = backend.executer(tache)
+                except KeyboardInterrupt:
+                    # Interrompue en cours : reprise par le prochain worker
+                    backend.remettre_en_file(tache)
+                    raise
+                executees += 1
+                if bavard:
+                    style = self.style.SUCCESS if resultat.status == 'SUCCESSFUL' else self.style.ERROR
+                    self.stdout.write(style(f"{tache.chemin} #{tache.pk} : {resultat.status}"))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, signal_precedent)
+
+        if bavard:
+            self.stdout.write(f"{executees} tâche(s) exécutée(s).")
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chemin', models.CharField(max_length=255, verbose_name='Tâche')),
+                ('file', models.CharField(default='default', max_length=100, verbose_name='File')),
+                ('priorite', models.SmallIntegerField(default=0, verbose_name='Priorité')),
+                ('arguments', models.JSONField(default=dict, verbose_name='Arguments')),
+                ('statut', models.CharField(choices=[('READY', 'Ready'), ('RUNNING', 'Running'), ('FAILED', 'Failed'), ('SUCCESSFUL', 'Successful')], default='READY', max_length=10, verbose_name='Statut')),
+                ('executer_apres', models.DateTimeField(blank=True, null=True, verbose_name='Pas avant')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Mise en file')),
+                ('date_debut', models.DateTimeField(blank=True, null=True, verbose_name='Début')),
+                ('date_derniere_tentative', models.DateTimeField(blank=True, null=True, verbose_name='Dernière tentative')),
+                ('date_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('valeur_retour', models.JSONField(blank=True, null=True, verbose_name='Valeur de retour')),
+                ('erreurs', models.JSONField(blank=True, default=list, verbose_name='Erreurs')),
+                ('workers', models.JSONField(blank=True, default=list, verbose_name='Workers')),
+            ],
+            options={
+                'verbose_name': 'Tâche',
+                'verbose_name_plural': 'Tâches',
+                'indexes': [models.Index(fields=['statut', 'file', '-priorite', 'id'], name='tache_prochaine_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import models
+from django.tasks import TaskResultStatus
+
+
+class Tache(models.Model):
+    """Tâche django.tasks en file, exécutée par `manage.py executer_taches`"""
+
+    # Chemin de la tâche (module.fonction décorée par @task)
+    chemin = models.CharField(max_length=255, verbose_name="Tâche")
+    file = models.CharField(max_length=100, default='default', verbose_name="File")
+    priorite = models.SmallIntegerField(default=0, verbose_name="Priorité")
+    arguments = models.JSONField(default=dict, verbose_name="Arguments")
+    statut = models.CharField(
+        max_length=10,
+        choices=TaskResultStatus.choices,
+        default=TaskResultStatus.READY,
+        verbose_name="Statut",
+    )
+    executer_apres = models.DateTimeField(null=True, blank=True, verbose_name="Pas avant")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Mise en file")
+    date_debut = models.DateTimeField(null=True, blank=True, verbose_name="Début")
+    date_derniere_tentative = models.DateTimeField(null=True, blank=True, verbose_name="Dernière tentative")
+    date_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+    valeur_retour = models.JSONField(null=True, blank=True, verbose_name="Valeur de retour")
+    # [{exception_class_path, traceback}] : une entrée par tentative échouée
+    erreurs = models.JSONField(default=list, blank=True, verbose_name="Erreurs")
+    workers = models.JSONField(default=list, blank=True, verbose_name="Workers")
+
+    class Meta:
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+        indexes = [
+            # Prochaine tâche à exécuter : prêtes d'une file, par priorité puis ancienneté
+            models.Index(fields=['statut', 'file', '-priorite', 'id'], name='tache_prochaine_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.chemin} #{self.pk} ({self.get_statut_display()})"
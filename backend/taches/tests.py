@@ -0,0 +1,132 @@
+import os
+import signal
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.tasks import TaskResultStatus, default_task_backend, task
+from django.tasks.exceptions import TaskResultDoesNotExist
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Tache
+
+executees = []
+
+
+@task
+def additionner(a, b):
+    executees.append(('additionner', a, b))
+    return a + b
+
+
+@task(priority=10)
+def urgente():
+    executees.append(('urgente',))
+
+
+@task
+def en_echec():
+    raise ValueError("Échec attendu")
+
+
+@task(priority=5)
+def arretee():
+    executees.append(('arretee',))
+    # docker stop pendant la tâche
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+@task
+def interrompue():
+    raise KeyboardInterrupt
+
+
+class BaseDeDonneesBackendTests(TestCase):
+
+    def setUp(self):
+        executees.clear()
+
+    def executer(self):
+        call_command('executer_taches', une_fois=True, verbosity=0)
+
+    def test_mise_en_file_puis_execution(self):
+        resultat = additionner.enqueue(2, b=3)
+        self.assertEqual(resultat.status, TaskResultStatus.READY)
+        self.assertEqual(executees, [])
+        tache = Tache.objects.get(pk=resultat.id)
+        self.assertEqual(tache.chemin, 'taches.tests.additionner')
+        self.assertEqual(tache.arguments, {'args': [2], 'kwargs': {'b': 3}})
+
+        self.executer()
+        resultat.refresh()
+        self.assertEqual(resultat.status, TaskResultStatus.SUCCESSFUL)
+        self.assertEqual(resultat.return_value, 5)
+        self.assertEqual(len(resultat.worker_ids), 1)
+        self.assertIsNotNone(resultat.finished_at)
+        # Une tâche terminée n'est pas exécutée deux fois
+        self.executer()
+        self.assertEqual(executees, [('additionner', 2, 3)])
+
+    def test_echec_enregistre(self):
+        resultat = en_echec.enqueue()
+        additionner.enqueue(1, 1)
+        with self.assertLogs('taches.backends', 'ERROR'):
+            self.executer()
+        resultat.refresh()
+        self.assertEqual(resultat.status, TaskResultStatus.FAILED)
+        self.assertEqual(resultat.errors[0].exception_class, ValueError)
+        self.assertIn("Échec attendu", resultat.errors[0].traceback)
+        # L'échec n'arrête pas le worker
+        self.assertEqual(executees, [('additionner', 1, 1)])
+
+    def test_priorite_et_report(self):
+        additionner.enqueue(1, 2)
+        plus_tard = additionner.using(run_after=timezone.now() + timedelta(hours=1)).enqueue(3, 4)
+        urgente.enqueue()
+        self.executer()
+        self.assertEqual(executees, [('urgente',), ('additionner', 1, 2)])
+        self.assertEqual(plus_tard.status, TaskResultStatus.READY)
+
+    def test_reservation_unique(self):
+        additionner.enqueue(1, 2)
+        premiere = default_task_backend.reserver('a')
+        self.assertEqual(premiere.statut, TaskResultStatus.RUNNING)
+        self.assertIsNone(default_task_backend.reserver('b'))
+
+    def test_reprise_apres_delai(self):
+        resultat = additionner.enqueue(1, 2)
+        default_task_backend.reserver('tue')
+        # Worker tué pendant la tâche : personne ne la reprend avant le délai
+        self.assertIsNone(default_task_backend.reserver('b'))
+        Tache.objects.filter(pk=resultat.id).update(
+            date_debut=timezone.now() - default_task_backend.delai_reprise - timedelta(seconds=1),
+        )
+        with self.assertLogs('taches.backends', 'WARNING'):
+            reprise = default_task_backend.reserver('c')
+        self.assertEqual((reprise.pk, reprise.statut), (int(resultat.id), TaskResultStatus.RUNNING))
+
+    @mock.patch('taches.management.commands.executer_taches.close_old_connections')
+    def test_arret_sigterm(self, close_old_connections):
+        terminee = arretee.enqueue()
+        suivante = additionner.enqueue(1, 2)
+        # Sans --une-fois : seul SIGTERM arrête le worker, après la tâche en cours
+        call_command('executer_taches', verbosity=0)
+        self.assertEqual(executees, [('arretee',)])
+        self.assertEqual(Tache.objects.get(pk=terminee.id).statut, TaskResultStatus.SUCCESSFUL)
+        self.assertEqual(Tache.objects.get(pk=suivante.id).statut, TaskResultStatus.READY)
+
+    def test_interruption_remet_en_file(self):
+        resultat = interrompue.enqueue()
+        self.executer()
+        self.assertEqual(Tache.objects.get(pk=resultat.id).statut, TaskResultStatus.READY)
+
+    def test_resultat_inconnu(self):
+        for identifiant in ('999999', 'abc'):
+            with self.assertRaises(TaskResultDoesNotExist):
+                default_task_backend.get_result(identifiant)
+
+    @override_settings(TASKS={'default': {'BACKEND': 'django.tasks.backends.immediate.ImmediateBackend'}})
+    def test_worker_backend_en_base_requis(self):
+        with self.assertRaises(CommandError):
+            self.executer()
@@ -1,24 +1,55 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Count, Q
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
 from django.utils.html import format_html
 from .models import Utilisateur
 
+# Nombre maximum de demandes affichées dans la fiche d'un utilisateur
+DEMANDES_MAX_AFFICHEES = 20
+
+
 def nombre_demandes(obj):
-    """Compte le nombre de demandes d'adoption"""
-    try:
-        from animaux.models import DemandeAdoption
-        return DemandeAdoption.objects.filter(utilisateur=obj).count()
-    except Exception as e:
-        return f"Erreur: {e}"
+    """Nombre de demandes d'adoption (annoté par UtilisateurAdmin.get_queryset)"""
+    return obj.nb_demandes
 nombre_demandes.short_description = "Demandes"
+nombre_demandes.admin_order_field = 'nb_demandes'
+
+
+def demandes_par_statut(obj):
+    """Répartition des demandes par statut"""
+    return format_html(
+        '<span title="En attente">⏳ {}</span> · '
+        '<span title="Acceptées">✅ {}</span> · '
+        '<span title="Refusées">❌ {}</span>',
+        obj.nb_en_attente, obj.nb_acceptees, obj.nb_refusees
+    )
+demandes_par_statut.short_description = "Par statut"
+demandes_par_statut.admin_order_field = 'nb_en_attente'
+
+
+class DemandesRecentesFormSet(BaseInlineFormSet):
+    """Limite l'inline aux demandes les plus récentes"""
+
+    def get_queryset(self):
+        # Mémorisé : le formset appelle get_queryset() plusieurs fois
+        if not hasattr(self, '_demandes_recentes'):
+            self._demandes_recentes = super().get_queryset()[:DEMANDES_MAX_AFFICHEES]
+        return self._demandes_recentes
 
 
 class DemandeAdoptionInline(admin.TabularInline):
-    """Affiche l'historique des demandes d'adoption"""
+    """Affiche l'historique des demandes d'adoption (les plus récentes)"""
     from animaux.models import DemandeAdoption
     model = DemandeAdoption
+    formset = DemandesRecentesFormSet
     extra = 0
     can_delete = False
+    verbose_name_plural = f"Demandes d'adoption ({DEMANDES_MAX_AFFICHEES} plus récentes)"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('animal')
 
     fields = (
         'animal_link',
@@ -45,7 +76,7 @@ class DemandeAdoptionInline(admin.TabularInline):
     def animal_link(self, obj):
         """Lien vers l'animal"""
         if obj.animal:
-            url = f"/admin/animaux/animal/{obj.animal.id}/change/"
+            url = reverse('admin:animaux_animal_change', args=[obj.animal_id])
             return format_html('<a href="{}">{}</a>', url, obj.animal.nom)
         return "-"
     animal_link.short_description = "Animal"
@@ -135,6 +166,7 @@ class UtilisateurAdmin(UserAdmin):
         'is_staff',
         'date_inscription',
         nombre_demandes,
+        demandes_par_statut,
         'compte_verrouille'
     )
 
@@ -154,10 +186,31 @@ class UtilisateurAdmin(UserAdmin):
         ('Sécurité', {
             'fields': ('tentatives_connexion', 'compte_verrouille', 'date_inscription')
         }),
+        ("Demandes d'adoption", {
+            'fields': ('toutes_les_demandes',)
+        }),
     )
 
-    readonly_fields = ('date_inscription',)
+    readonly_fields = ('date_inscription', 'toutes_les_demandes')
     ordering = ('email',)
 
     # L'inline qui affiche les demandes
     inlines = [DemandeAdoptionInline]
+
+    def get_queryset(self, request):
+        """Compteurs de demandes calculés en une seule requête (au lieu d'un COUNT par ligne)"""
+        return super().get_queryset(request).annotate(
+            nb_demandes=Count('demandes_adoption'),
+            nb_en_attente=Count('demandes_adoption', filter=Q(demandes_adoption__statut='EN_ATTENTE')),
+            nb_acceptees=Count('demandes_adoption', filter=Q(demandes_adoption__statut='ACCEPTEE')),
+            nb_refusees=Count('demandes_adoption', filter=Q(demandes_adoption__statut='REFUSEE')),
+        )
+
+    def toutes_les_demandes(self, obj):
+        """Lien vers la liste complète (l'inline est limité aux plus récentes)"""
+        url = reverse('admin:animaux_demandeadoption_changelist')
+        return format_html(
+            '<a href="{}?utilisateur__id__exact={}">Voir les {} demande(s)</a> ({} en attente)',
+            url, obj.pk, obj.nb_demandes, obj.nb_en_attente
+        )
+    toutes_les_demandes.short_description = "Historique complet"
@@ -0,0 +1,121 @@
+"""
+Hachage des mots de passe hors de la boucle d'événements (vues async).
+
+PBKDF2 occupe le processeur plusieurs dizaines de millisecondes : sous ASGI,
+un hachage exécuté dans la boucle bloque toutes les requêtes du worker. Les
+vues async (users/views_async.py) le confient à un pool de HACHAGE_THREADS
+threads (hashlib libère le GIL pendant le calcul). Au-delà de
+HACHAGE_FILE_MAX hachages en attente, FilePleine est levée : mieux vaut
+refuser vite (503) que laisser les connexions s'empiler.
+
+Le profil de hachage (HACHAGE_PROFIL, voir config/settings.py) règle le
+compromis débit / sécurité ; les mots de passe sont rehachés au profil
+courant à la connexion suivante.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password, verify_password
+
+
+class PBKDF2Econome(PBKDF2PasswordHasher):
+    """4 fois moins d'itérations : plus de connexions par seconde, moins de résistance au cassage"""
+    iterations = PBKDF2PasswordHasher.iterations // 4
+
+
+class PBKDF2Renforce(PBKDF2PasswordHasher):
+    """2 fois plus d'itérations que le réglage Django"""
+    iterations = PBKDF2PasswordHasher.iterations * 2
+
+
+class FilePleine(Exception):
+    pass
+
+
+_verrou = threading.Lock()
+_etat = {'en_attente': 0, 'en_cours': 0, 'total': 0, 'refus': 0, 'duree': 0.0, 'duree_max': 0.0}
+
+
+@lru_cache(maxsize=1)
+def _pool():
+    return ThreadPoolExecutor(max_workers=settings.HACHAGE_THREADS, thread_name_prefix='hachage')
+
+
+def _chronometrer(fonction, *arguments):
+    with _verrou:
+        _etat['en_attente'] -= 1
+        _etat['en_cours'] += 1
+    debut = time.perf_counter()
+    try:
+        return fonction(*arguments)
+    finally:
+        duree = time.perf_counter() - debut
+        with _verrou:
+            _etat['en_cours'] -= 1
+            _etat['total'] += 1
+            _etat['duree'] += duree
+            _etat['duree_max'] = max(_etat['duree_max'], duree)
+
+
+async def executer(fonction, *arguments):
+    """Exécute `fonction` dans le pool de hachage ; FilePleine si trop de hachages attendent"""
+    with _verrou:
+        if _etat['en_attente'] >= settings.HACHAGE_FILE_MAX:
+            _etat['refus'] += 1
+            raise FilePleine
+        _etat['en_attente'] += 1
+
+    futur = _pool().submit(_chronometrer, fonction, *arguments)
+    try:
+        return await asyncio.wrap_future(futur)
+    except asyncio.CancelledError:
+        # Client parti avant que le hachage démarre : il ne compte plus dans la file
+        if futur.cancelled():
+            with _verrou:
+                _etat['en_attente'] -= 1
+        raise
+
+
+async def ahacher(mot_de_passe):
+    return await executer(make_password, mot_de_passe)
+
+
+async def averifier(utilisateur, mot_de_passe):
+    """Vérifie le mot de passe ; le rehache au profil courant si besoin"""
+    correct, a_mettre_a_jour = await executer(verify_password, mot_de_passe, utilisateur.password)
+    if correct and a_mettre_a_jour:
+        utilisateur.password = await ahacher(mot_de_passe)
+        await utilisateur.asave(update_fields=['password'])
+    return correct
+
+
+async def aauthentifier(email, mot_de_passe):
+    """Équivalent async de authenticate() (ModelBackend), hachage dans le pool"""
+    Utilisateur = get_user_model()
+    if not email or mot_de_passe is None:
+        return None
+    try:
+        utilisateur = await Utilisateur._default_manager.aget_by_natural_key(email)
+    except Utilisateur.DoesNotExist:
+        # Même coût pour un email inconnu : pas d'indice sur l'existence du compte
+        await ahacher(mot_de_passe)
+        return None
+    if await averifier(utilisateur, mot_de_passe) and utilisateur.is_active:
+        return utilisateur
+    return None
+
+
+def statistiques():
+    """File d'attente et temps de hachage du processus courant"""
+    with _verrou:
+        etat = dict(_etat)
+    etat['duree_moyenne'] = etat['duree'] / etat['total'] if etat['total'] else 0.0
+    etat['threads'] = settings.HACHAGE_THREADS
+    etat['file_max'] = settings.HACHAGE_FILE_MAX
+    etat['profil'] = settings.HACHAGE_PROFIL
+    return etat
@@ -0,0 +1,96 @@
+"""
+Limitation des tentatives de connexion, par adresse IP et par email.
+
+Les échecs sont comptés dans le cache sur une fenêtre glissante
+(CONNEXION_FENETRE secondes) : deux tranches fixes, la précédente pondérée
+par la part de la fenêtre qui la recouvre encore. Une tentative au-delà du
+seuil est refusée avant toute vérification du mot de passe (pas de hachage
+PBKDF2). La table des utilisateurs n'est écrite qu'au franchissement du
+seuil par un email (compte_verrouille) et à la connexion réussie qui suit.
+
+compte_verrouille est informatif (liste et filtre de l'admin) : le refus
+vient des seuls compteurs du cache, qui expirent avec la fenêtre. Le lire
+dans bloquee() ajouterait une requête à chaque tentative et garderait le
+compte bloqué jusqu'à une intervention dans l'admin.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Utilisateur
+
+PREFIXE = 'connexion'
+
+
+def _cles(ip, email):
+    """Compteurs concernés par la tentative → seuil de chacun"""
+    cles = {f'{PREFIXE}:ip:{ip}': settings.CONNEXION_MAX_IP}
+    if email:
+        empreinte = hashlib.md5(email.strip().lower().encode()).hexdigest()
+        cles[f'{PREFIXE}:email:{empreinte}'] = settings.CONNEXION_MAX_EMAIL
+    return cles
+
+
+def _tranches(maintenant):
+    """Tranche courante, tranche précédente et poids de la précédente dans la fenêtre"""
+    fenetre = settings.CONNEXION_FENETRE
+    tranche = int(maintenant // fenetre)
+    return tranche, tranche - 1, 1 - (maintenant % fenetre) / fenetre
+
+
+def _estimer(courant, precedent, poids):
+    return courant + math.floor(precedent * poids)
+
+
+def _echecs(cles, maintenant):
+    """Nombre d'échecs estimé sur la fenêtre glissante, par compteur"""
+    courante, precedente, poids = _tranches(maintenant)
+    valeurs = cache.get_many([f'{cle}:{tranche}' for cle in cles for tranche in (courante, precedente)])
+    return {
+        cle: _estimer(valeurs.get(f'{cle}:{courante}', 0), valeurs.get(f'{cle}:{precedente}', 0), poids)
+        for cle in cles
+    }
+
+
+def bloquee(ip, email):
+    """Vrai si l'IP ou l'email a atteint son seuil : tentative à refuser sans vérifier le mot de passe"""
+    cles = _cles(ip, email)
+    return any(echecs >= cles[cle] for cle, echecs in _echecs(cles, time.time()).items())
+
+
+def noter_echec(ip, email):
+    """Compte un échec ; verrouille le compte quand l'email franchit son seuil"""
+    maintenant = time.time()
+    courante, precedente, poids = _tranches(maintenant)
+    cles = _cles(ip, email)
+    # Estimation avant cet échec : tranches lues avant l'incrément, en un aller-retour
+    valeurs = cache.get_many([f'{cle}:{tranche}' for cle in cles for tranche in (courante, precedente)])
+
+    for cle, seuil in cles.items():
+        cle_tranche = f'{cle}:{courante}'
+        precedent = valeurs.get(f'{cle}:{precedente}', 0)
+        avant = _estimer(valeurs.get(cle_tranche, 0), precedent, poids)
+        try:
+            courant = cache.incr(cle_tranche)
+        except ValueError:
+            # La tranche sert encore de « précédente » pendant la fenêtre suivante
+            cache.add(cle_tranche, 1, 2 * settings.CONNEXION_FENETRE)
+            courant = 1
+        echecs = _estimer(courant, precedent, poids)
+
+        # Franchissement et non égalité : l'estimation peut sauter le seuil (échecs concurrents)
+        if cle.startswith(f'{PREFIXE}:email:') and avant < seuil <= echecs:
+            # Seule écriture en base pendant une attaque : au franchissement du seuil
+            Utilisateur.objects.filter(email__iexact=email.strip()).update(
+                compte_verrouille=True, tentatives_connexion=echecs,
+            )
+
+
+def noter_succes(utilisateur):
+    """Lève le verrouillage enregistré après une série d'échecs (une écriture, seulement si besoin)"""
+    if utilisateur.compte_verrouille or utilisateur.tentatives_connexion:
+        Utilisateur.objects.filter(pk=utilisateur.pk).update(compte_verrouille=False, tentatives_connexion=0)
+        utilisateur.compte_verrouille, utilisateur.tentatives_connexion = False, 0
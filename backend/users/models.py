@@ -31,6 +31,7 @@ class Utilisateur(AbstractUser):
     adresse = models.TextField(blank=True, verbose_name="Adresse")
     date_inscription = models.DateTimeField(auto_now_add=True)
     tentatives_connexion = models.IntegerField(default=0)
+    # Informatif (admin) : le refus des tentatives vient du cache, voir users/limitation.py
     compte_verrouille = models.BooleanField(default=False)
 
     USERNAME_FIELD = 'email'
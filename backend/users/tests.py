@@ -1,8 +1,17 @@
-from django.test import TestCase
-from django.urls import reverse
+from unittest import mock
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from animaux.models import Animal, DemandeAdoption
+from performances.budgets import BudgetSQLMixin, collecter_requetes
+from performances.donnees import nouvel_animal, nouvelle_demande
+from . import hachage, views_async
 from .models import Utilisateur
+from .urls import routes
 
-class UtilisateurTests(TestCase):
+class UtilisateurTests(BudgetSQLMixin, TestCase):
     def setUp(self):
         # Création d'un utilisateur de test
         self.user = Utilisateur.objects.create_user(
@@ -38,3 +47,198 @@ class UtilisateurTests(TestCase):
         self.assertRedirects(response, reverse('animaux:accueil'))
         # Vérifie que l'utilisateur est authentifié
         self.assertTrue('_auth_user_id' in self.client.session)
+
+
+
+@override_settings(CONNEXION_MAX_EMAIL=3, CONNEXION_MAX_IP=5)
+class LimitationConnexionTests(BudgetSQLMixin, TestCase):
+    """Échecs comptés dans le cache ; refus sans hachage du mot de passe au-delà du seuil"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = Utilisateur.objects.create_user(
+            email='testuser@example.com', password='TestPassword123', first_name='Test', last_name='User'
+        )
+
+    def connecter(self, email='testuser@example.com', password='Mauvais', ip='10.0.0.1'):
+        return self.client.post(
+            reverse('users:connexion'), {'username': email, 'password': password}, REMOTE_ADDR=ip,
+        )
+
+    def test_verrouillage_par_email(self):
+        for _ in range(3):
+            self.assertEqual(self.connecter().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.compte_verrouille)
+        self.assertEqual(self.user.tentatives_connexion, 3)
+
+        # Même le bon mot de passe est refusé, sans passer par authenticate() (pas de hachage)
+        with mock.patch('django.contrib.auth.forms.authenticate') as authenticate:
+            response = self.connecter(password='TestPassword123', ip='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_verrouillage_seuil_saute(self):
+        """Échec concurrent : l'estimation passe de 2 à 4 sans valoir 3, le compte est quand même verrouillé"""
+        for _ in range(2):
+            self.connecter()
+        incr = cache.incr
+        with mock.patch.object(cache, 'incr', lambda cle, delta=1, version=None: incr(cle, delta + 1, version)):
+            self.connecter()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.compte_verrouille)
+        self.assertEqual(self.user.tentatives_connexion, 4)
+
+    def test_ecritures_seulement_au_seuil(self):
+        with collecter_requetes() as requetes:
+            for _ in range(4):
+                self.connecter()
+        ecritures = [r.sql for r in requetes if r.sql.startswith('UPDATE "users_utilisateur"')]
+        self.assertEqual(len(ecritures), 1)
+
+    def test_limite_par_ip(self):
+        for numero in range(5):
+            self.connecter(email=f'inconnu{numero}@example.com')
+        self.assertEqual(self.connecter(password='TestPassword123').status_code, 429)
+        # Autre adresse : le compte n'est pas verrouillé
+        self.assertEqual(self.connecter(password='TestPassword123', ip='10.0.0.9').status_code, 302)
+
+    def test_succes_leve_le_verrou(self):
+        for _ in range(3):
+            self.connecter()
+        # Fenêtre écoulée (compteurs expirés)
+        cache.clear()
+        self.assertEqual(self.connecter(password='TestPassword123').status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.compte_verrouille)
+        self.assertEqual(self.user.tentatives_connexion, 0)
+
+
+class UtilisateurAdminTests(BudgetSQLMixin, TestCase):
+    """Compteurs annotés et inline limité dans l'admin des utilisateurs"""
+
+    def setUp(self):
+        self.admin = Utilisateur.objects.create_superuser(
+            email='admin@example.com',
+            password='AdminPassword123',
+            first_name='Admin',
+            last_name='Refuge'
+        )
+        self.client.force_login(self.admin)
+        self.animaux = Animal.objects.bulk_create([
+            nouvel_animal(i, espece='CHIEN', age_annees=3, sexe='M') for i in range(30)
+        ])
+
+    def creer_utilisateur(self, numero, nombre_demandes, statut='EN_ATTENTE'):
+        utilisateur = Utilisateur.objects.create(email=f'adoptant{numero}@example.com')
+        DemandeAdoption.objects.bulk_create([
+            nouvelle_demande(animal, utilisateur, f'Adoptant {numero}', statut=statut)
+            for animal in self.animaux[:nombre_demandes]
+        ])
+        return utilisateur
+
+    def test_liste_compteurs_annotes(self):
+        url = reverse('admin:users_utilisateur_changelist')
+        self.creer_utilisateur(1, 2)
+        peu, _ = self.compter_requetes(url)
+
+        for numero in range(2, 12):
+            self.creer_utilisateur(numero, numero % 4, statut='ACCEPTEE')
+        beaucoup, response = self.compter_requetes(url, o='-6')
+        self.assertEqual(beaucoup, peu)
+
+        # Tri par nombre de demandes (colonne 6 = nombre_demandes)
+        utilisateurs = list(response.context['cl'].result_list)
+        self.assertEqual(utilisateurs[0].nb_demandes, 3)
+        self.assertEqual(utilisateurs[0].nb_acceptees, 3)
+        self.assertEqual(utilisateurs[-1].nb_demandes, 0)
+
+    def test_inline_demandes_limite(self):
+        from .admin import DEMANDES_MAX_AFFICHEES
+        utilisateur = self.creer_utilisateur(1, 25)
+        url = reverse('admin:users_utilisateur_change', args=[utilisateur.pk])
+
+        nombre, response = self.compter_requetes(url)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), DEMANDES_MAX_AFFICHEES)
+        self.assertContains(response, 'Voir les 25 demande(s)')
+
+        # Pas de requête supplémentaire par demande affichée
+        self.creer_utilisateur(2, 3)
+        autre = Utilisateur.objects.get(email='adoptant2@example.com')
+        nombre_petit, _ = self.compter_requetes(reverse('admin:users_utilisateur_change', args=[autre.pk]))
+        self.assertEqual(nombre, nombre_petit)
+
+
+# Comptes servis par les vues async, comme sous ASGI (ASYNC_VIEWS)
+urlpatterns = [
+    path('', include('animaux.urls')),
+    path('users/', include((routes(views_async), 'users'))),
+    path('admin/', admin.site.urls),
+]
+
+
+@override_settings(ROOT_URLCONF='users.tests')
+class VuesAsyncTests(TestCase):
+    """Inscription et connexion async : hachage dans le pool de users/hachage.py"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = Utilisateur.objects.create_user(
+            email='testuser@example.com', password='TestPassword123', first_name='Test', last_name='User'
+        )
+
+    async def test_connexion(self):
+        avant = hachage.statistiques()['total']
+        response = await self.async_client.post(
+            '/users/connexion/', {'username': 'testuser@example.com', 'password': 'TestPassword123'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual((await self.async_client.session.aget('_auth_user_id')), str(self.user.pk))
+        self.assertEqual(hachage.statistiques()['total'], avant + 1)
+
+    async def test_connexion_echouee(self):
+        for email in ('testuser@example.com', 'inconnu@example.com'):
+            response = await self.async_client.post('/users/connexion/', {'username': email, 'password': 'Mauvais'})
+            self.assertContains(response, 'Email ou mot de passe incorrect.')
+
+    async def test_inscription(self):
+        response = await self.async_client.post('/users/inscription/', {
+            'first_name': 'Nouvel', 'last_name': 'Utilisateur', 'email': 'newuser@example.com',
+            'password1': 'Password123!', 'password2': 'Password123!',
+        })
+        self.assertEqual(response.status_code, 302)
+        user = await Utilisateur.objects.aget(email='newuser@example.com')
+        self.assertEqual(user.username, 'newuser@example.com')
+        self.assertTrue(await user.acheck_password('Password123!'))
+        self.assertEqual((await self.async_client.session.aget('_auth_user_id')), str(user.pk))
+
+    @override_settings(HACHAGE_FILE_MAX=0)
+    async def test_file_pleine(self):
+        response = await self.async_client.post(
+            '/users/connexion/', {'username': 'testuser@example.com', 'password': 'TestPassword123'}
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_profil_econome_rehache(self):
+        with override_settings(PASSWORD_HASHERS=[
+            'users.hachage.PBKDF2Econome', 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        ]):
+            self.client.post(
+                '/users/connexion/', {'username': 'testuser@example.com', 'password': 'TestPassword123'}
+            )
+            self.user.refresh_from_db()
+            iterations = int(self.user.password.split('$')[1])
+            self.assertEqual(iterations, hachage.PBKDF2Econome.iterations)
+            self.assertTrue(self.user.check_password('TestPassword123'))
+
+    def test_statistiques_reservees_au_staff(self):
+        self.assertEqual(self.client.get('/users/hachage/').status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        statistiques = self.client.get('/users/hachage/').json()
+        self.assertEqual(statistiques['profil'], 'standard')
+        self.assertIn('en_attente', statistiques)
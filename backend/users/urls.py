@@ -1,10 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, views_async
 
 app_name = 'users'
 
-urlpatterns = [
-    path('inscription/', views.inscription, name='inscription'),
-    path('connexion/', views.connexion, name='connexion'),
-    path('deconnexion/', views.deconnexion, name='deconnexion'),
-]
+
+def routes(vues):
+    """Routes des comptes, servies par `vues` (views ou views_async)"""
+    return [
+        path('inscription/', vues.inscription, name='inscription'),
+        path('connexion/', vues.connexion, name='connexion'),
+        path('deconnexion/', vues.deconnexion, name='deconnexion'),
+        path('hachage/', vues.statistiques_hachage, name='statistiques_hachage'),
+    ]
+
+
+# Sous ASGI (ASYNC_VIEWS activé), le hachage des mots de passe quitte la boucle d'événements
+urlpatterns = routes(views_async if settings.ASYNC_VIEWS else views)
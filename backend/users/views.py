@@ -1,7 +1,11 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
-from django.contrib.auth import login, logout, authenticate
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from . import hachage, limitation
 from .forms import InscriptionForm, ConnexionForm
 
 def inscription(request):
@@ -29,16 +33,25 @@ def connexion(request):
         return redirect('animaux:accueil')
 
     if request.method == 'POST':
+        ip = request.META.get('REMOTE_ADDR')
+        email = request.POST.get('username', '')
         form = ConnexionForm(request, data=request.POST)
+
+        # Trop d'échecs récents : refus avant toute vérification du mot de passe
+        if limitation.bloquee(ip, email):
+            minutes = settings.CONNEXION_FENETRE // 60
+            messages.error(request, f'Trop de tentatives de connexion. Réessayez dans {minutes} minutes.')
+            return render(request, 'users/login.html', {'form': form}, status=429)
+
+        # is_valid() authentifie déjà l'utilisateur : un seul hachage du mot de passe
         if form.is_valid():
-            email = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=email, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Bienvenue {user.first_name} !')
-                return redirect('animaux:accueil')
+            user = form.get_user()
+            limitation.noter_succes(user)
+            login(request, user)
+            messages.success(request, f'Bienvenue {user.first_name} !')
+            return redirect('animaux:accueil')
         else:
+            limitation.noter_echec(ip, email)
             messages.error(request, 'Email ou mot de passe incorrect.')
     else:
         form = ConnexionForm()
@@ -51,3 +64,8 @@ def deconnexion(request):
     logout(request)
     messages.success(request, 'Vous avez été déconnecté avec succès.')
     return redirect('animaux:accueil')
+
+@staff_member_required
+def statistiques_hachage(request):
+    """File d'attente et temps du pool de hachage (vues async) de ce processus"""
+    return JsonResponse(hachage.statistiques())
@@ -0,0 +1,95 @@
+"""
+Versions async de l'inscription et de la connexion, servies quand
+ASYNC_VIEWS est activé (voir users/urls.py).
+
+Le hachage et la vérification des mots de passe passent par le pool borné
+de users/hachage.py au lieu de bloquer la boucle d'événements. Le reste
+(messages, limitation des tentatives) suit les vues synchrones de views.py.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import alogin, alogout
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+
+from . import hachage, limitation
+from .forms import ConnexionForm, InscriptionForm
+from .views import statistiques_hachage  # noqa: F401 (même vue dans les deux modes)
+
+
+def _surcharge(request, gabarit, form):
+    """Pool de hachage saturé : refus immédiat, le client peut réessayer"""
+    messages.error(request, 'Le service est très sollicité. Réessayez dans quelques secondes.')
+    response = render(request, gabarit, {'form': form}, status=503)
+    response['Retry-After'] = '5'
+    return response
+
+
+async def inscription(request):
+    """Vue d'inscription (voir views.inscription)"""
+    request.user = await request.auser()
+    if request.user.is_authenticated:
+        return redirect('animaux:accueil')
+
+    if request.method == 'POST':
+        form = InscriptionForm(request.POST)
+        # Validation (unicité de l'email en base) : chemin synchrone ; le hachage vient après
+        if await sync_to_async(form.is_valid)():
+            user = form.instance
+            try:
+                user.password = await hachage.ahacher(form.cleaned_data['password1'])
+            except hachage.FilePleine:
+                return _surcharge(request, 'users/register.html', form)
+            await user.asave()
+            await alogin(request, user)
+            messages.success(request, 'Inscription réussie ! Bienvenue sur UniSpattes.')
+            return redirect('animaux:accueil')
+        else:
+            messages.error(request, 'Erreur lors de l\'inscription. Veuillez vérifier vos informations.')
+    else:
+        form = InscriptionForm()
+
+    return render(request, 'users/register.html', {'form': form})
+
+
+async def connexion(request):
+    """Vue de connexion (voir views.connexion)"""
+    request.user = await request.auser()
+    if request.user.is_authenticated:
+        return redirect('animaux:accueil')
+
+    form = ConnexionForm()
+    if request.method == 'POST':
+        ip = request.META.get('REMOTE_ADDR')
+        email = request.POST.get('username', '')
+        # Formulaire non lié : le valider relancerait authenticate() de façon synchrone
+        form = ConnexionForm(initial={'username': email})
+
+        if await sync_to_async(limitation.bloquee)(ip, email):
+            minutes = settings.CONNEXION_FENETRE // 60
+            messages.error(request, f'Trop de tentatives de connexion. Réessayez dans {minutes} minutes.')
+            return render(request, 'users/login.html', {'form': form}, status=429)
+
+        try:
+            user = await hachage.aauthentifier(email, request.POST.get('password'))
+        except hachage.FilePleine:
+            return _surcharge(request, 'users/login.html', form)
+
+        if user is not None:
+            await sync_to_async(limitation.noter_succes)(user)
+            await alogin(request, user)
+            messages.success(request, f'Bienvenue {user.first_name} !')
+            return redirect('animaux:accueil')
+        await sync_to_async(limitation.noter_echec)(ip, email)
+        messages.error(request, 'Email ou mot de passe incorrect.')
+
+    return render(request, 'users/login.html', {'form': form})
+
+
+@login_required
+async def deconnexion(request):
+    """Vue de déconnexion"""
+    await alogout(request)
+    messages.success(request, 'Vous avez été déconnecté avec succès.')
+    return redirect('animaux:accueil')